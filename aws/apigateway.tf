@@ -7,6 +7,11 @@ resource "aws_apigatewayv2_api" "MachineStatusAPI" {
   disable_execute_api_endpoint = false
 }
 
+# Management endpoint used to push notifications to connected clients
+locals {
+  websocket_endpoint = "https://${aws_apigatewayv2_api.MachineStatusAPI.id}.execute-api.${var.aws_region}.amazonaws.com/${var.websocket_stage}"
+}
+
 # Integration for Connect Function
 resource "aws_apigatewayv2_integration" "connect_integration" {
   api_id             = aws_apigatewayv2_api.MachineStatusAPI.id
@@ -31,6 +36,14 @@ resource "aws_apigatewayv2_integration" "fetch_machine_status_integration" {
   integration_method = "POST"
 }
 
+# Integration for Subscribe Function
+resource "aws_apigatewayv2_integration" "subscribe_integration" {
+  api_id             = aws_apigatewayv2_api.MachineStatusAPI.id
+  integration_type   = "AWS_PROXY"
+  integration_uri    = aws_lambda_function.subscribeFunction.invoke_arn
+  integration_method = "POST"
+}
+
 # Route for $connect with connect integration
 resource "aws_apigatewayv2_route" "connect_route" {
   api_id     = aws_apigatewayv2_api.MachineStatusAPI.id
@@ -52,6 +65,19 @@ resource "aws_apigatewayv2_route" "default_route" {
   target     = "integrations/${aws_apigatewayv2_integration.fetch_machine_status_integration.id}"
 }
 
+# Routes for {"action": "subscribe" | "unsubscribe", "machine_id": ...} messages
+resource "aws_apigatewayv2_route" "subscribe_route" {
+  api_id     = aws_apigatewayv2_api.MachineStatusAPI.id
+  route_key  = "subscribe"
+  target     = "integrations/${aws_apigatewayv2_integration.subscribe_integration.id}"
+}
+
+resource "aws_apigatewayv2_route" "unsubscribe_route" {
+  api_id     = aws_apigatewayv2_api.MachineStatusAPI.id
+  route_key  = "unsubscribe"
+  target     = "integrations/${aws_apigatewayv2_integration.subscribe_integration.id}"
+}
+
 # Permissions for Lambda functions to allow API Gateway invocation
 resource "aws_lambda_permission" "connect_permission" {
   statement_id  = "AllowAPIGatewayInvokeConnect"
@@ -76,4 +102,12 @@ resource "aws_lambda_permission" "fetch_machine_status_permission" {
   function_name = aws_lambda_function.fetchMachineStatusFunction.arn
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${aws_apigatewayv2_api.MachineStatusAPI.execution_arn}/*"
-}
\ No newline at end of file
+}
+
+resource "aws_lambda_permission" "subscribe_permission" {
+  statement_id  = "AllowAPIGatewayInvokeSubscribe"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.subscribeFunction.arn
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.MachineStatusAPI.execution_arn}/*"
+}
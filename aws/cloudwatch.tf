@@ -14,4 +14,66 @@ resource "aws_cloudwatch_event_rule" "processDataRule" {
   name                = "processDataRule"
   description         = "Process Vibration Data"
   schedule_expression = "rate(5 minutes)"
-}
\ No newline at end of file
+}
+
+# Runs well inside archiveOldDataRule's 10 minute retention of VibrationData
+resource "aws_cloudwatch_event_rule" "rollupUsageRule" {
+  name                = "rollupUsageRule"
+  description         = "Roll up machine usage into MachineUsageRollup"
+  schedule_expression = "rate(5 minutes)"
+}
+
+resource "aws_cloudwatch_event_target" "rollupUsageTarget" {
+  rule      = aws_cloudwatch_event_rule.rollupUsageRule.name
+  target_id = "rollupUsageTarget"
+  arn       = aws_lambda_function.rollupUsageFunction.arn
+}
+
+resource "aws_lambda_permission" "rollup_usage_schedule_permission" {
+  statement_id  = "AllowEventBridgeInvokeRollupUsage"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.rollupUsageFunction.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.rollupUsageRule.arn
+}
+
+# Bounds how long a machine stays finishing after its deadline without a sensor event
+resource "aws_cloudwatch_event_rule" "sweepTimedStatesRule" {
+  name                = "sweepTimedStatesRule"
+  description         = "Apply due timed machine state transitions"
+  schedule_expression = "rate(1 minute)"
+}
+
+resource "aws_cloudwatch_event_target" "sweepTimedStatesTarget" {
+  rule      = aws_cloudwatch_event_rule.sweepTimedStatesRule.name
+  target_id = "sweepTimedStatesTarget"
+  arn       = aws_lambda_function.sweepTimedStatesFunction.arn
+}
+
+resource "aws_lambda_permission" "sweep_timed_states_schedule_permission" {
+  statement_id  = "AllowEventBridgeInvokeSweepTimedStates"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.sweepTimedStatesFunction.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.sweepTimedStatesRule.arn
+}
+
+resource "aws_cloudwatch_event_rule" "profileCycleTimesRule" {
+  name                = "profileCycleTimesRule"
+  description         = "Update per-machine cycle-time profiles"
+  schedule_expression = "rate(1 hour)"
+}
+
+resource "aws_cloudwatch_event_target" "profileCycleTimesTarget" {
+  rule      = aws_cloudwatch_event_rule.profileCycleTimesRule.name
+  target_id = "profileCycleTimesTarget"
+  arn       = aws_lambda_function.profileCycleTimesFunction.arn
+}
+
+resource "aws_lambda_permission" "profile_cycle_times_schedule_permission" {
+  statement_id  = "AllowEventBridgeInvokeProfileCycleTimes"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.profileCycleTimesFunction.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.profileCycleTimesRule.arn
+}
@@ -7,6 +7,38 @@ resource "aws_dynamodb_table" "MachineStatusTable" {
     type = "S"
   }
 
+  attribute {
+    name = "building"
+    type = "S"
+  }
+
+  attribute {
+    name = "timed_state"
+    type = "S"
+  }
+
+  attribute {
+    name = "deadline"
+    type = "N"
+  }
+
+  # Per-building fetches and updates query this instead of scanning the fleet
+  global_secondary_index {
+    name            = "BuildingIndex"
+    hash_key        = "building"
+    range_key       = "machineID"
+    projection_type = "ALL"
+  }
+
+  # Sparse: only machines in a timed state (finishing) carry timed_state and
+  # deadline, so sweepTimedStatesFunction reads just the ones that are due
+  global_secondary_index {
+    name            = "DeadlineIndex"
+    hash_key        = "timed_state"
+    range_key       = "deadline"
+    projection_type = "KEYS_ONLY"
+  }
+
   tags = {
     Name        = "MachineStatusTable"
     Environment = "production"
@@ -86,6 +118,67 @@ resource "aws_dynamodb_table" "CameraDetectionData" {
   name         = "CameraDetectionData"
   billing_mode = "PAY_PER_REQUEST"
   hash_key     = "machine_id"
+  # "<zero-padded timestamp>#<camera_id>": one item per camera detection, in time order
+  range_key    = "detection_key"
+
+  attribute {
+    name = "machine_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "detection_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "ttl"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "CameraDetectionData"
+    Environment = "production"
+    Project     = "DLLM"
+    Owner       = "Nicholas"
+  }
+}
+
+# Per-minute and per-hour usage per machine, rolled up from VibrationData and CameraDetectionData
+resource "aws_dynamodb_table" "MachineUsageRollup" {
+  name         = var.MachineUsageRollup
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "machine_id"
+  range_key    = "bucket"
+
+  attribute {
+    name = "machine_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "bucket"
+    type = "S"
+  }
+
+  # Minute buckets expire; hour buckets are kept
+  ttl {
+    attribute_name = "ttl"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "MachineUsageRollup"
+    Environment = "production"
+    Project     = "DLLM"
+    Owner       = "Nicholas"
+  }
+}
+
+resource "aws_dynamodb_table" "MachineStateHistory" {
+  name         = var.MachineStateHistory
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "machine_id"
   range_key    = "timestamp"
 
   attribute {
@@ -98,15 +191,46 @@ resource "aws_dynamodb_table" "CameraDetectionData" {
     type = "N"
   }
 
+  # Transitions are kept for HISTORY_TTL_DAYS
   ttl {
     attribute_name = "ttl"
     enabled        = true
   }
 
   tags = {
-    Name        = "CameraDetectionData"
+    Name        = "MachineStateHistory"
     Environment = "production"
     Project     = "DLLM"
     Owner       = "Nicholas"
   }
-}
\ No newline at end of file
+}
+
+resource "aws_dynamodb_table" "MachineSubscriptions" {
+  name         = var.MachineSubscriptions
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "machine_id"
+  range_key    = "subscriber"
+
+  attribute {
+    name = "machine_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "subscriber"
+    type = "S"
+  }
+
+  # Subscriptions of closed connections expire on their own
+  ttl {
+    attribute_name = "ttl"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "MachineSubscriptions"
+    Environment = "production"
+    Project     = "DLLM"
+    Owner       = "Nicholas"
+  }
+}
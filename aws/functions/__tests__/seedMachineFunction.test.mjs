@@ -35,6 +35,11 @@ describe("seedMachineFunction handler", () => {
     expect(command.name).toBe("BatchWriteCommand");
     const requestItems = command.input.RequestItems.MachineStatusTable;
     expect(requestItems).toHaveLength(14);
+    expect(requestItems[0].PutRequest.Item).toMatchObject({
+      building: "RVREB",
+      device_type: "washer",
+      camera_id: "RVREB-cam1",
+    });
   });
 });
 
@@ -1,16 +1,21 @@
 import json
-import boto3
 import os
-from datetime import datetime, timezone, timedelta
-from decimal import Decimal
+from datetime import datetime, timedelta, timezone
+
+import boto3
+
+from profiling import profiled
+from serialization import dumps, iter_items
 
 dynamodb = boto3.resource('dynamodb')
+dynamodb_client = boto3.client('dynamodb')
 s3 = boto3.client('s3')
 
 TABLE_NAME = os.environ.get('VIBRATION_DATA_TABLE')
 BUCKET_NAME = os.environ.get('ARCHIVE_BUCKET_NAME')
 S3_KEY = os.environ.get('ARCHIVE_S3_KEY', 'archive/oldData.json') 
 
+@profiled
 def lambda_handler(event, context):
     table = dynamodb.Table(TABLE_NAME)
     
@@ -18,13 +23,13 @@ def lambda_handler(event, context):
     cutoff_time_utc = current_time_utc - timedelta(minutes=10)
     cutoff_iso = cutoff_time_utc.strftime('%Y-%m-%dT%H:%M:%SZ')  # ISO 8601 format
     
-    response = table.scan(
+    items_to_archive = list(iter_items(
+        dynamodb_client, 'scan',
+        TableName=TABLE_NAME,
         FilterExpression='#ts < :cutoff_time',
         ExpressionAttributeNames={'#ts': 'timestamp_value'},
-        ExpressionAttributeValues={':cutoff_time': cutoff_iso}
-    )
-    
-    items_to_archive = response.get('Items', [])
+        ExpressionAttributeValues={':cutoff_time': {'S': cutoff_iso}}
+    ))
     
     if not items_to_archive:
         print("No items older than 10 minutes to archive.")
@@ -47,7 +52,7 @@ def lambda_handler(event, context):
     s3.put_object(
         Bucket=BUCKET_NAME,
         Key=S3_KEY,
-        Body=json.dumps(existing_data, cls=DecimalEncoder)
+        Body=dumps(existing_data)
     )
     
     # Delete archived items from DynamoDB
@@ -65,9 +70,3 @@ def lambda_handler(event, context):
         'statusCode': 200,
         'body': json.dumps(f"Archived {total_archived} items to S3 and removed from DynamoDB.")
     }
-
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
@@ -1,9 +1,12 @@
 import boto3
 import time
 
+from profiling import profiled
+
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table('WebSocketConnections')
 
+@profiled
 def lambda_handler(event, context):
     connection_id = event['requestContext']['connectionId']
     
@@ -1,8 +1,11 @@
 import boto3
 
+from profiling import profiled
+
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table('WebSocketConnections')
 
+@profiled
 def lambda_handler(event, context):
     connection_id = event['requestContext']['connectionId']
     
@@ -1,45 +1,58 @@
-import boto3
 import json
 import os
-from decimal import Decimal
 
-dynamodb = boto3.resource('dynamodb')
-machine_status_table = dynamodb.Table(os.environ['MACHINE_STATUS_TABLE'])
+import boto3
+
+from profiling import profiled
+from serialization import http_response, iter_items, to_columnar
+from structured_log import log
+
+dynamodb_client = boto3.client('dynamodb')
+MACHINE_STATUS_TABLE = os.environ['MACHINE_STATUS_TABLE']
+BUILDING_INDEX = os.getenv('BUILDING_INDEX', 'BuildingIndex')
+DEFAULT_BUILDING = os.getenv('DEFAULT_BUILDING', 'RVREB')
+COLUMNAR_FIELDS = ['status', 'lastUpdated']
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj) if obj % 1 else int(obj)
-        return super(DecimalEncoder, self).default(obj)
+def get_params(event):
+    """Parameters from the URL query string, overridden by the WebSocket message body"""
+    params = dict(event.get('queryStringParameters') or {})
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except ValueError:
+        body = {}
+    if isinstance(body, dict):
+        params.update({k: v for k, v in body.items() if k in ('building', 'format', 'fields')})
+    return params
 
+@profiled
 def lambda_handler(event, context):
-    print(f"Received event: {json.dumps(event)}")
-    
+    event = event or {}
+    log.start(context)
+    log.event(event)
+    params = get_params(event)
+    building = params.get('building') or DEFAULT_BUILDING
+
     try:
-        items = []
-        response = machine_status_table.scan()
-        items.extend(response.get('Items', []))
-        
-        while 'LastEvaluatedKey' in response:
-            response = machine_status_table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            items.extend(response.get('Items', []))
-        
-        return {
-            'statusCode': 200,
-            'body': json.dumps({
-                'message': 'Machine status retrieved successfully',
-                'data': items  
-            }, cls=DecimalEncoder),  
-            'headers': {
-                'Content-Type': 'application/json'
-            }
-        }
+        items = list(iter_items(
+            dynamodb_client, 'query',
+            TableName=MACHINE_STATUS_TABLE,
+            IndexName=BUILDING_INDEX,
+            KeyConditionExpression='building = :building',
+            ExpressionAttributeValues={':building': {'S': building}}
+        ))
+
+        if params.get('format') == 'columnar':
+            # ?format=columnar&fields=status,lastUpdated for a compact shape without repeated keys
+            fields = params['fields'].split(',') if params.get('fields') else COLUMNAR_FIELDS
+            data = to_columnar(items, 'machineID', fields)
+        else:
+            data = items
+
+        return http_response(200, {
+            'message': 'Machine status retrieved successfully',
+            'building': building,
+            'data': data
+        }, event)
     except Exception as e:
-        print(f"Error fetching data from DynamoDB: {e}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'error': 'Failed to fetch machine status'}),
-            'headers': {
-                'Content-Type': 'application/json'
-            }
-        }
+        log.error("Error fetching data from DynamoDB: %s", e, building=building)
+        return http_response(500, {'error': 'Failed to fetch machine status'})
@@ -1,11 +1,14 @@
 import json
 import boto3
 
+from profiling import profiled
+
 # Initialize DynamoDB resource
 dynamodb = boto3.resource('dynamodb')
 table_name = "MachineStatusTable" 
 table = dynamodb.Table(table_name)
 
+@profiled
 def lambda_handler(event, context):
     try:
         if 'body' not in event:
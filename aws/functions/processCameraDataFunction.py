@@ -0,0 +1,194 @@
+import json
+import os
+import time
+from decimal import Decimal
+
+import boto3
+
+from profiling import profiled
+from structured_log import log
+
+dynamodb = boto3.resource('dynamodb')
+lambda_client = boto3.client('lambda')
+
+CAMERA_DETECTION_TABLE = os.getenv('CAMERA_DETECTION_TABLE', 'CameraDetectionData')
+STATE_MACHINE_FUNCTION = os.getenv('STATE_MACHINE_FUNCTION', 'updateMachineStateFunction')
+# Detections expire instead of being archived
+DETECTION_TTL_DAYS = int(os.getenv('DETECTION_TTL_DAYS', '7'))
+# For detections from edge versions that do not send their camera
+DEFAULT_CAMERA_ID = 'camera'
+BATCH_GET_LIMIT = 100
+
+
+@profiled
+def lambda_handler(event, context):
+    """
+    Stores camera detections (a single detection, a list, or
+    {"detections": [...]}) in CameraDetectionData and forwards them to
+    updateMachineStateFunction, once per machine per batch.
+
+    MQTT QoS 1 may deliver a detection more than once. A detection is
+    keyed by its camera, machine and millisecond timestamp and stored only
+    after the state machine has been invoked for it, so one batched read
+    tells which detections a redelivery has already forwarded, and each
+    detection costs a single write. A delivery that fails before its write
+    is forwarded again when it is redelivered.
+    """
+    log.start(context, source='camera')
+    log.event(event)
+    detections = extract_detections(event)
+    if not detections:
+        return {'statusCode': 400, 'body': json.dumps({'message': 'No detections with a machine_id'})}
+
+    try:
+        table = dynamodb.Table(CAMERA_DETECTION_TABLE)
+        pending = unforwarded_detections(table, detections)
+        forwarded = forward_detections(pending)
+        store_detections(table, pending)
+    except Exception as e:
+        log.error("Error processing camera data: %s", e, detections=len(detections))
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'message': 'Failed to process camera data', 'error': str(e)})
+        }
+
+    log.debug("Forwarded %d of %d detections for %d machines", len(pending), len(detections), forwarded)
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Camera data processed successfully',
+            'detections': len(detections),
+            'forwarded': len(pending),
+            'duplicates': len(detections) - len(pending),
+            'machines_forwarded': forwarded,
+        })
+    }
+
+
+def extract_detections(event):
+    """Normalise the event to a list of detections with machine_id and a Decimal timestamp"""
+    if isinstance(event, dict) and 'body' in event:
+        # Function URL / API Gateway request
+        try:
+            event = json.loads(event.get('body') or '{}')
+        except ValueError:
+            return []
+    if isinstance(event, list):
+        raw, shared = event, {}
+    elif isinstance(event, dict) and 'detections' in event:
+        raw = event['detections']
+        shared = {k: v for k, v in event.items() if k != 'detections'}
+    else:
+        raw, shared = [event], {}
+
+    now = time.time()
+    detections = []
+    for item in raw:
+        if not isinstance(item, dict):
+            continue
+        detection = {**shared, **item}
+        if not detection.get('machine_id'):
+            continue
+        try:
+            ts = float(detection.get('timestamp'))
+        except (TypeError, ValueError):
+            ts = now
+        # Millisecond precision, so a redelivery maps to the same key
+        detection['timestamp'] = Decimal(str(round(ts, 3)))
+        detection['camera_id'] = detection.get('camera_id') or DEFAULT_CAMERA_ID
+        detections.append(detection)
+    return detections
+
+
+def detection_key(timestamp, camera_id):
+    """
+    CameraDetectionData sort key: the zero-padded timestamp, so keys sort
+    (and range queries run) in time order, then the camera
+    """
+    return f"{timestamp:014.3f}#{camera_id}"
+
+
+def to_item(detection, expires_at):
+    return {
+        'machine_id': detection['machine_id'],
+        'detection_key': detection_key(detection['timestamp'], detection['camera_id']),
+        'timestamp': detection['timestamp'],
+        'camera_id': detection['camera_id'],
+        'device_type': detection.get('device_type', 'washer'),
+        'event_type': detection.get('event_type', 'person_detected'),
+        'is_bending': bool(detection.get('is_bending', False)),
+        'confidence': Decimal(str(detection.get('confidence', 0))),
+        'sensor_type': detection.get('sensor_type', 'camera'),
+        'ttl': expires_at  # This field is used for TTL
+    }
+
+
+def item_key(detection):
+    return {'machine_id': detection['machine_id'],
+            'detection_key': detection_key(detection['timestamp'], detection['camera_id'])}
+
+
+def unforwarded_detections(table, detections):
+    """
+    The distinct detections not yet stored (so not yet forwarded), in
+    timestamp order, from BatchGetItem reads of their keys
+    """
+    distinct = {}
+    for detection in detections:
+        key = item_key(detection)
+        distinct.setdefault((key['machine_id'], key['detection_key']), detection)
+
+    stored = set()
+    keys = [{'machine_id': machine_id, 'detection_key': key} for machine_id, key in distinct]
+    for i in range(0, len(keys), BATCH_GET_LIMIT):
+        request = {table.name: {'Keys': keys[i:i + BATCH_GET_LIMIT],
+                                'ProjectionExpression': 'machine_id, detection_key'}}
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            stored.update((item['machine_id'], item['detection_key'])
+                          for item in response['Responses'].get(table.name, []))
+            request = response.get('UnprocessedKeys')
+    return sorted((d for key, d in distinct.items() if key not in stored), key=lambda d: d['timestamp'])
+
+
+def store_detections(table, detections):
+    """
+    Write the forwarded detections. Puts of the same detection carry the
+    same item, so a concurrent redelivery writing it too changes nothing.
+    """
+    expires_at = int(time.time()) + DETECTION_TTL_DAYS * 86400
+    with table.batch_writer() as batch:
+        for detection in detections:
+            batch.put_item(Item=to_item(detection, expires_at))
+
+
+def detection_counts(detections):
+    """{epoch second: count} of the detections, so each is counted at its own time"""
+    counts = {}
+    for detection in detections:
+        second = str(int(detection['timestamp']))
+        counts[second] = counts.get(second, 0) + 1
+    return counts
+
+
+def forward_detections(detections):
+    """
+    Invoke the state machine once per machine with its latest high-confidence
+    bending detection (else its latest detection) and the detection counts
+    per second
+    """
+    by_machine = {}
+    for detection in detections:
+        by_machine.setdefault(detection['machine_id'], []).append(detection)
+
+    for machine_id, machine_detections in by_machine.items():
+        chosen = max(machine_detections, key=lambda d: (
+            bool(d.get('is_bending')) and float(d.get('confidence', 0)) > 0.7, d['timestamp']))
+        data = {k: v for k, v in chosen.items() if k != 'timestamp'}
+        data.update(timestamp=float(chosen['timestamp']), detections=detection_counts(machine_detections))
+        lambda_client.invoke(
+            FunctionName=STATE_MACHINE_FUNCTION,
+            InvocationType='Event',
+            Payload=json.dumps({'source': 'camera', 'data': data})
+        )
+    return len(by_machine)
@@ -1,15 +1,41 @@
 import json
+import os
+
 import boto3
-import joblib
-import pandas as pd
+import numpy as np
+
+from profiling import profiled
+from tree_arrays import predict
 
 s3 = boto3.client('s3')
 dynamodb = boto3.resource('dynamodb')
 
 table_name = "CameraImageJSON"
 bucket_name = "pretrained-model-dllm"
-model_key = "json_model.joblib"  
+# Tree arrays exported at training time (task_detection/tree_arrays.py)
+model_key = os.getenv('MODEL_KEY', 'json_model.npz')
+model_path = '/tmp/json_model.npz'
+
+# Loaded once per container
+_model = None
+
+
+def load_model():
+    global _model
+    if _model is None:
+        if not os.path.exists(model_path):
+            s3.download_file(bucket_name, model_key, model_path)
+        with np.load(model_path) as arrays:
+            _model = {name: arrays[name] for name in arrays.files}
+    return _model
+
+
+def keypoints_array(pose_keypoints):
+    """DynamoDB Decimal list straight to a float32 row"""
+    return np.fromiter((float(v) for v in pose_keypoints), dtype=np.float32, count=len(pose_keypoints))
+
 
+@profiled
 def lambda_handler(event, context):
     table = dynamodb.Table(table_name)
 
@@ -17,14 +43,14 @@ def lambda_handler(event, context):
         response = table.scan(
             ProjectionExpression="pose_keypoints_2d, timestamp_value",  # Ensure "timestamp" is an attribute
         )
-        
+
         items = sorted(response.get('Items', []), key=lambda x: x['timestamp_value'], reverse=True)
         if not items:
             return {
                 'statusCode': 400,
                 'body': "Error: No data found in CameraImageJSON table."
             }
-        
+
         latest_item = items[0]
         pose_keypoints = latest_item.get("pose_keypoints_2d", [])
     except Exception as e:
@@ -39,19 +65,23 @@ def lambda_handler(event, context):
             'body': "Error: 'pose_keypoints_2d' data not found or is empty."
         }
 
-    df = pd.DataFrame([pose_keypoints])
-
     try:
-        s3.download_file(bucket_name, model_key, '/tmp/json_model.joblib')
-        clf = joblib.load('/tmp/json_model.joblib')
+        model = load_model()
     except Exception as e:
         return {
             'statusCode': 500,
             'body': f"Error: Failed to load model from S3. {str(e)}"
         }
 
+    features = keypoints_array(pose_keypoints)
+    if len(features) != int(model['n_features']):
+        return {
+            'statusCode': 400,
+            'body': f"Error: expected {int(model['n_features'])} keypoint values, got {len(features)}."
+        }
+
     try:
-        prediction = clf.predict(df)
+        prediction = predict(model, features)
         return {
             'statusCode': 200,
             'body': json.dumps({"prediction": prediction.tolist()})
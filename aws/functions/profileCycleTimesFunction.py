@@ -0,0 +1,182 @@
+import json
+import math
+import os
+import time
+from datetime import UTC, datetime
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from profiling import profiled
+from structured_log import log
+
+dynamodb = boto3.resource('dynamodb')
+
+ROLLUP_TABLE = os.getenv('ROLLUP_TABLE', 'MachineUsageRollup')
+MACHINE_STATUS_TABLE = os.getenv('MACHINE_STATUS_TABLE', 'MachineStatusTable')
+
+# A minute counts as running when most of its readings were spinning; runs
+# separated by shorter pauses than CYCLE_GAP_SECONDS (soak, fill) are one cycle
+SPIN_RATIO_RUNNING = float(os.getenv('SPIN_RATIO_RUNNING', '0.5'))
+CYCLE_GAP_SECONDS = int(os.getenv('CYCLE_GAP_SECONDS', str(5 * 60)))
+MIN_CYCLE_SECONDS = int(os.getenv('MIN_CYCLE_SECONDS', str(10 * 60)))
+MAX_CYCLE_SECONDS = int(os.getenv('MAX_CYCLE_SECONDS', str(4 * 3600)))
+# Cycles kept per machine, and needed before a profile is published
+MAX_CYCLES = int(os.getenv('PROFILE_MAX_CYCLES', '50'))
+MIN_CYCLES = int(os.getenv('PROFILE_MIN_CYCLES', '5'))
+# First run reads back this far (minute rows expire after 30 days)
+INITIAL_LOOKBACK_SECONDS = int(os.getenv('PROFILE_INITIAL_LOOKBACK_SECONDS', str(30 * 86400)))
+
+ROLLUP_WATERMARK_KEY = {'machine_id': '__rollup__', 'bucket': 'watermark'}
+CYCLES_BUCKET = 'cycles'
+# Pooled per-device-type profiles, read by updateMachineStateFunction
+PROFILE_ITEM_ID = '__profile__'
+
+
+def minute_bucket(epoch):
+    return 'minute#' + datetime.fromtimestamp(epoch, UTC).strftime('%Y-%m-%dT%H:%M')
+
+
+def percentile(values, q):
+    """Linearly interpolated percentile (0 <= q <= 1) of a non-empty list"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low, high = math.floor(position), math.ceil(position)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def to_profile(durations, now):
+    return {
+        'p10': int(percentile(durations, 0.1)),
+        'p50': int(percentile(durations, 0.5)),
+        'p90': int(percentile(durations, 0.9)),
+        'samples': len(durations),
+        'updated_at': int(now),
+    }
+
+
+@profiled
+def lambda_handler(event, context):
+    """
+    Learns each machine's cycle-duration distribution from its
+    MachineUsageRollup minute rows and publishes p10/p50/p90 as
+    cycle_profile on its MachineStatusTable item, plus a pooled profile per
+    device type for machines without enough history.
+
+    The pass is incremental: each machine's recent cycle durations and any
+    cycle still running are kept on a "cycles" row in MachineUsageRollup
+    with the minute it has been read up to, so a run only reads the minutes
+    rolled up since the last one.
+    """
+    log.start(context, source='profile')
+    rollup_table = dynamodb.Table(ROLLUP_TABLE)
+    status_table = dynamodb.Table(MACHINE_STATUS_TABLE)
+    now = time.time()
+
+    try:
+        # Never read past the minutes rollupUsageFunction has settled (will not re-roll)
+        watermark = rollup_table.get_item(Key=ROLLUP_WATERMARK_KEY).get('Item')
+        end = int(watermark.get('settled', watermark['watermark'])) if watermark else int(now) // 60 * 60
+        pooled = {}
+        published = 0
+        for machine in list_machines(status_table):
+            state = update_cycles(rollup_table, machine['machineID'], end, now)
+            pooled.setdefault(machine.get('device_type', 'washer'), []).extend(state['durations'])
+            if len(state['durations']) >= MIN_CYCLES:
+                published += publish_machine_profile(status_table, machine['machineID'],
+                                                     to_profile(state['durations'], now))
+        for device_type, durations in pooled.items():
+            if len(durations) >= MIN_CYCLES:
+                rollup_table.put_item(Item={'machine_id': PROFILE_ITEM_ID, 'bucket': f"device#{device_type}",
+                                            **to_profile(durations, now)})
+    except Exception as e:
+        log.error("Error profiling cycle times: %s", e)
+        return {'statusCode': 500, 'body': json.dumps({'message': 'Cycle profiling failed', 'error': str(e)})}
+
+    log.info("Published %d machine cycle profiles", published, device_types=sorted(pooled))
+    return {'statusCode': 200, 'body': json.dumps({'end': end, 'machine_profiles': published})}
+
+
+def list_machines(table):
+    kwargs = {'ProjectionExpression': 'machineID, device_type'}
+    while True:
+        response = table.scan(**kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def update_cycles(table, machine_id, end, now):
+    """Extend one machine's cycle history with the minutes rolled up since the last pass"""
+    item = table.get_item(Key={'machine_id': machine_id, 'bucket': CYCLES_BUCKET}).get('Item') or {}
+    state = {
+        'durations': [int(d) for d in item.get('durations', [])],
+        'scanned_until': int(item.get('scanned_until', int(now - INITIAL_LOOKBACK_SECONDS) // 60 * 60)),
+        'run_start': int(item['run_start']) if 'run_start' in item else None,
+        'run_last': int(item['run_last']) if 'run_last' in item else None,
+    }
+    if state['scanned_until'] >= end:
+        return state
+
+    for minute in running_minutes(table, machine_id, state['scanned_until'], end):
+        if state['run_start'] is not None and minute - state['run_last'] <= CYCLE_GAP_SECONDS:
+            state['run_last'] = minute
+            continue
+        close_run(state)
+        state['run_start'] = state['run_last'] = minute
+    # A run with no spinning for longer than the gap has ended
+    if state['run_start'] is not None and end - state['run_last'] > CYCLE_GAP_SECONDS:
+        close_run(state)
+    state['scanned_until'] = end
+
+    row = {'machine_id': machine_id, 'bucket': CYCLES_BUCKET, 'durations': state['durations'],
+           'scanned_until': end, 'updated_at': int(now)}
+    if state['run_start'] is not None:
+        row.update(run_start=state['run_start'], run_last=state['run_last'])
+    table.put_item(Item=row)
+    return state
+
+
+def close_run(state):
+    if state['run_start'] is None:
+        return
+    duration = state['run_last'] + 60 - state['run_start']
+    if MIN_CYCLE_SECONDS <= duration <= MAX_CYCLE_SECONDS:
+        state['durations'] = (state['durations'] + [duration])[-MAX_CYCLES:]
+    state['run_start'] = state['run_last'] = None
+
+
+def running_minutes(table, machine_id, start, end):
+    """Start of each minute in [start, end) in which the machine was spinning, in order"""
+    kwargs = {
+        'KeyConditionExpression': Key('machine_id').eq(machine_id) & Key('bucket').between(
+            minute_bucket(start), minute_bucket(end - 60)),
+        'ProjectionExpression': 'bucket_start, spin_ratio, vibration_readings',
+    }
+    while True:
+        response = table.query(**kwargs)
+        for item in response.get('Items', []):
+            if int(item.get('vibration_readings', 0)) and float(item.get('spin_ratio', 0)) > SPIN_RATIO_RUNNING:
+                yield int(item['bucket_start'])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def publish_machine_profile(table, machine_id, profile):
+    """Store the profile on the machine item (never creating one); returns 1 if stored"""
+    try:
+        table.update_item(
+            Key={'machineID': machine_id},
+            UpdateExpression='SET cycle_profile = :profile',
+            ConditionExpression='attribute_exists(machineID)',
+            ExpressionAttributeValues={':profile': {k: Decimal(v) for k, v in profile.items()}}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return 0
+    return 1
@@ -0,0 +1,261 @@
+"""
+Opt-in profiling for the Lambda handlers.
+
+Wrap a handler with ``@profiled`` to record, for sampled invocations, the
+handler wall time (plus, on a cold start, the time from process start to
+the first invocation as InitDuration), the DynamoDB calls made and the
+capacity they consumed. ReturnConsumedCapacity is requested on every
+DynamoDB data-plane call through botocore event hooks, so the handlers
+themselves are unchanged. Results are written as CloudWatch Embedded Metric
+Format log lines, which CloudWatch turns into metrics without any API calls.
+
+Configuration (read once per container):
+
+    LAMBDA_PROFILE=1                  profile every invocation
+    LAMBDA_PROFILE_SAMPLE_RATE=0.05   or a fraction of them (cold starts always)
+    LAMBDA_PROFILE_CAPTURE=cprofile   also run cProfile ('tracemalloc' for
+                                      allocations) and log the top entries
+                                      for the slowest invocations
+    LAMBDA_PROFILE_SLOW_PERCENTILE=95 what counts as slowest
+    LAMBDA_PROFILE_NAMESPACE          EMF namespace (default DLLM/Lambda)
+
+With none of these set, ``profiled`` returns the handler unchanged and no
+hooks are installed, so disabled profiling costs nothing per invocation.
+
+Packaged next to each handler that uses it (see the archive_file sources in
+lambda.tf). Clients must be created after this module is imported, which
+the usual import order at the top of a handler guarantees.
+"""
+
+import cProfile
+import functools
+import json
+import os
+import pstats
+import random
+import time
+import tracemalloc
+from collections import deque
+
+import boto3
+
+
+
+def process_age():
+    """Seconds since this process started, from /proc; None where it is unavailable"""
+    try:
+        with open('/proc/self/stat') as f:
+            # The command name (field 2) may contain spaces; starttime is field 22
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+
+
+# The runtime start-up and the handler's imports happen before this module
+# is loaded, so InitDuration adds the process age at load (clock-tick
+# resolution); without /proc it covers only the time since this import.
+_LOADED_AT = time.perf_counter()
+_AGE_AT_LOAD = process_age() or 0.0
+
+SAMPLE_RATE = 1.0 if os.getenv('LAMBDA_PROFILE', '').lower() in ('1', 'true', 'yes') else float(
+    os.getenv('LAMBDA_PROFILE_SAMPLE_RATE', '0'))
+CAPTURE = os.getenv('LAMBDA_PROFILE_CAPTURE', '').lower()
+SLOW_PERCENTILE = float(os.getenv('LAMBDA_PROFILE_SLOW_PERCENTILE', '95'))
+NAMESPACE = os.getenv('LAMBDA_PROFILE_NAMESPACE', 'DLLM/Lambda')
+ENABLED = SAMPLE_RATE > 0
+
+# Durations kept per container to decide what is slow, and how many are
+# needed before a capture is taken
+HISTORY_SIZE = 200
+MIN_HISTORY = 20
+TOP_ENTRIES = 15
+
+# DynamoDB operations that accept ReturnConsumedCapacity
+CAPACITY_OPERATIONS = frozenset({
+    'GetItem', 'PutItem', 'UpdateItem', 'DeleteItem', 'Query', 'Scan',
+    'BatchGetItem', 'BatchWriteItem', 'TransactGetItems', 'TransactWriteItems',
+})
+_HOOK_ID = 'profiling-consumed-capacity'
+
+
+class _Invocation:
+    __slots__ = ('calls', 'capacity', 'tables')
+
+    def __init__(self):
+        self.calls = 0
+        self.capacity = 0.0
+        self.tables = {}
+
+
+# The sampled invocation in progress, if any; the hooks do nothing otherwise
+_active = None
+_cold = True
+_durations = deque(maxlen=HISTORY_SIZE)
+
+
+def _print_writer(record):
+    print(json.dumps(record, separators=(',', ':')))
+
+
+class LocalWriter:
+    """Collects records in memory instead of logging them (for tests)"""
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+
+_writer = _print_writer
+
+
+def set_writer(writer):
+    """Send records to writer(record) instead of stdout; returns the previous writer"""
+    global _writer
+    previous, _writer = _writer, writer
+    return previous
+
+
+def _request_capacity(params, model, **kwargs):
+    if _active is not None and model.name in CAPACITY_OPERATIONS:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def _record_capacity(parsed, **kwargs):
+    if _active is None:
+        return
+    _active.calls += 1
+    consumed = parsed.get('ConsumedCapacity') or []
+    for entry in [consumed] if isinstance(consumed, dict) else consumed:
+        units = float(entry.get('CapacityUnits', 0))
+        table = entry.get('TableName', 'unknown')
+        _active.capacity += units
+        _active.tables[table] = _active.tables.get(table, 0.0) + units
+
+
+def install_hooks(session=None):
+    """Register the capacity hooks on a boto3 session (the default one if omitted)"""
+    if session is None:
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+        session = boto3.DEFAULT_SESSION
+    uninstall_hooks(session)
+    session.events.register('provide-client-params.dynamodb', _request_capacity, unique_id=_HOOK_ID + '-request')
+    session.events.register('after-call.dynamodb', _record_capacity, unique_id=_HOOK_ID + '-record')
+
+
+def uninstall_hooks(session=None):
+    session = session or boto3.DEFAULT_SESSION
+    if session is None:
+        return
+    session.events.unregister('provide-client-params.dynamodb', unique_id=_HOOK_ID + '-request')
+    session.events.unregister('after-call.dynamodb', unique_id=_HOOK_ID + '-record')
+
+
+def _is_slow(duration_ms):
+    if len(_durations) < MIN_HISTORY:
+        return False
+    ordered = sorted(_durations)
+    return duration_ms >= ordered[int(SLOW_PERCENTILE / 100 * (len(ordered) - 1))]
+
+
+def _cprofile_entries(profiler):
+    stats = pstats.Stats(profiler).sort_stats('cumulative')
+    entries = []
+    for key in stats.fcn_list[:TOP_ENTRIES]:
+        filename, line, name = key
+        _, calls, total, cumulative, _ = stats.stats[key]
+        entries.append({
+            'function': f"{os.path.basename(filename)}:{line}({name})",
+            'calls': calls,
+            'total_ms': round(total * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        })
+    return entries
+
+
+def _tracemalloc_entries(snapshot):
+    return [{
+        'location': f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+        'size_kb': round(stat.size / 1024, 1),
+        'count': stat.count,
+    } for stat in snapshot.statistics('lineno')[:TOP_ENTRIES]]
+
+
+def _emit(function_name, context, started, duration_ms, invocation, cold, error, capture):
+    metrics = [
+        {'Name': 'HandlerDuration', 'Unit': 'Milliseconds'},
+        {'Name': 'DynamoDBCalls', 'Unit': 'Count'},
+        {'Name': 'ConsumedCapacity', 'Unit': 'Count'},
+    ]
+    record = {
+        'FunctionName': function_name,
+        'HandlerDuration': round(duration_ms, 3),
+        'DynamoDBCalls': invocation.calls,
+        'ConsumedCapacity': round(invocation.capacity, 3),
+        'CapacityByTable': invocation.tables,
+        'ColdStart': cold,
+        'Error': error,
+        'RequestId': getattr(context, 'aws_request_id', None),
+    }
+    if cold:
+        metrics.append({'Name': 'InitDuration', 'Unit': 'Milliseconds'})
+        record['InitDuration'] = round((_AGE_AT_LOAD + started - _LOADED_AT) * 1000, 3)
+    if capture:
+        record['Profile'] = capture
+    record['_aws'] = {
+        'Timestamp': int(time.time() * 1000),
+        'CloudWatchMetrics': [{'Namespace': NAMESPACE, 'Dimensions': [['FunctionName']], 'Metrics': metrics}],
+    }
+    _writer(record)
+
+
+def profiled(handler):
+    """Decorate a lambda_handler; a no-op unless profiling is enabled"""
+    if not ENABLED:
+        return handler
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        global _active, _cold
+        cold, _cold = _cold, False
+        if not cold and random.random() >= SAMPLE_RATE:
+            return handler(event, context)
+
+        function_name = getattr(context, 'function_name', None) or os.getenv(
+            'AWS_LAMBDA_FUNCTION_NAME', handler.__module__)
+        invocation = _active = _Invocation()
+        profiler = cProfile.Profile() if CAPTURE == 'cprofile' else None
+        if CAPTURE == 'tracemalloc':
+            tracemalloc.start()
+        error = False
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                return profiler.runcall(handler, event, context)
+            return handler(event, context)
+        except Exception:
+            error = True
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            _active = None
+            capture = None
+            if CAPTURE == 'tracemalloc':
+                if _is_slow(duration_ms):
+                    capture = _tracemalloc_entries(tracemalloc.take_snapshot())
+                tracemalloc.stop()
+            elif profiler is not None and _is_slow(duration_ms):
+                capture = _cprofile_entries(profiler)
+            _durations.append(duration_ms)
+            _emit(function_name, context, started, duration_ms, invocation, cold, error, capture)
+
+    return wrapper
+
+
+if ENABLED:
+    install_hooks()
@@ -0,0 +1,112 @@
+import os
+import time
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from profiling import profiled
+from serialization import http_response, parse_time
+from structured_log import log
+
+dynamodb = boto3.resource('dynamodb')
+history_table = dynamodb.Table(os.getenv('HISTORY_TABLE', 'MachineStateHistory'))
+
+MAX_RANGE_SECONDS = int(os.getenv('MAX_RANGE_SECONDS', str(93 * 86400)))
+MAX_TRANSITIONS = int(os.getenv('MAX_TRANSITIONS', '1000'))
+# A cycle is at most in-use -> finishing -> ready-to-unload -> available,
+# so its start is always within this many of the latest transitions
+CYCLE_LOOKBACK = 8
+STATE_AVAILABLE = "available"
+STATE_IN_USE = "in-use"
+
+
+def public(item):
+    return {k: v for k, v in item.items() if k not in ('machine_id', 'ttl')}
+
+
+def transitions_between(machine_id, start, end):
+    """Transitions of one machine in [start, end], oldest first, from a single key-range query"""
+    kwargs = {
+        'KeyConditionExpression': Key('machine_id').eq(machine_id) & Key('timestamp').between(
+            Decimal(str(start)), Decimal(str(end))),
+    }
+    items = []
+    while len(items) < MAX_TRANSITIONS:
+        response = history_table.query(Limit=MAX_TRANSITIONS - len(items), **kwargs)
+        items.extend(public(item) for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return items
+
+
+def current_cycle(machine_id):
+    """
+    The machine's latest transition and, when a cycle is under way (no
+    return to available since), the transition that started it
+    """
+    items = history_table.query(
+        KeyConditionExpression=Key('machine_id').eq(machine_id),
+        ScanIndexForward=False,
+        Limit=CYCLE_LOOKBACK
+    ).get('Items', [])
+    cycle_start = None
+    for item in items:
+        if item['to_state'] == STATE_AVAILABLE:
+            break
+        if item['to_state'] == STATE_IN_USE:
+            cycle_start = public(item)
+            break
+    return {
+        'latest': public(items[0]) if items else None,
+        'cycle_start': cycle_start,
+    }
+
+
+@profiled
+def lambda_handler(event, context):
+    """
+    State transitions from MachineStateHistory.
+
+    Query string: machine_id, and either start and end (epoch seconds or
+    ISO 8601; default the last 24 hours) for the transitions in that range,
+    or view=cycle for the start of the machine's current cycle. Either is a
+    single query on the machine's partition.
+    """
+    log.start(context)
+    event = event or {}
+    params = event.get('queryStringParameters') or {}
+    machine_id = params.get('machine_id')
+    if not machine_id:
+        return http_response(400, {'error': 'machine_id is required'})
+    log.bind(machine_id=machine_id)
+
+    if params.get('view') == 'cycle':
+        try:
+            return http_response(200, {'machine_id': machine_id, **current_cycle(machine_id)}, event)
+        except Exception as e:
+            log.error("Error querying current cycle: %s", e)
+            return http_response(500, {'error': 'Failed to query machine history'})
+
+    try:
+        end = parse_time(params['end']) if params.get('end') else time.time()
+        start = parse_time(params['start']) if params.get('start') else end - 86400
+    except ValueError:
+        return http_response(400, {'error': 'start and end must be epoch seconds or ISO 8601'})
+    if start > end or end - start > MAX_RANGE_SECONDS:
+        return http_response(400, {'error': 'Invalid time range'})
+
+    try:
+        transitions = transitions_between(machine_id, start, end)
+    except Exception as e:
+        log.error("Error querying machine history: %s", e, start=int(start), end=int(end))
+        return http_response(500, {'error': 'Failed to query machine history'})
+
+    return http_response(200, {
+        'machine_id': machine_id,
+        'start': int(start),
+        'end': int(end),
+        'transitions': transitions,
+        'truncated': len(transitions) >= MAX_TRANSITIONS,
+    }, event)
@@ -0,0 +1,98 @@
+import os
+import time
+from datetime import UTC, datetime
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from profiling import profiled
+from serialization import http_response, parse_time
+from structured_log import log
+
+dynamodb = boto3.resource('dynamodb')
+rollup_table = dynamodb.Table(os.getenv('ROLLUP_TABLE', 'MachineUsageRollup'))
+
+# Ranges longer than this are served from hour buckets unless a granularity is given
+MINUTE_RANGE_LIMIT_SECONDS = int(os.getenv('MINUTE_RANGE_LIMIT_SECONDS', str(6 * 3600)))
+MAX_RANGE_SECONDS = int(os.getenv('MAX_RANGE_SECONDS', str(93 * 86400)))
+BUCKET_FORMATS = {'minute': '%Y-%m-%dT%H:%M', 'hour': '%Y-%m-%dT%H'}
+
+
+def bucket_key(granularity, epoch):
+    return f"{granularity}#{datetime.fromtimestamp(epoch, UTC).strftime(BUCKET_FORMATS[granularity])}"
+
+
+def query_buckets(machine_id, granularity, start, end):
+    """Rollup rows for one machine in [start, end], oldest first"""
+    kwargs = {'KeyConditionExpression': Key('machine_id').eq(machine_id) & Key('bucket').between(
+        bucket_key(granularity, start), bucket_key(granularity, end))}
+    items = []
+    while True:
+        result = rollup_table.query(**kwargs)
+        items.extend(result.get('Items', []))
+        if 'LastEvaluatedKey' not in result:
+            return items
+        kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+
+def summarise(items):
+    readings = sum(int(item.get('vibration_readings', 0)) for item in items)
+    spin = sum(float(item.get('spin_ratio', 0)) * int(item.get('vibration_readings', 0)) for item in items)
+    return {
+        'active_minutes': sum(int(item.get('active_minutes', 0)) for item in items),
+        'vibration_readings': readings,
+        'spin_ratio': round(spin / readings, 4) if readings else 0,
+        'camera_detections': sum(int(item.get('camera_detections', 0)) for item in items),
+        'bending_detections': sum(int(item.get('bending_detections', 0)) for item in items),
+    }
+
+
+@profiled
+def lambda_handler(event, context):
+    """
+    Usage for one or more machines over a time range, from MachineUsageRollup.
+
+    Query string: machine_id (comma-separated for several), start and end
+    (epoch seconds or ISO 8601; default the last 24 hours) and optionally
+    granularity=minute|hour. Every machine is served by a single key-range
+    query, never a scan.
+    """
+    log.start(context)
+    event = event or {}
+    params = event.get('queryStringParameters') or {}
+    machine_ids = [m for m in (params.get('machine_id') or '').split(',') if m]
+    if not machine_ids:
+        return http_response(400, {'error': 'machine_id is required'})
+
+    try:
+        end = parse_time(params['end']) if params.get('end') else time.time()
+        start = parse_time(params['start']) if params.get('start') else end - 86400
+    except ValueError:
+        return http_response(400, {'error': 'start and end must be epoch seconds or ISO 8601'})
+    if start > end or end - start > MAX_RANGE_SECONDS:
+        return http_response(400, {'error': 'Invalid time range'})
+
+    granularity = params.get('granularity') or (
+        'minute' if end - start <= MINUTE_RANGE_LIMIT_SECONDS else 'hour')
+    if granularity not in BUCKET_FORMATS:
+        return http_response(400, {'error': 'granularity must be minute or hour'})
+
+    try:
+        machines = {}
+        for machine_id in machine_ids:
+            items = query_buckets(machine_id, granularity, start, end)
+            machines[machine_id] = {
+                'summary': summarise(items),
+                'buckets': [{k: v for k, v in item.items() if k not in ('machine_id', 'ttl', 'rolled_up_at')}
+                            for item in items],
+            }
+    except Exception as e:
+        log.error("Error querying usage rollups: %s", e, start=int(start), end=int(end))
+        return http_response(500, {'error': 'Failed to query machine usage'})
+
+    return http_response(200, {
+        'start': int(start),
+        'end': int(end),
+        'granularity': granularity,
+        'machines': machines,
+    }, event)
@@ -0,0 +1,273 @@
+import json
+import math
+import os
+import time
+from datetime import UTC, datetime
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.conditions import Attr, Key
+
+from profiling import profiled
+from structured_log import log
+
+dynamodb = boto3.resource('dynamodb')
+
+ROLLUP_TABLE = os.getenv('ROLLUP_TABLE', 'MachineUsageRollup')
+VIBRATION_TABLE = os.getenv('VIBRATION_DATA_TABLE', 'VibrationData')
+CAMERA_DETECTION_TABLE = os.getenv('CAMERA_DETECTION_TABLE', 'CameraDetectionData')
+MACHINE_STATUS_TABLE = os.getenv('MACHINE_STATUS_TABLE', 'MachineStatusTable')
+
+# Minutes newer than this are left for the next run, so storeDataFunction has flushed them
+LAG_SECONDS = int(os.getenv('ROLLUP_LAG_SECONDS', '120'))
+# archiveOldDataFunction deletes VibrationData rows older than 10 minutes;
+# minutes before that can no longer be recomputed from source
+VIBRATION_RETENTION_SECONDS = int(os.getenv('VIBRATION_RETENTION_SECONDS', '600'))
+# storeDataFunction flushes a window only when a later reading reaches the
+# same container, so every run also re-rolls this many seconds behind the
+# watermark to pick up windows written late. LAG_SECONDS + REROLL_SECONDS
+# must stay inside VIBRATION_RETENTION_SECONDS, or a re-roll would
+# overwrite minutes with partial data.
+REROLL_SECONDS = int(os.getenv('ROLLUP_REROLL_SECONDS', '420'))
+# storeDataFunction's WINDOW_SECONDS (both are set from one Terraform variable)
+VIBRATION_WINDOW_SECONDS = int(os.getenv('VIBRATION_WINDOW_SECONDS', '60'))
+# Bounds one run; a job that fell behind catches up over several runs
+MAX_MINUTES_PER_RUN = int(os.getenv('ROLLUP_MAX_MINUTES', '60'))
+# Where to start when there is no watermark yet (VibrationData is archived after 10 minutes)
+INITIAL_LOOKBACK_SECONDS = int(os.getenv('ROLLUP_INITIAL_LOOKBACK_SECONDS', '600'))
+MINUTE_TTL_DAYS = int(os.getenv('ROLLUP_MINUTE_TTL_DAYS', '30'))
+
+WATERMARK_KEY = {'machine_id': '__rollup__', 'bucket': 'watermark'}
+SUM_FIELDS = ('vibration_readings', 'spin_readings', 'magnitude_sum', 'magnitude_count',
+              'camera_detections', 'bending_detections', 'active_minutes')
+
+
+def minute_bucket(epoch):
+    return 'minute#' + datetime.fromtimestamp(epoch, UTC).strftime('%Y-%m-%dT%H:%M')
+
+
+def hour_bucket(epoch):
+    return 'hour#' + datetime.fromtimestamp(epoch, UTC).strftime('%Y-%m-%dT%H')
+
+
+@profiled
+def lambda_handler(event, context):
+    """
+    Rolls raw VibrationData windows and CameraDetectionData detections up into
+    per-minute and per-hour MachineUsageRollup rows per machine.
+
+    Each run covers whole minutes from the stored high-watermark up to
+    now - LAG_SECONDS, plus the REROLL_SECONDS before it again (or an
+    explicit {"start": epoch, "end": epoch} range for backfills). Buckets
+    are recomputed from source and overwritten, so re-running a range is
+    harmless; the watermark only moves forward after the rows are written,
+    and records up to where minutes are settled (will not be re-rolled).
+    A backfill starting before VIBRATION_RETENTION_SECONDS ago is refused,
+    since its minutes would be overwritten without their archived vibration.
+    """
+    log.start(context, source='rollup')
+    rollup_table = dynamodb.Table(ROLLUP_TABLE)
+    event = event or {}
+    now = time.time()
+
+    if 'start' in event:
+        start = int(event['start']) // 60 * 60
+        end = int(event.get('end', now - LAG_SECONDS)) // 60 * 60
+        earliest = math.ceil((now - VIBRATION_RETENTION_SECONDS) / 60) * 60
+        if start < earliest:
+            log.warning("Refusing backfill from %d, before VibrationData retention", start,
+                        start=start, end=end, earliest_start=earliest)
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'message': 'Backfill starts before VibrationData retention',
+                                    'earliest_start': earliest})
+            }
+        advance_watermark = False
+    else:
+        watermark = read_watermark(rollup_table, now)
+        end = min(int(now - LAG_SECONDS) // 60 * 60, watermark + MAX_MINUTES_PER_RUN * 60)
+        start = min(watermark, end - REROLL_SECONDS // 60 * 60)
+        advance_watermark = True
+
+    if start >= end:
+        return {'statusCode': 200, 'body': json.dumps({'message': 'Nothing to roll up', 'watermark': start})}
+
+    try:
+        minutes = collect_vibration(start, end)
+        collect_detections(minutes, list_machines(), start, end)
+        written = write_minutes(rollup_table, minutes)
+        hours = write_hours(rollup_table, {(machine_id, m // 3600 * 3600) for machine_id, m in minutes})
+        if advance_watermark:
+            store_watermark(rollup_table, end)
+    except Exception as e:
+        log.error("Error rolling up usage: %s", e, start=start, end=end)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'message': 'Rollup failed', 'error': str(e)})
+        }
+
+    log.info("Rolled up %d minute rows, %d hour rows", written, hours, start=start, end=end)
+    return {
+        'statusCode': 200,
+        'body': json.dumps({'start': start, 'end': end, 'minute_rows': written, 'hour_rows': hours})
+    }
+
+
+def read_watermark(table, now):
+    item = table.get_item(Key=WATERMARK_KEY).get('Item')
+    if item:
+        return int(item['watermark'])
+    return int(now - INITIAL_LOOKBACK_SECONDS) // 60 * 60
+
+
+def store_watermark(table, end):
+    """
+    Move the watermark forward; a slower concurrent run can never move it
+    back. Minutes before settled are never rewritten by a scheduled run, so
+    profileCycleTimesFunction reads only up to there.
+    """
+    try:
+        table.put_item(
+            Item={**WATERMARK_KEY, 'watermark': end, 'settled': end - REROLL_SECONDS // 60 * 60,
+                  'updated_at': int(time.time())},
+            ConditionExpression=Attr('watermark').not_exists() | Attr('watermark').lte(end)
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        log.info("Watermark already at or beyond %d", end)
+
+
+def list_machines():
+    table = dynamodb.Table(MACHINE_STATUS_TABLE)
+    response = table.scan(ProjectionExpression='machineID')
+    machines = [item['machineID'] for item in response.get('Items', [])]
+    while 'LastEvaluatedKey' in response:
+        response = table.scan(ProjectionExpression='machineID', ExclusiveStartKey=response['LastEvaluatedKey'])
+        machines.extend(item['machineID'] for item in response.get('Items', []))
+    return machines
+
+
+def empty_minute():
+    return {'vibration_readings': 0, 'spin_readings': 0, 'magnitude_sum': 0.0, 'magnitude_count': 0,
+            'magnitude_peak': None, 'camera_detections': 0, 'bending_detections': 0}
+
+
+def window_starts(start, end):
+    """(window start, minute) for every storeDataFunction window starting in [start, end)"""
+    window = VIBRATION_WINDOW_SECONDS
+    for window_start in range(math.ceil(start / window) * window, end, window):
+        yield window_start, window_start // 60 * 60
+
+
+def collect_vibration(start, end):
+    """
+    Per (machine_id, minute) vibration totals. VibrationData is keyed by
+    window start, so each window starting in a minute is a single-partition
+    query. Rows written per reading (before windowing) count as one reading
+    each.
+    """
+    table = dynamodb.Table(VIBRATION_TABLE)
+    minutes = {}
+    for window_start, minute in window_starts(start, end):
+        kwargs = {'KeyConditionExpression': Key('timestamp_value').eq(
+            datetime.fromtimestamp(window_start, UTC).strftime('%Y-%m-%dT%H:%M:%SZ'))}
+        while True:
+            response = table.query(**kwargs)
+            for item in response.get('Items', []):
+                totals = minutes.setdefault((item['machine_id'], minute), empty_minute())
+                readings = int(item.get('reading_count', 1))
+                totals['vibration_readings'] += readings
+                totals['spin_readings'] += float(item.get('spin_count', item.get('is_spinning', 0)))
+                if 'magnitude_sum' in item:
+                    totals['magnitude_sum'] += float(item['magnitude_sum'])
+                    totals['magnitude_count'] += int(item['magnitude_count'])
+                if 'magnitude_peak' in item:
+                    peak = float(item['magnitude_peak'])
+                    totals['magnitude_peak'] = peak if totals['magnitude_peak'] is None else max(
+                        totals['magnitude_peak'], peak)
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return minutes
+
+
+def detection_key_prefix(epoch):
+    """Where CameraDetectionData sort keys at epoch start (processCameraDataFunction.detection_key)"""
+    return f"{epoch:014.3f}"
+
+
+def collect_detections(minutes, machines, start, end):
+    """Add camera detections per (machine_id, minute), one range query per machine"""
+    table = dynamodb.Table(CAMERA_DETECTION_TABLE)
+    for machine_id in machines:
+        kwargs = {'KeyConditionExpression': Key('machine_id').eq(machine_id) & Key('detection_key').between(
+            detection_key_prefix(start), detection_key_prefix(end))}
+        while True:
+            response = table.query(**kwargs)
+            for item in response.get('Items', []):
+                ts = float(item['timestamp'])
+                if ts >= end:
+                    continue
+                totals = minutes.setdefault((machine_id, int(ts) // 60 * 60), empty_minute())
+                totals['camera_detections'] += 1
+                totals['bending_detections'] += int(bool(item.get('is_bending')))
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def to_item(machine_id, bucket, bucket_start, granularity, totals):
+    readings = totals['vibration_readings']
+    item = {
+        'machine_id': machine_id,
+        'bucket': bucket,
+        'bucket_start': bucket_start,
+        'granularity': granularity,
+        'spin_ratio': Decimal(str(round(totals['spin_readings'] / readings, 4))) if readings else Decimal(0),
+        'rolled_up_at': int(time.time()),
+    }
+    for name in SUM_FIELDS:
+        if name in totals:
+            value = totals[name]
+            item[name] = Decimal(str(round(value, 4))) if isinstance(value, float) else int(value)
+    if totals.get('magnitude_peak') is not None:
+        item['magnitude_peak'] = Decimal(str(round(totals['magnitude_peak'], 4)))
+    return item
+
+
+def write_minutes(table, minutes):
+    expires = int(time.time()) + MINUTE_TTL_DAYS * 86400
+    with table.batch_writer(overwrite_by_pkeys=['machine_id', 'bucket']) as batch:
+        for (machine_id, minute), totals in minutes.items():
+            spinning = totals['vibration_readings'] and totals['spin_readings'] / totals['vibration_readings'] > 0.5
+            totals['active_minutes'] = int(bool(spinning or totals['camera_detections']))
+            item = to_item(machine_id, minute_bucket(minute), minute, 'minute', totals)
+            item['ttl'] = expires
+            batch.put_item(Item=item)
+    return len(minutes)
+
+
+def write_hours(table, hours):
+    """Recompute each touched hour from its minute rows, so partial hours stay exact"""
+    with table.batch_writer(overwrite_by_pkeys=['machine_id', 'bucket']) as batch:
+        for machine_id, hour in hours:
+            first, last = minute_bucket(hour), minute_bucket(hour + 3540)
+            kwargs = {'KeyConditionExpression': Key('machine_id').eq(machine_id) & Key('bucket').between(first, last)}
+            totals = {name: 0 for name in SUM_FIELDS}
+            totals['magnitude_peak'] = None
+            while True:
+                response = table.query(**kwargs)
+                for item in response.get('Items', []):
+                    for name in SUM_FIELDS:
+                        totals[name] += float(item.get(name, 0))
+                    if 'magnitude_peak' in item:
+                        peak = float(item['magnitude_peak'])
+                        totals['magnitude_peak'] = peak if totals['magnitude_peak'] is None else max(
+                            totals['magnitude_peak'], peak)
+                if 'LastEvaluatedKey' not in response:
+                    break
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            for name in ('vibration_readings', 'magnitude_count', 'camera_detections', 'bending_detections',
+                         'active_minutes'):
+                totals[name] = int(totals[name])
+            batch.put_item(Item=to_item(machine_id, hour_bucket(hour), hour, 'hour', totals))
+    return len(hours)
@@ -4,16 +4,22 @@ import { DynamoDBDocumentClient, BatchWriteCommand } from "@aws-sdk/lib-dynamodb
 const client = new DynamoDBClient({});
 const ddbDocClient = DynamoDBDocumentClient.from(client);
 
+const BUILDING = process.env.BUILDING || "RVREB";
+const CAMERA_ID = process.env.CAMERA_ID || `${BUILDING}-cam1`;
+
 const generateMachines = () => {
   const washers = Array.from({ length: 8 }, (_, i) => {
     const washerNumber = 8 - i;
-    const machineID = `RVREB-W${washerNumber}`;
+    const machineID = `${BUILDING}-W${washerNumber}`;
     const shortName = `W${washerNumber}`;
     const isFunctional = washerNumber <= 2;
     return {
       machineID: machineID,
       shortName: shortName,
       type: "washer",
+      building: BUILDING,
+      device_type: "washer",
+      camera_id: CAMERA_ID,
       status: "available",
       timeRemaining: isFunctional ? 0 : 0,
       position: { x: 20, y: 20 + i * 15 }
@@ -22,13 +28,16 @@ const generateMachines = () => {
 
   const dryers = Array.from({ length: 6 }, (_, i) => {
     const dryerNumber = i + 1;
-    const machineID = `RVREB-D${dryerNumber}`;
+    const machineID = `${BUILDING}-D${dryerNumber}`;
     const shortName = `D${dryerNumber}`;
     const isFunctional = dryerNumber >= 5;
     return {
       machineID: machineID,
       shortName: shortName,
       type: "dryer",
+      building: BUILDING,
+      device_type: "dryer",
+      camera_id: CAMERA_ID,
       status: "available",
       timeRemaining: isFunctional ? 0 : 0,
       position: { x: 80, y: 20 + i * 20 }
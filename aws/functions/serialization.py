@@ -0,0 +1,139 @@
+"""
+Shared request parsing and response encoding for the Lambda handlers.
+
+DynamoDB items are read with the low-level client and converted straight to
+native Python types (int/float instead of Decimal) while paginating, so no
+custom JSON encoder has to visit every value afterwards. JSON is written with
+orjson when it is packaged with the function, else with the standard library
+in compact form. Responses can be returned in a columnar shape and gzipped
+when the client accepts it. parse_time reads the start/end query parameters
+of the range queries.
+
+Packaged next to each handler that uses it (see the archive_file sources in
+lambda.tf).
+"""
+
+import base64
+import gzip
+import json
+from datetime import UTC, datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # optional fast backend
+    orjson = None
+
+GZIP_MIN_BYTES = 1024
+
+
+def _number(text):
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    return int(text)
+
+
+def from_attribute(value):
+    """Native value for one DynamoDB attribute value ({"S": ...}, {"N": ...}, ...)"""
+    (kind, inner), = value.items()
+    if kind == 'S':
+        return inner
+    if kind == 'N':
+        return _number(inner)
+    if kind == 'BOOL':
+        return inner
+    if kind == 'M':
+        return {k: from_attribute(v) for k, v in inner.items()}
+    if kind == 'L':
+        return [from_attribute(v) for v in inner]
+    if kind == 'NULL':
+        return None
+    if kind == 'SS':
+        return set(inner)
+    if kind == 'NS':
+        return {_number(v) for v in inner}
+    if kind == 'B':
+        return inner
+    if kind == 'BS':
+        return set(inner)
+    raise ValueError(f"Unknown DynamoDB type {kind!r}")
+
+
+def from_item(item):
+    """Native dict for a low-level DynamoDB item"""
+    return {k: from_attribute(v) for k, v in item.items()}
+
+
+def iter_items(client, operation, **kwargs):
+    """Native items from every page of a low-level query or scan"""
+    while True:
+        response = getattr(client, operation)(**kwargs)
+        for item in response.get('Items', []):
+            yield from_item(item)
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj) if obj % 1 else int(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Compact JSON text; orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default).decode()
+    return json.dumps(obj, default=_default, separators=(',', ':'))
+
+
+def to_columnar(items, id_key='machineID', columns=None):
+    """
+    {"ids": [...], "<attr>": [...], ...} with one list per attribute, aligned
+    with ids; attributes an item lacks are null
+    """
+    if columns is None:
+        columns = []
+        for item in items:
+            columns.extend(k for k in item if k != id_key and k not in columns)
+    table = {'ids': [item.get(id_key) for item in items]}
+    for column in columns:
+        table[column] = [item.get(column) for item in items]
+    return table
+
+
+def parse_time(value):
+    """Epoch seconds from an epoch number or an ISO 8601 string"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        parsed = datetime.fromisoformat(str(value))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=UTC)
+        return parsed.timestamp()
+
+
+def accepts_gzip(event):
+    headers = {k.lower(): v for k, v in ((event or {}).get('headers') or {}).items()}
+    return 'gzip' in headers.get('accept-encoding', '')
+
+
+def http_response(status_code, body, event=None, headers=None):
+    """
+    Lambda proxy / function URL response with a JSON body, gzipped (and
+    base64-encoded) when the request accepts it and the body is large enough
+    to benefit
+    """
+    text = dumps(body)
+    headers = {'Content-Type': 'application/json', **(headers or {})}
+    if len(text) >= GZIP_MIN_BYTES and accepts_gzip(event):
+        return {
+            'statusCode': status_code,
+            'headers': {**headers, 'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'},
+            'body': base64.b64encode(gzip.compress(text.encode(), compresslevel=5)).decode(),
+            'isBase64Encoded': True,
+        }
+    return {'statusCode': status_code, 'body': text, 'headers': headers}
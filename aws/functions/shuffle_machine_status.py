@@ -1,16 +1,29 @@
+import os
+
 import boto3
+from boto3.dynamodb.conditions import Key
+
+from profiling import profiled
 
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table('MachineStatusTable')
+BUILDING_INDEX = os.getenv('BUILDING_INDEX', 'BuildingIndex')
+DEFAULT_BUILDING = os.getenv('DEFAULT_BUILDING', 'RVREB')
 
 statuss = ["available", "in-use", "complete"]
 
+@profiled
 def lambda_handler(event, context):
-    response = table.scan()
+    building = (event or {}).get("building", DEFAULT_BUILDING)
+    query = {"IndexName": BUILDING_INDEX, "KeyConditionExpression": Key("building").eq(building)}
+    response = table.query(**query)
     items = response.get("Items", [])
+    while "LastEvaluatedKey" in response:
+        response = table.query(ExclusiveStartKey=response["LastEvaluatedKey"], **query)
+        items.extend(response.get("Items", []))
 
     if not items:
-        return {"message": "No machines found in MachineStatusTable"}
+        return {"message": f"No machines found in building {building}"}
 
     for item in items:
         machine_id = item["machineID"]
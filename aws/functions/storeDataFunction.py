@@ -0,0 +1,290 @@
+import json
+import math
+import os
+import time
+from datetime import UTC, datetime
+from decimal import Decimal
+
+import boto3
+import numpy as np
+from botocore.exceptions import ClientError
+
+from profiling import profiled
+from structured_log import log
+
+dynamodb = boto3.resource('dynamodb')
+lambda_client = boto3.client('lambda')
+
+TABLE_NAME = os.getenv('DYNAMODB_TABLE', 'VibrationData')
+STATE_MACHINE_FUNCTION = os.getenv('STATE_MACHINE_FUNCTION', 'updateMachineStateFunction')
+
+# Readings are aggregated into one VibrationData row per machine per window
+WINDOW_SECONDS = int(os.getenv('WINDOW_SECONDS', '60'))
+# A window is flushed once no reading for it can still be in flight
+FLUSH_GRACE_SECONDS = int(os.getenv('FLUSH_GRACE_SECONDS', '10'))
+# Unchanged spin state is still forwarded this often, so timed transitions keep firing
+SPIN_HEARTBEAT_SECONDS = int(os.getenv('SPIN_HEARTBEAT_SECONDS', '300'))
+# ...and this often while the machine spun recently, since the state machine
+# may have kept it in-use on a stop ("cycle too short") and waits for the next
+STOPPED_HEARTBEAT_SECONDS = int(os.getenv('STOPPED_HEARTBEAT_SECONDS', '30'))
+RECENT_SPIN_SECONDS = int(os.getenv('RECENT_SPIN_SECONDS', '3600'))
+# The state machine ignores IMU readings below this confidence
+MIN_CONFIDENCE = float(os.getenv('MIN_CONFIDENCE', '0.5'))
+
+# Warm-container state. A window still open when the container is recycled
+# is lost; flushed windows are added to any row already written for them.
+window_buffers = {}  # (machine_id, window_start) -> list of reading tuples
+last_forwarded = {}  # machine_id -> (is_spinning, forwarded_at)
+last_spinning = {}  # machine_id -> timestamp of the latest confident spinning reading
+
+
+@profiled
+def lambda_handler(event, context):
+    """
+    Buffers IMU readings (a single reading, a list, or {"readings": [...]})
+    per machine into fixed windows, adds each closed window's totals to its
+    VibrationData row and forwards spin-state changes to
+    updateMachineStateFunction
+    """
+    log.start(context, source='imu')
+    log.event(event)
+    readings = extract_readings(event)
+    if not readings:
+        return {'statusCode': 400, 'body': json.dumps({'message': 'No readings with a machine_id'})}
+
+    now = time.time()
+    for reading in readings:
+        buffer_reading(reading)
+
+    # Separate, so a failed DynamoDB write does not hold back state changes
+    errors = []
+    windows_written = forwarded = 0
+    try:
+        windows_written = flush_windows(dynamodb.Table(TABLE_NAME), now)
+    except Exception as e:
+        log.error("Error writing vibration windows: %s", e, readings=len(readings))
+        errors.append(str(e))
+    try:
+        forwarded = forward_spin_changes(readings, now)
+    except Exception as e:
+        log.error("Error forwarding spin changes: %s", e, readings=len(readings))
+        errors.append(str(e))
+    if errors:
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'message': 'Failed to process data', 'error': '; '.join(errors)})
+        }
+
+    log.debug("Buffered %d readings, wrote %d windows, forwarded %d changes",
+              len(readings), windows_written, forwarded)
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Data processed successfully',
+            'readings': len(readings),
+            'windows_written': windows_written,
+            'state_changes_forwarded': forwarded,
+        })
+    }
+
+
+def extract_readings(event):
+    """Normalise the event to a list of readings with machine_id and epoch timestamp"""
+    if isinstance(event, list):
+        raw, shared = event, {}
+    elif 'readings' in event:
+        raw = event['readings']
+        shared = {k: v for k, v in event.items() if k != 'readings'}
+    else:
+        raw, shared = [event], {}
+
+    now = time.time()
+    readings = []
+    for item in raw:
+        reading = {**shared, **item}
+        if not reading.get('machine_id'):
+            continue
+        reading['timestamp'] = normalise_timestamp(reading.get('timestamp'), now)
+        readings.append(reading)
+    return readings
+
+
+def normalise_timestamp(value, now):
+    """
+    Epoch seconds for a reading. Devices send millis() uptime rather than
+    wall-clock time, so anything not within a day of now is replaced by the
+    arrival time.
+    """
+    try:
+        ts = float(value)
+    except (TypeError, ValueError):
+        return now
+    if ts > 1e12:
+        ts /= 1000.0  # epoch milliseconds
+    if abs(ts - now) > 86400:
+        return now
+    return ts
+
+
+def reading_magnitude(reading):
+    """Acceleration magnitude from acc_magn, ax/ay/az or a vibration level; NaN if none"""
+    if 'acc_magn' in reading:
+        return float(reading['acc_magn'])
+    if all(axis in reading for axis in ('ax', 'ay', 'az')):
+        return math.sqrt(sum(float(reading[axis]) ** 2 for axis in ('ax', 'ay', 'az')))
+    if 'vibration' in reading:
+        return float(reading['vibration'])
+    return math.nan
+
+
+def buffer_reading(reading):
+    window_start = int(reading['timestamp'] // WINDOW_SECONDS * WINDOW_SECONDS)
+    key = (reading['machine_id'], window_start)
+    window_buffers.setdefault(key, []).append((
+        reading_magnitude(reading),
+        float(reading.get('is_spinning', 0)),
+        float(reading.get('confidence', 0)),
+        reading.get('device_type'),
+    ))
+
+
+def aggregate_windows(keys):
+    """
+    Aggregates for the buffered windows in one vectorised pass: each reading
+    gets its window's index, then bincount / reduceat compute per-window
+    sums and peaks
+    """
+    lengths = [len(window_buffers[key]) for key in keys]
+    rows = [row for key in keys for row in window_buffers[key]]
+    window_index = np.repeat(np.arange(len(keys)), lengths)
+
+    magnitude = np.array([row[0] for row in rows], dtype=np.float64)
+    spinning = np.array([row[1] for row in rows], dtype=np.float64)
+    confidence = np.array([row[2] for row in rows], dtype=np.float64)
+
+    has_magnitude = ~np.isnan(magnitude)
+    filled = np.where(has_magnitude, magnitude, 0.0)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    return {
+        'reading_count': np.bincount(window_index, minlength=len(keys)),
+        'spin_count': np.bincount(window_index, weights=spinning, minlength=len(keys)),
+        'confidence_sum': np.bincount(window_index, weights=confidence, minlength=len(keys)),
+        'magnitude_count': np.bincount(window_index, weights=has_magnitude, minlength=len(keys)),
+        'magnitude_sum': np.bincount(window_index, weights=filled, minlength=len(keys)),
+        'magnitude_sumsq': np.bincount(window_index, weights=filled * filled, minlength=len(keys)),
+        'magnitude_peak': np.maximum.reduceat(np.where(has_magnitude, magnitude, -np.inf), starts),
+    }
+
+
+def window_timestamp(window_start):
+    return datetime.fromtimestamp(window_start, UTC).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def to_decimal(value):
+    return Decimal(str(round(float(value), 6)))
+
+
+SUM_FIELDS = ('reading_count', 'spin_count', 'confidence_sum', 'magnitude_count', 'magnitude_sum',
+              'magnitude_sumsq')
+
+
+def write_window(table, machine_id, window_start, stats, device_type=None):
+    """
+    Add a window's totals to its VibrationData row. The totals are ADDed, so
+    containers flushing the same window concurrently both count; means,
+    ratios and the variance are derived from them on read (spin_count /
+    reading_count, magnitude_sum / magnitude_count, ...).
+    """
+    item = add_window_totals(table, machine_id, window_start, stats, device_type)
+    raise_window_peak(table, machine_id, window_start, stats, item)
+
+
+def add_window_totals(table, machine_id, window_start, stats, device_type=None):
+    """ADD the window's totals to its row; returns the row as it now stands"""
+    sets = ['window_start = :window_start', 'window_seconds = :window_seconds', 'sensor_type = :sensor_type']
+    values = {':window_start': window_start, ':window_seconds': WINDOW_SECONDS, ':sensor_type': 'imu'}
+    if device_type:
+        sets.append('device_type = if_not_exists(device_type, :device_type)')
+        values[':device_type'] = device_type
+    for name in SUM_FIELDS:
+        values[f":{name}"] = int(stats[name]) if name == 'reading_count' else to_decimal(stats[name])
+    return table.update_item(
+        Key={'timestamp_value': window_timestamp(window_start), 'machine_id': machine_id},
+        UpdateExpression='SET ' + ', '.join(sets) + ' ADD ' + ', '.join(f"{name} :{name}" for name in SUM_FIELDS),
+        ExpressionAttributeValues=values,
+        ReturnValues='ALL_NEW'
+    )['Attributes']
+
+
+def raise_window_peak(table, machine_id, window_start, stats, item):
+    """The peak only ever rises; written only when this window beats the stored one"""
+    if not stats['magnitude_count']:
+        return
+    peak = to_decimal(stats['magnitude_peak'])
+    if 'magnitude_peak' in item and item['magnitude_peak'] >= peak:
+        return
+    try:
+        table.update_item(
+            Key={'timestamp_value': window_timestamp(window_start), 'machine_id': machine_id},
+            UpdateExpression='SET magnitude_peak = :peak',
+            ConditionExpression='attribute_not_exists(magnitude_peak) OR magnitude_peak < :peak',
+            ExpressionAttributeValues={':peak': peak}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
+def flush_windows(table, now):
+    """Write every window that has closed; returns the number of rows written"""
+    cutoff = now - WINDOW_SECONDS - FLUSH_GRACE_SECONDS
+    keys = sorted(key for key in window_buffers if key[1] <= cutoff)
+    if not keys:
+        return 0
+
+    stats = aggregate_windows(keys)
+    for i, (machine_id, window_start) in enumerate(keys):
+        window_stats = {name: values[i] for name, values in stats.items()}
+        device_type = next((row[3] for row in window_buffers[(machine_id, window_start)] if row[3]), None)
+        item = add_window_totals(table, machine_id, window_start, window_stats, device_type)
+        # ADD is not idempotent: once added, the window must never be flushed again
+        del window_buffers[(machine_id, window_start)]
+        raise_window_peak(table, machine_id, window_start, window_stats, item)
+    return len(keys)
+
+
+def heartbeat_seconds(machine_id, is_spinning, now):
+    """How long an unchanged spin state is held back before it is forwarded again"""
+    if not is_spinning and now - last_spinning.get(machine_id, -math.inf) < RECENT_SPIN_SECONDS:
+        return STOPPED_HEARTBEAT_SECONDS
+    return SPIN_HEARTBEAT_SECONDS
+
+
+def forward_spin_changes(readings, now):
+    """
+    Invoke the state machine only when a machine's spin state changes (or on
+    heartbeat). Readings the state machine would ignore for low confidence
+    are not forwarded, so they never hold back a confident one.
+    """
+    forwarded = 0
+    for reading in sorted(readings, key=lambda r: r['timestamp']):
+        if 'is_spinning' not in reading or float(reading.get('confidence', 0)) < MIN_CONFIDENCE:
+            continue
+        machine_id = reading['machine_id']
+        is_spinning = int(reading['is_spinning'])
+        if is_spinning:
+            last_spinning[machine_id] = reading['timestamp']
+        previous = last_forwarded.get(machine_id)
+        if previous is not None and previous[0] == is_spinning and \
+                now - previous[1] < heartbeat_seconds(machine_id, is_spinning, now):
+            continue
+
+        lambda_client.invoke(
+            FunctionName=STATE_MACHINE_FUNCTION,
+            InvocationType='Event',
+            Payload=json.dumps({'source': 'imu', 'data': reading})
+        )
+        last_forwarded[machine_id] = (is_spinning, now)
+        forwarded += 1
+    return forwarded
@@ -0,0 +1,82 @@
+"""
+Structured, levelled logging for the Lambda handlers.
+
+Each record is one JSON line carrying the per-invocation context (request
+id, machine_id, source) so CloudWatch Logs Insights can filter on it. The
+message is only %-formatted, and the line only serialised, when the level is
+enabled, so debug calls on the hot path cost a comparison.
+
+Full event dumps go through ``log.event()``, which logs at DEBUG for a
+sampled fraction of invocations instead of every one.
+
+    LOG_LEVEL              DEBUG, INFO (default), WARNING or ERROR
+    LOG_EVENT_SAMPLE_RATE  fraction of invocations whose event is dumped
+                           (default 0.01; every one at DEBUG level)
+
+Packaged next to each handler that uses it (see the archive_file sources in
+lambda.tf).
+"""
+
+import json
+import os
+import random
+import sys
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {'DEBUG': DEBUG, 'INFO': INFO, 'WARNING': WARNING, 'ERROR': ERROR}
+LEVEL_NAMES = {number: name for name, number in LEVELS.items()}
+
+
+def _stdout_writer(line):
+    sys.stdout.write(line + '\n')
+
+
+class Logger:
+    def __init__(self, level=None, event_sample_rate=None, writer=None):
+        self.level = LEVELS.get((level or os.getenv('LOG_LEVEL', 'INFO')).upper(), INFO)
+        self.event_sample_rate = float(
+            os.getenv('LOG_EVENT_SAMPLE_RATE', '0.01') if event_sample_rate is None else event_sample_rate)
+        self.writer = writer or _stdout_writer
+        self.context = {}
+
+    def start(self, context=None, **fields):
+        """Reset the per-invocation context for a new Lambda invocation"""
+        self.context = {'request_id': getattr(context, 'aws_request_id', None)}
+        self.bind(**fields)
+
+    def bind(self, **fields):
+        """Add fields (machine_id, source, ...) to every later record of this invocation"""
+        self.context.update({k: v for k, v in fields.items() if v is not None})
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def log(self, level, message, *args, **fields):
+        if level < self.level:
+            return
+        record = {'level': LEVEL_NAMES[level], 'message': message % args if args else message}
+        record.update(self.context)
+        record.update(fields)
+        self.writer(json.dumps(record, default=str, separators=(',', ':')))
+
+    def debug(self, message, *args, **fields):
+        self.log(DEBUG, message, *args, **fields)
+
+    def info(self, message, *args, **fields):
+        self.log(INFO, message, *args, **fields)
+
+    def warning(self, message, *args, **fields):
+        self.log(WARNING, message, *args, **fields)
+
+    def error(self, message, *args, **fields):
+        self.log(ERROR, message, *args, **fields)
+
+    def event(self, event):
+        """Dump the incoming event at DEBUG level, or for a sampled fraction of invocations"""
+        if self.level <= DEBUG or (self.event_sample_rate > 0 and random.random() < self.event_sample_rate):
+            record = {'level': 'DEBUG', 'message': 'Received event', 'event': event}
+            record.update(self.context)
+            self.writer(json.dumps(record, default=str, separators=(',', ':')))
+
+
+log = Logger()
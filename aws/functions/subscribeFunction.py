@@ -0,0 +1,45 @@
+import json
+import os
+import time
+
+import boto3
+
+from profiling import profiled
+
+dynamodb = boto3.resource('dynamodb')
+table = dynamodb.Table(os.getenv('SUBSCRIPTIONS_TABLE', 'MachineSubscriptions'))
+
+# API Gateway closes WebSocket connections after 2 hours at most
+SUBSCRIPTION_TTL_SECONDS = int(os.getenv('SUBSCRIPTION_TTL_SECONDS', str(2 * 3600)))
+
+@profiled
+def lambda_handler(event, context):
+    """
+    WebSocket "subscribe" and "unsubscribe" routes, e.g.
+    {"action": "subscribe", "machine_id": "RVREB-W1"}: the connection is
+    sent a message when the machine becomes ready-to-unload or available
+    """
+    connection_id = event['requestContext']['connectionId']
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except ValueError:
+        body = {}
+    machine_id = body.get('machine_id') if isinstance(body, dict) else None
+    if not machine_id:
+        return {'statusCode': 400, 'body': 'Missing machine_id'}
+
+    key = {'machine_id': machine_id, 'subscriber': connection_id}
+    if body.get('action') == 'unsubscribe':
+        table.delete_item(Key=key)
+        return {'statusCode': 200, 'body': 'Unsubscribed'}
+
+    now = time.time()
+    table.put_item(
+        Item={
+            **key,
+            # Milliseconds, so a renewal is told apart from the subscription it replaces
+            'subscribed_at': int(now * 1000),
+            'ttl': int(now) + SUBSCRIPTION_TTL_SECONDS  # This field is used for TTL
+        }
+    )
+    return {'statusCode': 200, 'body': 'Subscribed'}
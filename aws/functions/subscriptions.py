@@ -0,0 +1,116 @@
+"""
+"Notify me when ready" subscriptions.
+
+A WebSocket connection subscribes to a machine through subscribeFunction,
+which writes a MachineSubscriptions item keyed by machine_id (hash) and
+subscriber (the connection id, range) with a ttl, so subscriptions of
+closed connections expire on their own.
+
+When a machine becomes ready-to-unload or available, ``notify_subscribers``
+reads that machine's subscribers with a single query, posts to them
+concurrently (at most NOTIFY_CONCURRENCY at a time) and removes each
+delivered subscription with a delete conditioned on the subscription it
+read, so one renewed in the meantime is kept. The cost of a transition is
+proportional to the people waiting for that machine, not to the number of
+open connections.
+
+    SUBSCRIPTIONS_TABLE    default MachineSubscriptions
+    WEBSOCKET_ENDPOINT     https://{api}.execute-api.{region}.amazonaws.com/{stage};
+                           notifications are off when unset
+    NOTIFY_CONCURRENCY     default 8
+
+Packaged next to each handler that uses it (see the archive_file sources in
+lambda.tf).
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from structured_log import log
+
+SUBSCRIPTIONS_TABLE = os.getenv('SUBSCRIPTIONS_TABLE', 'MachineSubscriptions')
+WEBSOCKET_ENDPOINT = os.getenv('WEBSOCKET_ENDPOINT')
+NOTIFY_CONCURRENCY = int(os.getenv('NOTIFY_CONCURRENCY', '8'))
+NOTIFY_STATES = frozenset({'ready-to-unload', 'available'})
+
+dynamodb = boto3.resource('dynamodb')
+# Created on first use, so a container that never notifies never builds it
+management_client = None
+
+
+def get_management_client():
+    global management_client
+    if management_client is None:
+        management_client = boto3.client('apigatewaymanagementapi', endpoint_url=WEBSOCKET_ENDPOINT)
+    return management_client
+
+
+def subscribers(machine_id):
+    """The machine's subscriptions, from a single query on its partition"""
+    table = dynamodb.Table(SUBSCRIPTIONS_TABLE)
+    kwargs = {
+        'KeyConditionExpression': Key('machine_id').eq(machine_id),
+        'ProjectionExpression': 'subscriber, subscribed_at',
+    }
+    while True:
+        response = table.query(**kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def remove_subscription(machine_id, subscription):
+    """Delete the subscription unless it was renewed after it was read"""
+    try:
+        dynamodb.meta.client.delete_item(
+            TableName=SUBSCRIPTIONS_TABLE,
+            Key={'machine_id': machine_id, 'subscriber': subscription['subscriber']},
+            ConditionExpression='subscribed_at = :subscribed_at',
+            ExpressionAttributeValues={':subscribed_at': subscription['subscribed_at']}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
+def deliver(client, machine_id, subscription, payload):
+    """Post to one subscriber; returns whether it was delivered"""
+    try:
+        client.post_to_connection(ConnectionId=subscription['subscriber'], Data=payload)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'GoneException':
+            # Kept, so the next transition (or the ttl) deals with it
+            log.warning("Failed to notify %s: %s", subscription['subscriber'], e, machine_id=machine_id)
+            return False
+        # The connection has closed; the subscription is of no further use
+        remove_subscription(machine_id, subscription)
+        return False
+    remove_subscription(machine_id, subscription)
+    return True
+
+
+def notify_subscribers(machine_id, state, timestamp):
+    """Tell the machine's subscribers it is now in state; returns how many were notified"""
+    if state not in NOTIFY_STATES or not WEBSOCKET_ENDPOINT:
+        return 0
+    pending = list(subscribers(machine_id))
+    if not pending:
+        return 0
+
+    client = get_management_client()
+    payload = json.dumps({
+        'type': 'machine_ready',
+        'machine_id': machine_id,
+        'status': state,
+        'timestamp': int(timestamp),
+    }).encode()
+    with ThreadPoolExecutor(max_workers=min(NOTIFY_CONCURRENCY, len(pending))) as pool:
+        delivered = sum(pool.map(lambda subscription: deliver(client, machine_id, subscription, payload), pending))
+    log.info("Notified %d of %d subscribers", delivered, len(pending), machine_id=machine_id, status=state)
+    return delivered
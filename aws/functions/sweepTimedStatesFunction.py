@@ -0,0 +1,117 @@
+import json
+import os
+import time
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from profiling import profiled
+from structured_log import log
+from subscriptions import notify_subscribers
+from updateMachineStateFunction import TIMED_STATES, history_put
+
+dynamodb = boto3.resource('dynamodb')
+MACHINE_STATUS_TABLE = os.getenv('MACHINE_STATUS_TABLE', 'MachineStatusTable')
+DEADLINE_INDEX = os.getenv('DEADLINE_INDEX', 'DeadlineIndex')
+
+
+def due_machines(table, timed_state, now):
+    """Index entries (machineID, timed_state, deadline) in a timed state whose deadline has passed"""
+    kwargs = {
+        'IndexName': DEADLINE_INDEX,
+        'KeyConditionExpression': Key('timed_state').eq(timed_state) & Key('deadline').lte(int(now)),
+    }
+    while True:
+        response = table.query(**kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def apply_timed_transition(table, entry, now):
+    """
+    Move a machine on from its timed state, unless it has changed state or
+    deadline since the index was read; returns whether it was moved
+    """
+    next_state, delay = TIMED_STATES[entry['timed_state']]
+    try:
+        # The transition is logged in MachineStateHistory in the same transaction
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {'Update': {
+                'TableName': table.name,
+                'Key': {'machineID': entry['machineID']},
+                'UpdateExpression': 'SET #status = :next, lastUpdated = :now, lastSource = :source '
+                                    'REMOVE timed_state, deadline',
+                'ConditionExpression': '#status = :timed AND deadline = :deadline',
+                'ExpressionAttributeNames': {'#status': 'status'},
+                'ExpressionAttributeValues': {
+                    ':next': next_state,
+                    ':now': Decimal(str(now)),
+                    ':source': 'timer',
+                    ':timed': entry['timed_state'],
+                    ':deadline': entry['deadline'],
+                }
+            }},
+            history_put(entry['machineID'], entry['timed_state'], next_state, 'timer', now, entry['deadline'] - delay)
+        ])
+    except ClientError as e:
+        reasons = e.response.get('CancellationReasons') or [{}]
+        if e.response['Error']['Code'] != 'TransactionCanceledException' or \
+                reasons[0].get('Code') != 'ConditionalCheckFailed':
+            raise
+        drop_stale_entry(table, entry)
+        return False
+    log.info("State transition: %s -> %s (deadline passed)", entry['timed_state'], next_state,
+             machine_id=entry['machineID'], source='timer')
+    try:
+        notify_subscribers(entry['machineID'], next_state, now)
+    except Exception as e:
+        log.error("Error notifying subscribers: %s", e, machine_id=entry['machineID'])
+    return True
+
+
+def drop_stale_entry(table, entry):
+    """
+    Take a machine whose status was changed elsewhere (e.g. shuffle or the
+    camera image endpoint) out of the index, so it is not read every sweep
+    """
+    try:
+        table.update_item(
+            Key={'machineID': entry['machineID']},
+            UpdateExpression='REMOVE timed_state, deadline',
+            ConditionExpression='#status <> :timed AND deadline = :deadline',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':timed': entry['timed_state'], ':deadline': entry['deadline']}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
+@profiled
+def lambda_handler(event, context):
+    """
+    Applies timed transitions (finishing -> ready-to-unload) that are due,
+    so they do not wait for the next sensor event. Only machines in a timed
+    state are in DeadlineIndex, and only the due ones are read.
+    """
+    log.start(context, source='timer')
+    table = dynamodb.Table(MACHINE_STATUS_TABLE)
+    now = time.time()
+
+    transitioned = skipped = 0
+    try:
+        for timed_state in TIMED_STATES:
+            for entry in due_machines(table, timed_state, now):
+                if apply_timed_transition(table, entry, now):
+                    transitioned += 1
+                else:
+                    skipped += 1
+    except Exception as e:
+        log.error("Error sweeping timed states: %s", e)
+        return {'statusCode': 500, 'body': json.dumps({'message': 'Failed to sweep timed states'})}
+
+    return {'statusCode': 200, 'body': json.dumps({'transitioned': transitioned, 'skipped': skipped})}
@@ -1,9 +1,16 @@
 import json
+import math
 import boto3
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from decimal import Decimal
 
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from profiling import profiled
+from structured_log import log
+from subscriptions import notify_subscribers
+
 dynamodb = boto3.resource('dynamodb')
 
 # State definitions
@@ -13,42 +20,80 @@ STATE_IN_USE = "in-use"
 STATE_FINISHING = "finishing"
 STATE_READY_TO_UNLOAD = "ready-to-unload"
 
+# Camera detections are counted on the machine item in a map of
+# {bucket number: count}, one bucket per DETECTION_BUCKET_SECONDS, kept for
+# the longest window the state machine looks back over
+DETECTION_ATTRIBUTE = 'detection_buckets'
+DETECTION_BUCKET_SECONDS = int(os.getenv('DETECTION_BUCKET_SECONDS', '5'))
+DETECTION_WINDOW_SECONDS = int(os.getenv('DETECTION_WINDOW_SECONDS', '120'))
+
+# States that advance on their own after a delay: state -> (next state, seconds).
+# Machines in them carry timed_state/deadline, which only they have, so the
+# sparse DeadlineIndex lets sweepTimedStatesFunction find the due ones
+# without scanning the fleet
+FINISHING_SECONDS = int(os.getenv('FINISHING_SECONDS', str(2 * 60)))
+TIMED_STATES = {STATE_FINISHING: (STATE_READY_TO_UNLOAD, FINISHING_SECONDS)}
+
+# Cycle thresholds and ETAs come from the learned cycle_profile on the
+# machine item (p10/p50/p90 seconds, from profileCycleTimesFunction), else
+# from the device type's pooled profile, cached per container for
+# PROFILE_CACHE_SECONDS, else from fixed per-type minimums
+ROLLUP_TABLE = os.getenv('ROLLUP_TABLE', 'MachineUsageRollup')
+PROFILE_ITEM_ID = '__profile__'
+PROFILE_CACHE_SECONDS = int(os.getenv('PROFILE_CACHE_SECONDS', '900'))
+CYCLE_MARGIN = float(os.getenv('CYCLE_MARGIN', '0.8'))
+device_type_profiles = {}  # device_type -> (profile or None, fetched_at)
+
+# Every transition is appended to MachineStateHistory in the same
+# transaction as the status update, and kept for HISTORY_TTL_DAYS
+HISTORY_TABLE = os.getenv('HISTORY_TABLE', 'MachineStateHistory')
+HISTORY_TTL_DAYS = int(os.getenv('HISTORY_TTL_DAYS', '90'))
+
+deserializer = TypeDeserializer()
+
+@profiled
 def lambda_handler(event, context):
     """
     Centralized state machine that processes both IMU and camera events
     """
-    print(f"Received event: {json.dumps(event)}")
-    
     source = event.get('source')  # 'camera' or 'imu'
     data = event.get('data')
     machine_id = data.get('machine_id')
+    log.start(context, machine_id=machine_id, source=source)
+    log.event(event)
     
     if not machine_id:
         return {'statusCode': 400, 'body': 'Missing machine_id'}
     
-    # Get table names from environment
-    machine_status_table_name = os.getenv('MACHINE_STATUS_TABLE', 'MachineStatusTable')
-    camera_table_name = os.getenv('CAMERA_DETECTION_TABLE', 'CameraDetectionData')
+    if source not in ('camera', 'imu'):
+        return {'statusCode': 400, 'body': 'Invalid source'}
     
+    # Get table name from environment
+    machine_status_table_name = os.getenv('MACHINE_STATUS_TABLE', 'MachineStatusTable')
     machine_status_table = dynamodb.Table(machine_status_table_name)
-    camera_table = dynamodb.Table(camera_table_name)
+    now = datetime.now().timestamp()
     
-    # Get current machine state
-    current_state = get_machine_state(machine_status_table, machine_id)
+    # Get current machine state, registry attributes and detection counters;
+    # a camera event is counted in the same write that reads the item back
+    if source == 'camera':
+        machine = record_camera_detection(machine_status_table, machine_id, now, detection_buckets(data, now))
+    else:
+        machine = get_machine(machine_status_table, machine_id)
+    current_state = machine.get('status', STATE_AVAILABLE)
+    device_type = get_device_type(machine, data)
     
     # Process event based on source
     if source == 'camera':
-        new_state = process_camera_event(machine_id, data, current_state, camera_table)
-    elif source == 'imu':
-        new_state = process_imu_event(machine_id, data, current_state, camera_table, machine_status_table)
+        new_state = process_camera_event(machine_id, data, current_state, machine, device_type, now)
     else:
-        return {'statusCode': 400, 'body': 'Invalid source'}
+        new_state = process_imu_event(machine_id, data, current_state, machine, device_type, now)
     
     # Update machine state if changed
     if new_state != current_state:
-        update_machine_state(machine_status_table, machine_id, new_state, data, source)
+        profile = get_cycle_profile(machine, device_type, now) if new_state == STATE_IN_USE else None
+        update_machine_state(machine_status_table, machine_id, new_state, data, source, profile, machine)
     else:
-        print(f"No state change for {machine_id}, keeping: {current_state}")
+        log.debug("No state change, keeping %s", current_state)
     
     return {
         'statusCode': 200,
@@ -60,18 +105,113 @@ def lambda_handler(event, context):
         })
     }
 
-def get_machine_state(table, machine_id):
-    """Get current state from DynamoDB"""
+def get_machine(table, machine_id):
+    """Get the machine's status item from DynamoDB (empty if unknown)"""
     try:
         response = table.get_item(Key={'machineID': machine_id})
-        if 'Item' in response:
-            return response['Item'].get('status', STATE_AVAILABLE)
-        return STATE_AVAILABLE
+        return response.get('Item', {})
+    except Exception as e:
+        log.error("Error getting machine state: %s", e)
+        return {}
+
+def detection_buckets(data, now):
+    """
+    {bucket: count} for a camera event: the per-second counts a batch from
+    processCameraDataFunction carries, or one detection now. Detections
+    that have already left the window are dropped, and none is counted
+    later than now.
+    """
+    current = int(now // DETECTION_BUCKET_SECONDS)
+    oldest = current - math.ceil(DETECTION_WINDOW_SECONDS / DETECTION_BUCKET_SECONDS)
+    buckets = {}
+    for second, n in (data.get('detections') or {str(int(now)): 1}).items():
+        bucket = min(int(float(second) // DETECTION_BUCKET_SECONDS), current)
+        if bucket >= oldest:
+            buckets[str(bucket)] = buckets.get(str(bucket), 0) + int(n)
+    return buckets
+
+def record_camera_detection(table, machine_id, now, counts=None):
+    """
+    Count camera detections ({bucket: count}, default one in the current
+    bucket) on the machine item and return the updated item. Usually a
+    single conditional increment; a detection in a bucket the map does not
+    have also removes the buckets that have left the window, key by key,
+    so the map never holds more than a window's worth of buckets. Detections
+    for an unknown machine are not recorded (and no item is created for it).
+    """
+    current = int(now // DETECTION_BUCKET_SECONDS)
+    counts = {str(current): 1} if counts is None else counts
+    if not counts:
+        return get_machine(table, machine_id)
+    # Oldest bucket recent_detection_count reads for the longest window
+    oldest = current - math.ceil(DETECTION_WINDOW_SECONDS / DETECTION_BUCKET_SECONDS)
+    names = {'#buckets': DETECTION_ATTRIBUTE}
+    targets = []  # (placeholder, bucket, count)
+    for i, (bucket, n) in enumerate(sorted(counts.items())):
+        names[f"#b{i}"] = bucket
+        targets.append((i, bucket, n))
+    try:
+        for _ in range(3):
+            try:
+                return table.update_item(
+                    Key={'machineID': machine_id},
+                    UpdateExpression='SET ' + ', '.join(
+                        f"#buckets.#b{i} = #buckets.#b{i} + :c{i}" for i, _, _ in targets),
+                    ConditionExpression=' AND '.join(
+                        ['attribute_exists(machineID)'] + [f"attribute_exists(#buckets.#b{i})" for i, _, _ in targets]),
+                    ExpressionAttributeNames=names,
+                    ExpressionAttributeValues={f":c{i}": n for i, _, n in targets},
+                    ReturnValues='ALL_NEW',
+                    ReturnValuesOnConditionCheckFailure='ALL_OLD'
+                )['Attributes']
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                old = {k: deserializer.deserialize(v) for k, v in e.response.get('Item', {}).items()}
+            if not old:
+                log.warning("Camera detection for unknown machine")
+                return {}
+
+            old_buckets = old.get(DETECTION_ATTRIBUTE)
+            if old_buckets is None:
+                # No map yet: create it, unless another invocation has meanwhile
+                update = 'SET #buckets = :buckets'
+                conditions = 'attribute_exists(machineID) AND attribute_not_exists(#buckets)'
+                update_names = {'#buckets': DETECTION_ATTRIBUTE}
+                values = {':buckets': {bucket: n for _, bucket, n in targets}}
+            else:
+                # Increment and remove bucket by bucket, so counts other invocations
+                # add to buckets that are kept are never overwritten
+                expired = [b for b in old_buckets if int(b) < oldest and b not in counts]
+                update = 'SET ' + ', '.join(
+                    f"#buckets.#b{i} = if_not_exists(#buckets.#b{i}, :zero) + :c{i}" for i, _, _ in targets)
+                if expired:
+                    update += ' REMOVE ' + ', '.join(f"#buckets.#x{j}" for j in range(len(expired)))
+                conditions = 'attribute_exists(machineID) AND attribute_exists(#buckets)'
+                update_names = {**names, **{f"#x{j}": bucket for j, bucket in enumerate(expired)}}
+                values = {':zero': 0, **{f":c{i}": n for i, _, n in targets}}
+            try:
+                return table.update_item(
+                    Key={'machineID': machine_id},
+                    UpdateExpression=update,
+                    ConditionExpression=conditions,
+                    ExpressionAttributeNames=update_names,
+                    ExpressionAttributeValues=values,
+                    ReturnValues='ALL_NEW'
+                )['Attributes']
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
     except Exception as e:
-        print(f"Error getting machine state: {e}")
-        return STATE_AVAILABLE
+        log.error("Error recording camera detection: %s", e)
+    return get_machine(table, machine_id)
+
+def recent_detection_count(machine, seconds, now):
+    """Camera detections counted on the machine item within the last N seconds (to bucket granularity)"""
+    first = int((now - seconds) // DETECTION_BUCKET_SECONDS)
+    return sum(int(count) for bucket, count in machine.get(DETECTION_ATTRIBUTE, {}).items() if int(bucket) >= first)
 
-def process_camera_event(machine_id, data, current_state, camera_table):
+def process_camera_event(machine_id, data, current_state, machine, device_type='washer', now=None):
     """
     Process camera detection event
     """
@@ -80,170 +220,223 @@ def process_camera_event(machine_id, data, current_state, camera_table):
     
     # Low confidence - ignore
     if confidence < 0.5:
-        print(f"Low confidence camera detection: {confidence}")
+        log.debug("Low confidence camera detection: %s", confidence)
         return current_state
     
     # Check for recent detections (temporal consistency)
-    recent_detections = get_recent_camera_detections(camera_table, machine_id, seconds=10)
+    now = datetime.now().timestamp() if now is None else now
+    recent_detections = recent_detection_count(machine, 10, now)
     
-    if len(recent_detections) < 2:
+    if recent_detections < 2:
         # Not enough temporal consistency - might be passing by
-        print(f"Insufficient temporal consistency: {len(recent_detections)} detections")
+        log.debug("Insufficient temporal consistency: %d detections", recent_detections)
         return current_state
     
     # Person bending detected with high confidence
     if is_bending and confidence > 0.7:
         if current_state == STATE_AVAILABLE:
             # Person loading clothes
-            print(f"State transition: {current_state} -> {STATE_LOADING}")
+            log.info("State transition: %s -> %s", current_state, STATE_LOADING)
             return STATE_LOADING
         
         elif current_state == STATE_READY_TO_UNLOAD:
             # Person unloading clothes
-            print(f"State transition: {current_state} -> {STATE_AVAILABLE}")
+            log.info("State transition: %s -> %s", current_state, STATE_AVAILABLE)
             return STATE_AVAILABLE
         
         elif current_state == STATE_IN_USE:
             # Check if machine has been running long enough
-            state_duration = get_state_duration(machine_id)
+            state_duration = get_state_duration(machine, now)
             
-            # Typical wash cycle: 30-60 min, dryer: 45-90 min
-            device_type = data.get('device_type', 'washer')
-            min_cycle_time = 25 * 60 if device_type == 'washer' else 35 * 60
+            min_cycle_time = get_min_cycle_time(machine, device_type, now)
             
             if state_duration > min_cycle_time:
                 # Likely unloading after cycle complete
-                print(f"State transition: {current_state} -> {STATE_AVAILABLE} (cycle complete)")
+                log.info("State transition: %s -> %s (cycle complete)", current_state, STATE_AVAILABLE)
                 return STATE_AVAILABLE
     
     return current_state
 
-def process_imu_event(machine_id, data, current_state, camera_table, machine_status_table):
+def process_imu_event(machine_id, data, current_state, machine, device_type='washer', now=None):
     """
     Process IMU vibration event with sensor fusion
     """
+    now = datetime.now().timestamp() if now is None else now
     is_spinning = data.get('is_spinning', 0)
     confidence = data.get('confidence', 0)
     
     # Low confidence - ignore
     if confidence < 0.5:
-        print(f"Low confidence IMU detection: {confidence}")
+        log.debug("Low confidence IMU detection: %s", confidence)
         return current_state
     
     if is_spinning == 1:
         # Machine started spinning
         if current_state == STATE_LOADING:
             # Confirmed: user loaded clothes and started machine
-            print(f"State transition: {current_state} -> {STATE_IN_USE} (spinning confirmed)")
+            log.info("State transition: %s -> %s (spinning confirmed)", current_state, STATE_IN_USE)
             return STATE_IN_USE
         
         elif current_state == STATE_AVAILABLE:
             # Machine spinning but no loading detected
             # Check for recent camera loading events
-            recent_loading = get_recent_camera_detections(camera_table, machine_id, seconds=120)
+            recent_loading = recent_detection_count(machine, 120, now)
             
             if recent_loading:
                 # Camera detected loading within 2 minutes - valid
-                print(f"State transition: {current_state} -> {STATE_IN_USE} (late camera detection)")
+                log.info("State transition: %s -> %s (late camera detection)", current_state, STATE_IN_USE)
                 return STATE_IN_USE
             else:
                 # Spinning without loading detected - possible missed camera event
                 # Conservative: mark as in-use
-                print(f"State transition: {current_state} -> {STATE_IN_USE} (no camera, IMU only)")
+                log.info("State transition: %s -> %s (no camera, IMU only)", current_state, STATE_IN_USE)
                 return STATE_IN_USE
     
     else:  # is_spinning == 0
         # Machine stopped spinning
         if current_state == STATE_IN_USE:
             # Check cycle duration
-            state_duration = get_state_duration(machine_status_table, machine_id)
+            state_duration = get_state_duration(machine, now)
             
-            # Get device type from data or machine_id
-            device_type = data.get('device_type', get_device_type(machine_id))
-            min_cycle_time = 25 * 60 if device_type == 'washer' else 35 * 60
+            min_cycle_time = get_min_cycle_time(machine, device_type, now)
             
             if state_duration > min_cycle_time:
                 # Normal cycle completion
-                print(f"State transition: {current_state} -> {STATE_FINISHING} (cycle duration: {state_duration}s)")
+                log.info("State transition: %s -> %s", current_state, STATE_FINISHING,
+                         cycle_duration=round(state_duration))
                 return STATE_FINISHING
             else:
                 # Too short - might be door opened mid-cycle or error
-                print(f"Cycle too short ({state_duration}s), keeping in-use")
+                log.debug("Cycle too short (%ds), keeping in-use", state_duration)
                 return current_state
         
         elif current_state == STATE_FINISHING:
             # Already finishing, transition to ready to unload after 2 min
-            finish_duration = get_state_duration(machine_status_table, machine_id)
-            if finish_duration > 2 * 60:
-                print(f"State transition: {current_state} -> {STATE_READY_TO_UNLOAD}")
+            finish_duration = get_state_duration(machine, now)
+            if finish_duration > FINISHING_SECONDS:
+                log.info("State transition: %s -> %s", current_state, STATE_READY_TO_UNLOAD)
                 return STATE_READY_TO_UNLOAD
     
     return current_state
 
-def get_recent_camera_detections(camera_table, machine_id, seconds=10):
-    """Get camera detections within last N seconds"""
-    try:
-        cutoff_time = int((datetime.now() - timedelta(seconds=seconds)).timestamp())
-        
-        response = camera_table.query(
-            KeyConditionExpression='machine_id = :mid AND #ts > :cutoff',
-            ExpressionAttributeNames={'#ts': 'timestamp'},
-            ExpressionAttributeValues={
-                ':mid': machine_id,
-                ':cutoff': Decimal(str(cutoff_time))
-            },
-            ScanIndexForward=False,
-            Limit=10
-        )
-        
-        return response.get('Items', [])
-    except Exception as e:
-        print(f"Error querying recent detections: {e}")
-        return []
+def get_state_duration(machine, now=None):
+    """How long the machine has been in its current state (seconds), from the item already read"""
+    if not machine:
+        return 0
+    last_updated = machine.get('lastUpdated', 0)
+    if isinstance(last_updated, Decimal):
+        last_updated = float(last_updated)
+    return (datetime.now().timestamp() if now is None else now) - last_updated
+
+def get_device_type(machine, data):
+    """Washer or dryer, from the machine registry attribute or the event"""
+    device_type = machine.get('device_type') or data.get('device_type')
+    if not device_type:
+        log.debug("No device_type in registry or event, assuming washer")
+        return 'washer'
+    return device_type
 
-def get_state_duration(table, machine_id):
-    """Get how long machine has been in current state (seconds)"""
+def get_cycle_profile(machine, device_type, now=None):
+    """The machine's learned cycle profile, else its device type's, else None"""
+    profile = machine.get('cycle_profile')
+    if profile:
+        return {k: float(v) for k, v in profile.items()}
+    return get_device_type_profile(device_type, now)
+
+def get_device_type_profile(device_type, now=None):
+    """Pooled profile for a device type from MachineUsageRollup, cached in the warm container"""
+    now = datetime.now().timestamp() if now is None else now
+    cached = device_type_profiles.get(device_type)
+    if cached and now - cached[1] < PROFILE_CACHE_SECONDS:
+        return cached[0]
     try:
-        response = table.get_item(Key={'machineID': machine_id})
-        if 'Item' in response:
-            last_updated = response['Item'].get('lastUpdated', 0)
-            if isinstance(last_updated, Decimal):
-                last_updated = float(last_updated)
-            return datetime.now().timestamp() - last_updated
-        return 0
+        item = dynamodb.Table(ROLLUP_TABLE).get_item(
+            Key={'machine_id': PROFILE_ITEM_ID, 'bucket': f"device#{device_type}"}).get('Item')
+        profile = {k: float(item[k]) for k in ('p10', 'p50', 'p90', 'samples')} if item else None
     except Exception as e:
-        print(f"Error getting state duration: {e}")
-        return 0
+        log.error("Error getting %s cycle profile: %s", device_type, e)
+        profile = cached[0] if cached else None
+    device_type_profiles[device_type] = (profile, now)
+    return profile
 
-def get_device_type(machine_id):
-    """Determine if washer or dryer from machine_id"""
-    if 'W' in machine_id:
-        return 'washer'
-    elif 'D' in machine_id:
-        return 'dryer'
-    return 'washer'
+def get_min_cycle_time(machine, device_type, now=None):
+    """Shortest plausible cycle (seconds): a margin under the learned p10, else the fixed minimum"""
+    profile = get_cycle_profile(machine, device_type, now)
+    if profile:
+        return profile['p10'] * CYCLE_MARGIN
+    # Typical wash cycle: 30-60 min, dryer: 45-90 min
+    return 25 * 60 if device_type == 'washer' else 35 * 60
 
-def update_machine_state(table, machine_id, new_state, event_data, source):
-    """Update machine state in DynamoDB"""
+def history_put(machine_id, previous_state, new_state, source, timestamp, previous_since=None):
+    """TransactWriteItems Put appending one transition to MachineStateHistory"""
+    item = {
+        'machine_id': machine_id,
+        'timestamp': Decimal(str(timestamp)),
+        'from_state': previous_state,
+        'to_state': new_state,
+        'source': source,
+        'ttl': int(timestamp) + HISTORY_TTL_DAYS * 86400
+    }
+    if previous_since:
+        # Seconds spent in the previous state, e.g. the cycle length on in-use -> finishing
+        item['previous_duration'] = int(timestamp - float(previous_since))
+    return {'Put': {'TableName': HISTORY_TABLE, 'Item': item}}
+
+def update_machine_state(table, machine_id, new_state, event_data, source, profile=None, machine=None):
+    """Update machine state in DynamoDB and record the transition in MachineStateHistory"""
     try:
         timestamp = datetime.now().timestamp()
+        sets = ['#status = :status', 'lastUpdated = :timestamp', 'lastSource = :source']
+        removes = []
+        values = {
+            ':status': new_state,
+            ':timestamp': Decimal(str(timestamp)),
+            ':source': source
+        }
+        
+        # Enter or leave the deadline index
+        if new_state in TIMED_STATES:
+            sets += ['timed_state = :status', 'deadline = :deadline']
+            values[':deadline'] = int(timestamp) + TIMED_STATES[new_state][1]
+        else:
+            removes += ['timed_state', 'deadline']
         
-        table.update_item(
-            Key={'machineID': machine_id},
-            UpdateExpression='SET #status = :status, lastUpdated = :timestamp, lastSource = :source',
-            ExpressionAttributeNames={
-                '#status': 'status'
-            },
-            ExpressionAttributeValues={
-                ':status': new_state,
-                ':timestamp': Decimal(str(timestamp)),
-                ':source': source
-            }
-        )
+        # Expected completion is published with the status, so clients get an ETA as is
+        if new_state == STATE_IN_USE and profile:
+            sets += ['expected_completion = :eta', 'expected_completion_latest = :eta_latest']
+            values[':eta'] = int(timestamp + profile['p50'])
+            values[':eta_latest'] = int(timestamp + profile['p90'])
+        else:
+            removes += ['expected_completion', 'expected_completion_latest']
         
-        print(f"Updated {machine_id} to {new_state} (source: {source})")
+        update = 'SET ' + ', '.join(sets)
+        if removes:
+            update += ' REMOVE ' + ', '.join(removes)
+        
+        machine = machine or {}
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {'Update': {
+                'TableName': table.name,
+                'Key': {'machineID': machine_id},
+                'UpdateExpression': update,
+                'ExpressionAttributeNames': {
+                    '#status': 'status'
+                },
+                'ExpressionAttributeValues': values
+            }},
+            history_put(machine_id, machine.get('status', STATE_AVAILABLE), new_state, source, timestamp,
+                        machine.get('lastUpdated'))
+        ])
+        
+        log.debug("Updated to %s", new_state)
         
     except Exception as e:
-        print(f"Error updating machine state: {e}")
+        log.error("Error updating machine state: %s", e)
         raise
+    
+    # Tell whoever asked to know; a failed notification never undoes the transition
+    try:
+        notify_subscribers(machine_id, new_state, timestamp)
+    except Exception as e:
+        log.error("Error notifying subscribers: %s", e)
 
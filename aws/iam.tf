@@ -78,6 +78,41 @@ resource "aws_iam_role" "modifyWebConnectionsRole" {
   path = "/service-role/"
 }
 
+resource "aws_iam_policy" "web_connections_policy" {
+  name        = "WebConnectionsPolicy"
+  description = "Policy to allow tracking WebSocket connections and their machine subscriptions"
+  policy = jsonencode({
+    "Version" : "2012-10-17",
+    "Statement" : [
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:PutItem",
+          "dynamodb:DeleteItem"
+        ],
+        "Resource" : [
+          "arn:aws:dynamodb:ap-southeast-1:149536472280:table/WebSocketConnections",
+          "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineSubscriptions"
+        ]
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "logs:CreateLogGroup",
+          "logs:CreateLogStream",
+          "logs:PutLogEvents"
+        ],
+        "Resource" : "arn:aws:logs:*:*:*"
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "web_connections_role_attach" {
+  role       = aws_iam_role.modifyWebConnectionsRole.name
+  policy_arn = aws_iam_policy.web_connections_policy.arn
+}
+
 resource "aws_iam_role" "archiveOldDataRole" {
   name = "archiveOldDataRole"
   assume_role_policy = jsonencode({
@@ -194,14 +229,15 @@ resource "aws_iam_role" "storeDataRole" {
 
 resource "aws_iam_policy" "store_data_policy" {
   name        = "storeDataPolicy"
-  description = "Policy to allow DynamoDB PutItem access for VibrationData table"
+  description = "Policy to allow DynamoDB write access for VibrationData table"
   policy = jsonencode({
     "Version": "2012-10-17",
     "Statement": [
       {
         "Effect": "Allow",
         "Action": [
-          "dynamodb:PutItem"
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem"
         ],
         "Resource": "arn:aws:dynamodb:ap-southeast-1:149536472280:table/VibrationData"
       }
@@ -254,20 +290,26 @@ resource "aws_iam_role" "shuffleMachineStatusRole" {
   
 }
 
-# Define policy to allow Scan and UpdateItem actions on MachineStatusTable
+# Define policy to allow per-building Query and UpdateItem actions on MachineStatusTable
 resource "aws_iam_policy" "shuffle_machine_status_policy" {
   name        = "ShuffleMachineStatusPolicy"
-  description = "Policy to allow DynamoDB Scan and UpdateItem access for MachineStatusTable"
+  description = "Policy to allow DynamoDB Query and UpdateItem access for MachineStatusTable"
   policy = jsonencode({
     "Version": "2012-10-17",
     "Statement": [
       {
         "Effect": "Allow",
         "Action": [
-          "dynamodb:Scan",
           "dynamodb:UpdateItem"
         ],
         "Resource": "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineStatusTable"
+      },
+      {
+        "Effect": "Allow",
+        "Action": [
+          "dynamodb:Query"
+        ],
+        "Resource": "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineStatusTable/index/BuildingIndex"
       }
     ]
   })
@@ -297,6 +339,36 @@ resource "aws_iam_role" "processCameraJSONRole" {
   
 }
 
+# Policy for processCameraJSONFunction: read the exported model and the latest keypoints
+resource "aws_iam_policy" "process_camera_json_policy" {
+  name        = "ProcessCameraJSONPolicy"
+  description = "Policy to allow S3 GetObject on the pretrained model bucket and DynamoDB Scan on CameraImageJSON"
+  policy = jsonencode({
+    "Version": "2012-10-17",
+    "Statement": [
+      {
+        "Effect": "Allow",
+        "Action": [
+          "s3:GetObject"
+        ],
+        "Resource": "arn:aws:s3:::pretrained-model-dllm/*"
+      },
+      {
+        "Effect": "Allow",
+        "Action": [
+          "dynamodb:Scan"
+        ],
+        "Resource": "arn:aws:dynamodb:ap-southeast-1:149536472280:table/CameraImageJSON"
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "process_camera_json_policy_attach" {
+  role       = aws_iam_role.processCameraJSONRole.name
+  policy_arn = aws_iam_policy.process_camera_json_policy.arn
+}
+
 # Define policy to allow UpdateItem action on MachineStatusTable for postCameraImageJSONRole
 resource "aws_iam_policy" "post_camera_image_update_machine_status_policy" {
   name        = "PostCameraImageUpdateMachineStatusPolicy"
@@ -350,8 +422,10 @@ resource "aws_iam_policy" "camera_data_policy" {
         "Effect" : "Allow",
         "Action" : [
           "dynamodb:PutItem",
+          "dynamodb:BatchWriteItem",
           "dynamodb:Query",
-          "dynamodb:GetItem"
+          "dynamodb:GetItem",
+          "dynamodb:BatchGetItem"
         ],
         "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/CameraDetectionData"
       },
@@ -420,6 +494,35 @@ resource "aws_iam_policy" "state_machine_policy" {
           "arn:aws:dynamodb:ap-southeast-1:149536472280:table/VibrationData"
         ]
       },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:GetItem"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineUsageRollup"
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:PutItem"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineStateHistory"
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:Query",
+          "dynamodb:DeleteItem"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineSubscriptions"
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "execute-api:ManageConnections"
+        ],
+        "Resource" : "${aws_apigatewayv2_api.MachineStatusAPI.execution_arn}/${var.websocket_stage}/POST/@connections/*"
+      },
       {
         "Effect" : "Allow",
         "Action" : [
@@ -459,4 +562,276 @@ resource "aws_iam_policy" "store_data_lambda_invoke_policy" {
 resource "aws_iam_role_policy_attachment" "store_data_lambda_invoke_attach" {
   role       = aws_iam_role.storeDataRole.name
   policy_arn = aws_iam_policy.store_data_lambda_invoke_policy.arn
-}
\ No newline at end of file
+}
+
+resource "aws_iam_role" "usageRollupRole" {
+  name = "usageRollupRole"
+  assume_role_policy = jsonencode({
+    "Version" : "2012-10-17",
+    "Statement" : [
+      {
+        "Effect" : "Allow",
+        "Principal" : {
+          "Service" : "lambda.amazonaws.com"
+        },
+        "Action" : "sts:AssumeRole"
+      }
+    ]
+  })
+  path = "/service-role/"
+}
+
+resource "aws_iam_policy" "usage_rollup_policy" {
+  name        = "usageRollupPolicy"
+  description = "Policy to allow reading raw data and writing MachineUsageRollup"
+  policy = jsonencode({
+    "Version" : "2012-10-17",
+    "Statement" : [
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:Query"
+        ],
+        "Resource" : [
+          "arn:aws:dynamodb:ap-southeast-1:149536472280:table/VibrationData",
+          "arn:aws:dynamodb:ap-southeast-1:149536472280:table/CameraDetectionData"
+        ]
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:Scan"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineStatusTable"
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:Query",
+          "dynamodb:BatchWriteItem"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineUsageRollup"
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "usage_rollup_role_attach" {
+  role       = aws_iam_role.usageRollupRole.name
+  policy_arn = aws_iam_policy.usage_rollup_policy.arn
+}
+
+resource "aws_iam_role" "usageQueryRole" {
+  name = "usageQueryRole"
+  assume_role_policy = jsonencode({
+    "Version" : "2012-10-17",
+    "Statement" : [
+      {
+        "Effect" : "Allow",
+        "Principal" : {
+          "Service" : "lambda.amazonaws.com"
+        },
+        "Action" : "sts:AssumeRole"
+      }
+    ]
+  })
+  path = "/service-role/"
+}
+
+resource "aws_iam_policy" "usage_query_policy" {
+  name        = "usageQueryPolicy"
+  description = "Policy to allow DynamoDB Query access for MachineUsageRollup table"
+  policy = jsonencode({
+    "Version" : "2012-10-17",
+    "Statement" : [
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:Query"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineUsageRollup"
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "usage_query_role_attach" {
+  role       = aws_iam_role.usageQueryRole.name
+  policy_arn = aws_iam_policy.usage_query_policy.arn
+}
+
+resource "aws_iam_role" "sweepTimedStatesRole" {
+  name = "sweepTimedStatesRole"
+  assume_role_policy = jsonencode({
+    "Version" : "2012-10-17",
+    "Statement" : [
+      {
+        "Effect" : "Allow",
+        "Principal" : {
+          "Service" : "lambda.amazonaws.com"
+        },
+        "Action" : "sts:AssumeRole"
+      }
+    ]
+  })
+  path = "/service-role/"
+}
+
+resource "aws_iam_policy" "sweep_timed_states_policy" {
+  name        = "sweepTimedStatesPolicy"
+  description = "Policy to allow querying DeadlineIndex and applying timed transitions on MachineStatusTable"
+  policy = jsonencode({
+    "Version" : "2012-10-17",
+    "Statement" : [
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:Query"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineStatusTable/index/DeadlineIndex"
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:UpdateItem"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineStatusTable"
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:PutItem"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineStateHistory"
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:Query",
+          "dynamodb:DeleteItem"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineSubscriptions"
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "execute-api:ManageConnections"
+        ],
+        "Resource" : "${aws_apigatewayv2_api.MachineStatusAPI.execution_arn}/${var.websocket_stage}/POST/@connections/*"
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "logs:CreateLogGroup",
+          "logs:CreateLogStream",
+          "logs:PutLogEvents"
+        ],
+        "Resource" : "arn:aws:logs:*:*:*"
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "sweep_timed_states_role_attach" {
+  role       = aws_iam_role.sweepTimedStatesRole.name
+  policy_arn = aws_iam_policy.sweep_timed_states_policy.arn
+}
+
+resource "aws_iam_role" "profileCycleTimesRole" {
+  name = "profileCycleTimesRole"
+  assume_role_policy = jsonencode({
+    "Version" : "2012-10-17",
+    "Statement" : [
+      {
+        "Effect" : "Allow",
+        "Principal" : {
+          "Service" : "lambda.amazonaws.com"
+        },
+        "Action" : "sts:AssumeRole"
+      }
+    ]
+  })
+  path = "/service-role/"
+}
+
+resource "aws_iam_policy" "profile_cycle_times_policy" {
+  name        = "profileCycleTimesPolicy"
+  description = "Policy to allow reading MachineUsageRollup and publishing cycle profiles"
+  policy = jsonencode({
+    "Version" : "2012-10-17",
+    "Statement" : [
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:Query"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineUsageRollup"
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:Scan",
+          "dynamodb:UpdateItem"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineStatusTable"
+      },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "logs:CreateLogGroup",
+          "logs:CreateLogStream",
+          "logs:PutLogEvents"
+        ],
+        "Resource" : "arn:aws:logs:*:*:*"
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "profile_cycle_times_role_attach" {
+  role       = aws_iam_role.profileCycleTimesRole.name
+  policy_arn = aws_iam_policy.profile_cycle_times_policy.arn
+}
+
+resource "aws_iam_role" "historyQueryRole" {
+  name = "historyQueryRole"
+  assume_role_policy = jsonencode({
+    "Version" : "2012-10-17",
+    "Statement" : [
+      {
+        "Effect" : "Allow",
+        "Principal" : {
+          "Service" : "lambda.amazonaws.com"
+        },
+        "Action" : "sts:AssumeRole"
+      }
+    ]
+  })
+  path = "/service-role/"
+}
+
+resource "aws_iam_policy" "history_query_policy" {
+  name        = "historyQueryPolicy"
+  description = "Policy to allow querying MachineStateHistory"
+  policy = jsonencode({
+    "Version" : "2012-10-17",
+    "Statement" : [
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "dynamodb:Query"
+        ],
+        "Resource" : "arn:aws:dynamodb:ap-southeast-1:149536472280:table/MachineStateHistory"
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "history_query_role_attach" {
+  role       = aws_iam_role.historyQueryRole.name
+  policy_arn = aws_iam_policy.history_query_policy.arn
+}
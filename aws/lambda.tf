@@ -1,14 +1,56 @@
 # Files for Lambda Functions
 data "archive_file" "archiveOldDataFunction" {
   type        = "zip"
-  source_file = "functions/archiveOldDataFunction.py"
   output_path = "functions/archiveOldDataFunction.zip"
+
+  source {
+    content  = file("functions/archiveOldDataFunction.py")
+    filename = "archiveOldDataFunction.py"
+  }
+
+  # Shared response encoding, imported as a top-level module
+  source {
+    content  = file("functions/serialization.py")
+    filename = "serialization.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
 }
 
 data "archive_file" "postCameraImageJSONFunction" {
   type        = "zip"
-  source_file = "functions/postCameraImageJSONFunction.py"
   output_path = "functions/postCameraImageJSONFunction.zip"
+
+  source {
+    content  = file("functions/postCameraImageJSONFunction.py")
+    filename = "postCameraImageJSONFunction.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
+}
+
+data "archive_file" "subscribeFunction" {
+  type        = "zip"
+  output_path = "functions/subscribeFunction.zip"
+
+  source {
+    content  = file("functions/subscribeFunction.py")
+    filename = "subscribeFunction.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
 }
 
 data "archive_file" "seedMachineFunction" {
@@ -19,34 +61,122 @@ data "archive_file" "seedMachineFunction" {
 
 data "archive_file" "disconnectFunction" {
   type        = "zip"
-  source_file = "functions/disconnectFunction.py"
   output_path = "functions/disconnectFunction.zip"
+
+  source {
+    content  = file("functions/disconnectFunction.py")
+    filename = "disconnectFunction.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
 }
 
 data "archive_file" "connectFunction" {
   type        = "zip"
-  source_file = "functions/connectFunction.py"
   output_path = "functions/connectFunction.zip"
+
+  source {
+    content  = file("functions/connectFunction.py")
+    filename = "connectFunction.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
 }
 
 data "archive_file" "fetchMachineStatusFunction" {
   type        = "zip"
-  source_file = "functions/fetchMachineStatusFunction.py"
   output_path = "functions/fetchMachineStatusFunction.zip"
+
+  source {
+    content  = file("functions/fetchMachineStatusFunction.py")
+    filename = "fetchMachineStatusFunction.py"
+  }
+
+  # Shared response encoding, imported as a top-level module
+  source {
+    content  = file("functions/serialization.py")
+    filename = "serialization.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
+
+  # Structured logger, imported as a top-level module
+  source {
+    content  = file("functions/structured_log.py")
+    filename = "structured_log.py"
+  }
 }
 
 data "archive_file" "storeDataFunction" {
   type        = "zip"
-  source_file = "functions/storeDataFunction.mjs"
   output_path = "functions/storeDataFunction.zip"
-  
+
+  source {
+    content  = file("functions/storeDataFunction.py")
+    filename = "storeDataFunction.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
+
+  # Structured logger, imported as a top-level module
+  source {
+    content  = file("functions/structured_log.py")
+    filename = "structured_log.py"
+  }
 }
 
 data "archive_file" "shuffle_machine_status" {
   type        = "zip"
-  source_file = "functions/shuffle_machine_status.py"
   output_path = "functions/shuffle_machine_status.zip"
-  
+
+  source {
+    content  = file("functions/shuffle_machine_status.py")
+    filename = "shuffle_machine_status.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
+}
+
+data "archive_file" "processCameraJSONFunction" {
+  type        = "zip"
+  output_path = "functions/processCameraJSONFunction.zip"
+
+  source {
+    content  = file("functions/processCameraJSONFunction.py")
+    filename = "processCameraJSONFunction.py"
+  }
+
+  # Tree walk shared with the training-side export, imported as a top-level module
+  source {
+    content  = file("../task_detection/tree_arrays.py")
+    filename = "tree_arrays.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
 }
 
 # Lambda Functions
@@ -110,6 +240,26 @@ resource "aws_lambda_function" "connectFunction" {
   }
 }
 
+# Subscribe Function for "notify me when ready" WebSocket messages
+resource "aws_lambda_function" "subscribeFunction" {
+  function_name    = "subscribeFunction"
+  handler          = "subscribeFunction.lambda_handler"
+  runtime          = "python3.12"
+  filename         = data.archive_file.subscribeFunction.output_path
+  source_code_hash = data.archive_file.subscribeFunction.output_base64sha256
+  role             = aws_iam_role.modifyWebConnectionsRole.arn
+
+  tracing_config {
+    mode = "Active"
+  }
+
+  environment {
+    variables = {
+      SUBSCRIPTIONS_TABLE = aws_dynamodb_table.MachineSubscriptions.name
+    }
+  }
+}
+
 # Fetch Machine Status Function with a public URL
 resource "aws_lambda_function" "fetchMachineStatusFunction" {
   function_name    = "fetchMachineStatusFunction"
@@ -126,6 +276,7 @@ resource "aws_lambda_function" "fetchMachineStatusFunction" {
   environment {
     variables = {
       MACHINE_STATUS_TABLE = aws_dynamodb_table.MachineStatusTable.name
+      DEFAULT_BUILDING     = var.default_building
     }
   }
 }
@@ -187,17 +338,38 @@ resource "aws_lambda_function" "postCameraImageJSONFunction" {
 
 resource "aws_lambda_function" "storeDataFunction" {
   function_name    = "storeDataFunction"
-  handler          = "storeDataFunction.handler"
-  runtime          = "nodejs20.x"
+  handler          = "storeDataFunction.lambda_handler"
+  runtime          = "python3.12"
   filename         = data.archive_file.storeDataFunction.output_path
   source_code_hash = data.archive_file.storeDataFunction.output_base64sha256
   role             = aws_iam_role.storeDataRole.arn
   timeout          = 30
+  layers           = [var.numpy_layer_arn]
 
   environment {
     variables = {
       DYNAMODB_TABLE       = "VibrationData"
       STATE_MACHINE_FUNCTION = aws_lambda_function.updateMachineStateFunction.function_name
+      WINDOW_SECONDS       = tostring(var.vibration_window_seconds)
+    }
+  }
+}
+
+# Camera pose classifier; NumPy-only so it needs no pandas/scikit-learn layer
+resource "aws_lambda_function" "processCameraJSONFunction" {
+  function_name    = "processCameraJSONFunction"
+  handler          = "processCameraJSONFunction.lambda_handler"
+  runtime          = "python3.12"
+  filename         = data.archive_file.processCameraJSONFunction.output_path
+  source_code_hash = data.archive_file.processCameraJSONFunction.output_base64sha256
+  role             = aws_iam_role.processCameraJSONRole.arn
+  memory_size      = 128
+  timeout          = 10
+  layers           = [var.numpy_layer_arn]
+
+  environment {
+    variables = {
+      MODEL_KEY = "json_model.npz"
     }
   }
 }
@@ -227,6 +399,7 @@ resource "aws_lambda_function" "shuffle_machine_status" {
   environment {
     variables = {
       MACHINE_STATUS_TABLE = aws_dynamodb_table.MachineStatusTable.name
+      DEFAULT_BUILDING     = var.default_building
     }
   }
   
@@ -235,21 +408,59 @@ resource "aws_lambda_function" "shuffle_machine_status" {
 # Archive files for new Lambda functions
 data "archive_file" "processCameraDataFunction" {
   type        = "zip"
-  source_file = "functions/processCameraDataFunction.mjs"
   output_path = "functions/processCameraDataFunction.zip"
+
+  source {
+    content  = file("functions/processCameraDataFunction.py")
+    filename = "processCameraDataFunction.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
+
+  # Structured logger, imported as a top-level module
+  source {
+    content  = file("functions/structured_log.py")
+    filename = "structured_log.py"
+  }
 }
 
 data "archive_file" "updateMachineStateFunction" {
   type        = "zip"
-  source_file = "functions/updateMachineStateFunction.py"
   output_path = "functions/updateMachineStateFunction.zip"
+
+  source {
+    content  = file("functions/updateMachineStateFunction.py")
+    filename = "updateMachineStateFunction.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
+
+  # Structured logger, imported as a top-level module
+  source {
+    content  = file("functions/structured_log.py")
+    filename = "structured_log.py"
+  }
+
+  # "Notify me when ready" fan-out, imported as a top-level module
+  source {
+    content  = file("functions/subscriptions.py")
+    filename = "subscriptions.py"
+  }
 }
 
 # New Lambda: Process Camera Detection Data
 resource "aws_lambda_function" "processCameraDataFunction" {
   function_name    = "processCameraDataFunction"
-  handler          = "processCameraDataFunction.handler"
-  runtime          = "nodejs20.x"
+  handler          = "processCameraDataFunction.lambda_handler"
+  runtime          = "python3.12"
   filename         = data.archive_file.processCameraDataFunction.output_path
   source_code_hash = data.archive_file.processCameraDataFunction.output_base64sha256
   role             = aws_iam_role.cameraDataRole.arn
@@ -286,7 +497,285 @@ resource "aws_lambda_function" "updateMachineStateFunction" {
       MACHINE_STATUS_TABLE   = aws_dynamodb_table.MachineStatusTable.name
       CAMERA_DETECTION_TABLE = aws_dynamodb_table.CameraDetectionData.name
       VIBRATION_DATA_TABLE   = aws_dynamodb_table.VibrationData.name
+      ROLLUP_TABLE           = aws_dynamodb_table.MachineUsageRollup.name
+      HISTORY_TABLE          = aws_dynamodb_table.MachineStateHistory.name
+      SUBSCRIPTIONS_TABLE    = aws_dynamodb_table.MachineSubscriptions.name
+      WEBSOCKET_ENDPOINT     = local.websocket_endpoint
+    }
+  }
+}
+
+
+data "archive_file" "rollupUsageFunction" {
+  type        = "zip"
+  output_path = "functions/rollupUsageFunction.zip"
+
+  source {
+    content  = file("functions/rollupUsageFunction.py")
+    filename = "rollupUsageFunction.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
+
+  # Structured logger, imported as a top-level module
+  source {
+    content  = file("functions/structured_log.py")
+    filename = "structured_log.py"
+  }
+}
+
+data "archive_file" "queryMachineUsageFunction" {
+  type        = "zip"
+  output_path = "functions/queryMachineUsageFunction.zip"
+
+  source {
+    content  = file("functions/queryMachineUsageFunction.py")
+    filename = "queryMachineUsageFunction.py"
+  }
+
+  # Shared request parsing and response encoding, imported as a top-level module
+  source {
+    content  = file("functions/serialization.py")
+    filename = "serialization.py"
+  }
+
+  # Structured logger, imported as a top-level module
+  source {
+    content  = file("functions/structured_log.py")
+    filename = "structured_log.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
+}
+
+# Rolls raw readings and detections up into MachineUsageRollup
+resource "aws_lambda_function" "rollupUsageFunction" {
+  function_name    = "rollupUsageFunction"
+  handler          = "rollupUsageFunction.lambda_handler"
+  runtime          = "python3.12"
+  filename         = data.archive_file.rollupUsageFunction.output_path
+  source_code_hash = data.archive_file.rollupUsageFunction.output_base64sha256
+  role             = aws_iam_role.usageRollupRole.arn
+  timeout          = 120
+
+  tracing_config {
+    mode = "Active"
+  }
+
+  environment {
+    variables = {
+      ROLLUP_TABLE           = aws_dynamodb_table.MachineUsageRollup.name
+      VIBRATION_DATA_TABLE   = aws_dynamodb_table.VibrationData.name
+      CAMERA_DETECTION_TABLE = aws_dynamodb_table.CameraDetectionData.name
+      MACHINE_STATUS_TABLE   = aws_dynamodb_table.MachineStatusTable.name
+      VIBRATION_WINDOW_SECONDS = tostring(var.vibration_window_seconds)
+    }
+  }
+}
+
+# Serves time-range usage from MachineUsageRollup
+resource "aws_lambda_function" "queryMachineUsageFunction" {
+  function_name    = "queryMachineUsageFunction"
+  handler          = "queryMachineUsageFunction.lambda_handler"
+  runtime          = "python3.12"
+  filename         = data.archive_file.queryMachineUsageFunction.output_path
+  source_code_hash = data.archive_file.queryMachineUsageFunction.output_base64sha256
+  role             = aws_iam_role.usageQueryRole.arn
+
+  tracing_config {
+    mode = "Active"
+  }
+
+  environment {
+    variables = {
+      ROLLUP_TABLE = aws_dynamodb_table.MachineUsageRollup.name
     }
   }
 }
 
+resource "aws_lambda_function_url" "queryMachineUsageFunction" {
+  function_name      = aws_lambda_function.queryMachineUsageFunction.function_name
+  authorization_type = "NONE"
+
+  cors {
+    allow_credentials = true
+    allow_origins     = ["http://localhost:5173", "https://dllmnus.vercel.app"]
+    allow_methods     = ["GET"]
+    allow_headers     = ["date", "keep-alive", "content-type"]
+    expose_headers    = ["keep-alive", "date"]
+    max_age           = 86400
+  }
+}
+
+data "archive_file" "sweepTimedStatesFunction" {
+  type        = "zip"
+  output_path = "functions/sweepTimedStatesFunction.zip"
+
+  source {
+    content  = file("functions/sweepTimedStatesFunction.py")
+    filename = "sweepTimedStatesFunction.py"
+  }
+
+  # Timed state definitions are shared with the state machine
+  source {
+    content  = file("functions/updateMachineStateFunction.py")
+    filename = "updateMachineStateFunction.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
+
+  # Structured logger, imported as a top-level module
+  source {
+    content  = file("functions/structured_log.py")
+    filename = "structured_log.py"
+  }
+
+  # "Notify me when ready" fan-out, imported as a top-level module
+  source {
+    content  = file("functions/subscriptions.py")
+    filename = "subscriptions.py"
+  }
+}
+
+# Applies due timed transitions (finishing -> ready-to-unload) from DeadlineIndex
+resource "aws_lambda_function" "sweepTimedStatesFunction" {
+  function_name    = "sweepTimedStatesFunction"
+  handler          = "sweepTimedStatesFunction.lambda_handler"
+  runtime          = "python3.12"
+  filename         = data.archive_file.sweepTimedStatesFunction.output_path
+  source_code_hash = data.archive_file.sweepTimedStatesFunction.output_base64sha256
+  role             = aws_iam_role.sweepTimedStatesRole.arn
+  timeout          = 30
+
+  tracing_config {
+    mode = "Active"
+  }
+
+  environment {
+    variables = {
+      MACHINE_STATUS_TABLE = aws_dynamodb_table.MachineStatusTable.name
+      DEADLINE_INDEX       = "DeadlineIndex"
+      HISTORY_TABLE        = aws_dynamodb_table.MachineStateHistory.name
+      SUBSCRIPTIONS_TABLE  = aws_dynamodb_table.MachineSubscriptions.name
+      WEBSOCKET_ENDPOINT   = local.websocket_endpoint
+    }
+  }
+}
+
+data "archive_file" "profileCycleTimesFunction" {
+  type        = "zip"
+  output_path = "functions/profileCycleTimesFunction.zip"
+
+  source {
+    content  = file("functions/profileCycleTimesFunction.py")
+    filename = "profileCycleTimesFunction.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
+
+  # Structured logger, imported as a top-level module
+  source {
+    content  = file("functions/structured_log.py")
+    filename = "structured_log.py"
+  }
+}
+
+# Learns per-machine cycle-time profiles from MachineUsageRollup minute rows
+resource "aws_lambda_function" "profileCycleTimesFunction" {
+  function_name    = "profileCycleTimesFunction"
+  handler          = "profileCycleTimesFunction.lambda_handler"
+  runtime          = "python3.12"
+  filename         = data.archive_file.profileCycleTimesFunction.output_path
+  source_code_hash = data.archive_file.profileCycleTimesFunction.output_base64sha256
+  role             = aws_iam_role.profileCycleTimesRole.arn
+  timeout          = 300
+
+  tracing_config {
+    mode = "Active"
+  }
+
+  environment {
+    variables = {
+      ROLLUP_TABLE         = aws_dynamodb_table.MachineUsageRollup.name
+      MACHINE_STATUS_TABLE = aws_dynamodb_table.MachineStatusTable.name
+    }
+  }
+}
+
+data "archive_file" "queryMachineHistoryFunction" {
+  type        = "zip"
+  output_path = "functions/queryMachineHistoryFunction.zip"
+
+  source {
+    content  = file("functions/queryMachineHistoryFunction.py")
+    filename = "queryMachineHistoryFunction.py"
+  }
+
+  # Shared response encoding, imported as a top-level module
+  source {
+    content  = file("functions/serialization.py")
+    filename = "serialization.py"
+  }
+
+  # Structured logger, imported as a top-level module
+  source {
+    content  = file("functions/structured_log.py")
+    filename = "structured_log.py"
+  }
+
+  # Opt-in profiling decorator, imported as a top-level module
+  source {
+    content  = file("functions/profiling.py")
+    filename = "profiling.py"
+  }
+}
+
+# Serves machine state transitions from MachineStateHistory
+resource "aws_lambda_function" "queryMachineHistoryFunction" {
+  function_name    = "queryMachineHistoryFunction"
+  handler          = "queryMachineHistoryFunction.lambda_handler"
+  runtime          = "python3.12"
+  filename         = data.archive_file.queryMachineHistoryFunction.output_path
+  source_code_hash = data.archive_file.queryMachineHistoryFunction.output_base64sha256
+  role             = aws_iam_role.historyQueryRole.arn
+
+  tracing_config {
+    mode = "Active"
+  }
+
+  environment {
+    variables = {
+      HISTORY_TABLE = aws_dynamodb_table.MachineStateHistory.name
+    }
+  }
+}
+
+resource "aws_lambda_function_url" "queryMachineHistoryFunction" {
+  function_name      = aws_lambda_function.queryMachineHistoryFunction.function_name
+  authorization_type = "NONE"
+
+  cors {
+    allow_credentials = true
+    allow_origins     = ["http://localhost:5173", "https://dllmnus.vercel.app"]
+    allow_methods     = ["GET"]
+    allow_headers     = ["date", "keep-alive", "content-type"]
+    expose_headers    = ["keep-alive", "date"]
+    max_age           = 86400
+  }
+}
@@ -5,4 +5,12 @@ output "MachineStatusTableValue" {
 
 output "MachineStatusFunctionURL" {
   value = aws_lambda_function_url.fetchMachineStatusFunction.function_url
-}
\ No newline at end of file
+}
+
+output "MachineUsageFunctionURL" {
+  value = aws_lambda_function_url.queryMachineUsageFunction.function_url
+}
+
+output "MachineHistoryFunctionURL" {
+  value = aws_lambda_function_url.queryMachineHistoryFunction.function_url
+}
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Backfill the machine registry attributes on MachineStatusTable.
+
+Items written before the registry model only carry machineID (and sometimes
+type). This adds building, device_type and camera_id so the BuildingIndex
+GSI and the device_type lookups in updateMachineStateFunction cover them:
+
+- building: the machineID prefix ("RVREB-W1" -> "RVREB");
+- device_type: the existing type attribute, else W/D after the prefix;
+- camera_id: from --camera BUILDING=CAMERA_ID, if given.
+
+Attributes already present are never overwritten, so the script can be
+re-run safely. This is a one-off job and the only place that scans the table.
+
+Usage:
+    python3 aws/scripts/migrate_machine_registry.py --camera RVREB=RVREB-cam1 --dry-run
+"""
+
+import argparse
+import sys
+
+import boto3
+
+DEVICE_TYPES = {'W': 'washer', 'D': 'dryer'}
+
+
+def derive_registry(item, camera_ids=None):
+    """Registry attributes for an item; values that cannot be derived are omitted"""
+    machine_id = item['machineID']
+    prefix, _, name = machine_id.rpartition('-')
+    derived = {}
+
+    building = item.get('building') or prefix
+    if building:
+        derived['building'] = building
+
+    device_type = item.get('device_type') or item.get('type') or DEVICE_TYPES.get(name[:1].upper())
+    if device_type:
+        derived['device_type'] = device_type
+
+    camera_id = item.get('camera_id') or (camera_ids or {}).get(building)
+    if camera_id:
+        derived['camera_id'] = camera_id
+    return derived
+
+
+def scan_items(table):
+    response = table.scan()
+    yield from response.get('Items', [])
+    while 'LastEvaluatedKey' in response:
+        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
+        yield from response.get('Items', [])
+
+
+def migrate(table, camera_ids=None, dry_run=False):
+    """Add missing registry attributes; returns counts of updated, unchanged and incomplete items"""
+    counts = {'updated': 0, 'unchanged': 0, 'incomplete': 0}
+    for item in scan_items(table):
+        derived = derive_registry(item, camera_ids)
+        missing = {name: value for name, value in derived.items() if name not in item}
+        if len(derived) < 3:
+            counts['incomplete'] += 1
+            print(f"{item['machineID']}: could not derive {sorted({'building', 'device_type', 'camera_id'} - set(derived))}")
+        if not missing:
+            counts['unchanged'] += 1
+            continue
+
+        print(f"{item['machineID']}: set {missing}{' (dry run)' if dry_run else ''}")
+        if not dry_run:
+            table.update_item(
+                Key={'machineID': item['machineID']},
+                UpdateExpression='SET ' + ', '.join(f'#{name} = if_not_exists(#{name}, :{name})' for name in missing),
+                ExpressionAttributeNames={f'#{name}': name for name in missing},
+                ExpressionAttributeValues={f':{name}': value for name, value in missing.items()}
+            )
+        counts['updated'] += 1
+    return counts
+
+
+def parse_cameras(pairs):
+    cameras = {}
+    for pair in pairs or []:
+        building, sep, camera_id = pair.partition('=')
+        if not sep or not building or not camera_id:
+            raise argparse.ArgumentTypeError(f"Expected BUILDING=CAMERA_ID, got {pair!r}")
+        cameras[building] = camera_id
+    return cameras
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill building, device_type and camera_id on MachineStatusTable.")
+    parser.add_argument('--table', default='MachineStatusTable')
+    parser.add_argument('--region', default='ap-southeast-1')
+    parser.add_argument('--camera', action='append', help="BUILDING=CAMERA_ID (repeatable)")
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args(argv)
+
+    table = boto3.resource('dynamodb', region_name=args.region).Table(args.table)
+    counts = migrate(table, parse_cameras(args.camera), args.dry_run)
+    print(f"{counts['updated']} updated, {counts['unchanged']} unchanged, {counts['incomplete']} incomplete")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
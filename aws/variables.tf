@@ -24,4 +24,45 @@ variable "CameraImageJSON" {
   description = "The name of the CameraImageJSON table"
   type        = string
   default     = "CameraImageJSON"
-}
\ No newline at end of file
+}
+variable "numpy_layer_arn" {
+  description = "Lambda layer providing NumPy for the Python functions"
+  type        = string
+  default     = "arn:aws:lambda:ap-southeast-1:336392948345:layer:AWSSDKPandas-Python312:13"
+}
+
+variable "MachineUsageRollup" {
+  description = "The name of the MachineUsageRollup table"
+  type        = string
+  default     = "MachineUsageRollup"
+}
+
+variable "MachineStateHistory" {
+  description = "The name of the MachineStateHistory table"
+  type        = string
+  default     = "MachineStateHistory"
+}
+
+variable "MachineSubscriptions" {
+  description = "The name of the MachineSubscriptions table"
+  type        = string
+  default     = "MachineSubscriptions"
+}
+
+variable "websocket_stage" {
+  description = "Stage of MachineStatusAPI that subscribers connect to"
+  type        = string
+  default     = "production"
+}
+
+variable "default_building" {
+  description = "Building served when a request does not name one"
+  type        = string
+  default     = "RVREB"
+}
+
+variable "vibration_window_seconds" {
+  description = "Length of the VibrationData windows storeDataFunction writes; rollupUsageFunction reads the same windows"
+  type        = number
+  default     = 60
+}
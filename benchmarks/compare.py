@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compare a pytest-benchmark JSON run against a stored baseline.
+
+Usage:
+    python benchmarks/compare.py benchmarks/results/baseline.json benchmarks/results/current.json
+    python benchmarks/compare.py baseline.json current.json --threshold 15 --stat median
+
+Exits with status 1 when any benchmark present in both runs is slower than
+the baseline by more than the threshold percentage.
+"""
+
+import argparse
+import json
+import sys
+
+STATS = ("mean", "median", "min", "max")
+
+
+def load_stats(path, stat):
+    """Map benchmark fullname -> chosen statistic (seconds)"""
+    with open(path, "r") as f:
+        data = json.load(f)
+    return {bench["fullname"]: bench["stats"][stat] for bench in data.get("benchmarks", [])}
+
+
+def compare(baseline, current, threshold):
+    """Return rows of (name, baseline, current, change %, status) and whether any regressed"""
+    rows = []
+    regressed = False
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline:
+            rows.append((name, None, current[name], None, "new"))
+            continue
+        if name not in current:
+            rows.append((name, baseline[name], None, None, "missing"))
+            continue
+        change = (current[name] - baseline[name]) / baseline[name] * 100.0
+        if change > threshold:
+            status = "REGRESSED"
+            regressed = True
+        elif change < -threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((name, baseline[name], current[name], change, status))
+    return rows, regressed
+
+
+def _fmt_time(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare benchmark results against a baseline.")
+    parser.add_argument("baseline", help="Baseline pytest-benchmark JSON")
+    parser.add_argument("current", help="Current pytest-benchmark JSON")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent")
+    parser.add_argument("--stat", choices=STATS, default="median", help="Statistic to compare")
+    args = parser.parse_args(argv)
+
+    rows, regressed = compare(load_stats(args.baseline, args.stat), load_stats(args.current, args.stat),
+                              args.threshold)
+
+    width = max((len(row[0]) for row in rows), default=10)
+    print(f"{'benchmark':{width}s} {'baseline':>10s} {'current':>10s} {'change':>8s}  status")
+    for name, base, cur, change, status in rows:
+        change_str = f"{change:+.1f}%" if change is not None else "-"
+        print(f"{name:{width}s} {_fmt_time(base):>10s} {_fmt_time(cur):>10s} {change_str:>8s}  {status}")
+
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Shared fixtures for the performance benchmarks.
+
+Run with:
+    pytest benchmarks/ --benchmark-json=benchmarks/results/current.json
+    python benchmarks/compare.py benchmarks/results/baseline.json benchmarks/results/current.json
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_aws
+
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT, ROOT / "task_detection", ROOT / "aws" / "functions"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+REGION = "us-east-1"
+os.environ.setdefault("AWS_DEFAULT_REGION", REGION)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-large", action="store_true", default=False,
+        help="Include the largest dataset sizes (slow under moto)",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "large: largest dataset sizes, enabled with --run-large")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-large"):
+        return
+    skip_large = pytest.mark.skip(reason="needs --run-large")
+    for item in items:
+        if "large" in item.keywords:
+            item.add_marker(skip_large)
+
+
+@pytest.fixture
+def aws():
+    """Moto-backed DynamoDB tables and S3 bucket used by the Lambda handlers"""
+    with mock_aws():
+        client = boto3.client("dynamodb", region_name=REGION)
+        client.create_table(
+            TableName="MachineStatusTable",
+            AttributeDefinitions=[
+                {"AttributeName": "machineID", "AttributeType": "S"},
+                {"AttributeName": "building", "AttributeType": "S"},
+            ],
+            KeySchema=[{"AttributeName": "machineID", "KeyType": "HASH"}],
+            GlobalSecondaryIndexes=[{
+                "IndexName": "BuildingIndex",
+                "KeySchema": [
+                    {"AttributeName": "building", "KeyType": "HASH"},
+                    {"AttributeName": "machineID", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            }],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        client.create_table(
+            TableName="CameraDetectionData",
+            AttributeDefinitions=[
+                {"AttributeName": "machine_id", "AttributeType": "S"},
+                {"AttributeName": "detection_key", "AttributeType": "S"},
+            ],
+            KeySchema=[
+                {"AttributeName": "machine_id", "KeyType": "HASH"},
+                {"AttributeName": "detection_key", "KeyType": "RANGE"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        client.create_table(
+            TableName="VibrationData",
+            AttributeDefinitions=[
+                {"AttributeName": "timestamp_value", "AttributeType": "S"},
+                {"AttributeName": "machine_id", "AttributeType": "S"},
+            ],
+            KeySchema=[
+                {"AttributeName": "timestamp_value", "KeyType": "HASH"},
+                {"AttributeName": "machine_id", "KeyType": "RANGE"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        client.create_table(
+            TableName="MachineStateHistory",
+            AttributeDefinitions=[
+                {"AttributeName": "machine_id", "AttributeType": "S"},
+                {"AttributeName": "timestamp", "AttributeType": "N"},
+            ],
+            KeySchema=[
+                {"AttributeName": "machine_id", "KeyType": "HASH"},
+                {"AttributeName": "timestamp", "KeyType": "RANGE"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        boto3.client("s3", region_name=REGION).create_bucket(Bucket="archived-data-dllm")
+        yield boto3.resource("dynamodb", region_name=REGION)
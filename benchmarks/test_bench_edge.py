@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+
+from CS3237_camera_model_3 import get_prediction, get_predictions, load_classifier
+from img_receiver_aws import CameraDataProcessor, InMemoryPublisher
+
+BATCH_SIZE = 256
+WEIGHTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "task_detection", "yolov7-w6-pose.pt")
+
+
+def _keypoints(n, seed=0):
+    rng = np.random.default_rng(seed)
+    keypoints = rng.random((n, 51), dtype=np.float32)
+    keypoints[:, 0::3] *= 960
+    keypoints[:, 1::3] *= 960
+    return keypoints
+
+
+@pytest.fixture(scope="module", autouse=True)
+def warm_classifier():
+    load_classifier()
+
+
+def test_get_prediction_single(benchmark):
+    frames = [row.tolist() for row in _keypoints(BATCH_SIZE)]
+    benchmark(lambda: [get_prediction(frame) for frame in frames])
+
+
+def test_get_prediction_batched(benchmark):
+    frames = _keypoints(BATCH_SIZE)
+    benchmark(get_predictions, frames)
+
+
+def test_calculate_confidence(benchmark):
+    processor = CameraDataProcessor(source=object(), publisher=InMemoryPublisher())
+    keypoints = _keypoints(1)[0].tolist()
+    benchmark(processor.calculate_confidence, keypoints)
+
+
+@pytest.mark.parametrize("device", ["cpu", "cuda", "mps"])
+def test_pose_engine_per_frame(benchmark, device):
+    pytest.importorskip("torch")
+    if not os.path.exists(WEIGHTS):
+        pytest.skip("yolov7-w6-pose.pt not downloaded")
+    from pose_engine import PoseEngine, available_devices
+
+    if device not in available_devices():
+        pytest.skip(f"{device} not available")
+
+    engine = PoseEngine(WEIGHTS, device=device)
+    image = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    engine.keypoints(image)  # warm-up
+    benchmark.pedantic(engine.keypoints, args=(image,), rounds=10, iterations=1)
@@ -0,0 +1,84 @@
+import importlib
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+
+def _import_handler(name, monkeypatch):
+    monkeypatch.setenv("MACHINE_STATUS_TABLE", "MachineStatusTable")
+    monkeypatch.setenv("CAMERA_DETECTION_TABLE", "CameraDetectionData")
+    monkeypatch.setenv("VIBRATION_DATA_TABLE", "VibrationData")
+    monkeypatch.setenv("ARCHIVE_BUCKET_NAME", "archived-data-dllm")
+    return importlib.reload(importlib.import_module(f"aws.functions.{name}"))
+
+
+def _seed_machines(table, count):
+    with table.batch_writer() as batch:
+        for i in range(count):
+            kind = "W" if i % 2 else "D"
+            batch.put_item(Item={
+                "machineID": f"RVREB-{kind}{i}",
+                "building": "RVREB",
+                "device_type": "washer" if kind == "W" else "dryer",
+                "status": "available",
+                "lastUpdated": Decimal(str(time.time())),
+            })
+
+
+@pytest.mark.parametrize("source", ["camera", "imu"])
+def test_update_machine_state_per_event(benchmark, aws, monkeypatch, source):
+    module = _import_handler("updateMachineStateFunction", monkeypatch)
+    _seed_machines(aws.Table("MachineStatusTable"), 10)
+    data = (
+        {"machine_id": "RVREB-W1", "is_bending": True, "confidence": 0.9, "device_type": "washer"}
+        if source == "camera"
+        else {"machine_id": "RVREB-W1", "is_spinning": 0, "confidence": 0.9, "device_type": "washer"}
+    )
+
+    benchmark(module.lambda_handler, {"source": source, "data": data}, None)
+
+
+@pytest.mark.parametrize("machines", [10, 100, 1000])
+@pytest.mark.parametrize("shape", ["items", "columnar-gzip"])
+def test_fetch_machine_status(benchmark, aws, monkeypatch, machines, shape):
+    module = _import_handler("fetchMachineStatusFunction", monkeypatch)
+    _seed_machines(aws.Table("MachineStatusTable"), machines)
+    event = {} if shape == "items" else {
+        "queryStringParameters": {"format": "columnar"},
+        "headers": {"accept-encoding": "gzip"},
+    }
+
+    response = benchmark(module.lambda_handler, event, None)
+    assert response["statusCode"] == 200
+
+
+@pytest.mark.parametrize("items", [
+    1_000,
+    10_000,
+    pytest.param(100_000, marks=pytest.mark.large),
+])
+def test_archive_old_data(benchmark, aws, monkeypatch, items):
+    module = _import_handler("archiveOldDataFunction", monkeypatch)
+    table = aws.Table("VibrationData")
+    old = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    def seed():
+        s3 = module.s3
+        s3.delete_object(Bucket=os.environ["ARCHIVE_BUCKET_NAME"], Key=module.S3_KEY)
+        with table.batch_writer() as batch:
+            for i in range(items):
+                batch.put_item(Item={
+                    "timestamp_value": (old - timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "machine_id": f"RVREB-W{i % 4}",
+                    "vibration": Decimal(i % 7),
+                })
+        return (), {}
+
+    def archive():
+        return module.lambda_handler({}, None)
+
+    response = benchmark.pedantic(archive, setup=seed, rounds=3, iterations=1)
+    assert response["statusCode"] == 200
@@ -0,0 +1,83 @@
+"""
+Per-machine temporal detection state for CameraDataProcessor.
+
+The processor scores each detection by how many detections the same machine
+had in the last few seconds. With one processor that history can live in
+process memory; when several processor instances share the camera feed
+(MQTT shared subscriptions without camera affinity), they must share it
+too, or each instance sees only part of a machine's detections.
+
+    InMemoryDetectionState   one process (default, or with camera affinity)
+    SQLiteDetectionState     several processes on one host, via a WAL-mode
+                             SQLite file
+
+open_detection_state('memory') / open_detection_state('sqlite:/var/lib/dllm/state.db')
+"""
+
+import sqlite3
+import threading
+
+TEMPORAL_WINDOW_S = 10
+
+
+class InMemoryDetectionState:
+    def __init__(self, window=TEMPORAL_WINDOW_S):
+        self.window = window
+        self.detections = {}  # machine_id -> list of recent detection times
+        self._lock = threading.Lock()
+
+    def record(self, machine_id, timestamp):
+        """Add a detection and return the machine's detection count within the window"""
+        cutoff = timestamp - self.window
+        with self._lock:
+            recent = [t for t in self.detections.get(machine_id, []) if t > cutoff]
+            recent.append(timestamp)
+            self.detections[machine_id] = recent
+            return len(recent)
+
+    def close(self):
+        pass
+
+
+class SQLiteDetectionState:
+    def __init__(self, path, window=TEMPORAL_WINDOW_S, timeout=5.0):
+        self.window = window
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS detections (machine_id TEXT NOT NULL, timestamp REAL NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS detections_machine ON detections (machine_id, timestamp)')
+        self._lock = threading.Lock()
+
+    def record(self, machine_id, timestamp):
+        """Add a detection and return the machine's detection count within the window"""
+        cutoff = timestamp - self.window
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so concurrent processes serialise
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('DELETE FROM detections WHERE machine_id = ? AND timestamp <= ?',
+                                   (machine_id, cutoff))
+                self._conn.execute('INSERT INTO detections (machine_id, timestamp) VALUES (?, ?)',
+                                   (machine_id, timestamp))
+                (count,) = self._conn.execute('SELECT COUNT(*) FROM detections WHERE machine_id = ?',
+                                              (machine_id,)).fetchone()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return count
+
+    def close(self):
+        self._conn.close()
+
+
+def open_detection_state(spec='memory', window=TEMPORAL_WINDOW_S):
+    """Backend from a spec string: 'memory' or 'sqlite:<path>'"""
+    if spec == 'memory':
+        return InMemoryDetectionState(window)
+    if spec.startswith('sqlite:'):
+        return SQLiteDetectionState(spec[len('sqlite:'):], window)
+    raise ValueError(f"Unknown detection state backend: {spec}")
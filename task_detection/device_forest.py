@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Server-side port of the washer/dryer random forests that run on the IMU
+devices.
+
+The device classifiers (arduino/*/imu_*/*_clf.h) are Eloquent-exported
+RandomForests: one nested if/else block per tree that adds a vote. This
+module parses those headers - or a fitted scikit-learn forest - into
+flattened array-backed trees and scores many feature vectors at once, so
+archived VibrationData can be re-scored and compared with what the devices
+reported.
+
+Features are [ax, ay, az, acc_magn] as built in pred_*_status(); use
+device_features() to derive them from raw accelerometer readings. Inputs are
+rounded to float32 and compared in double precision, exactly like the C
+code, so predictions match the device bit for bit.
+
+Usage:
+    python3 device_forest.py --header ../arduino/Washer/imu_washer/washer_clf.h --input vibration.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+import tree_arrays
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEVICE_HEADERS = {
+    'washer': os.path.join(ROOT, 'arduino', 'Washer', 'imu_washer', 'washer_clf.h'),
+    'dryer': os.path.join(ROOT, 'arduino', 'Dryer', 'imu_dryer', 'dryer_clf.h'),
+}
+FEATURE_NAMES = ('ax', 'ay', 'az', 'acc_magn')
+
+_SPLIT = re.compile(r'if \(x\[(\d+)\] <= ([-+0-9.eE]+)f?\) \{')
+_VOTE = re.compile(r'votes\[(\d+)\] \+= 1;')
+_VOTES_DECL = re.compile(r'votes\[(\d+)\] = \{')
+
+
+class ForestParseError(ValueError):
+    """Raised when a classifier header does not have the exported forest layout"""
+
+
+def device_features(ax, ay, az):
+    """
+    Feature matrix for raw accelerometer readings, as computed on the device:
+    acc_magn is the magnitude truncated to int16
+    """
+    ax, ay, az = (np.asarray(v, dtype=np.int64) for v in (ax, ay, az))
+    acc_magn = np.sqrt((ax * ax + ay * ay + az * az).astype(np.float64)).astype(np.int16)
+    return np.column_stack([ax, ay, az, acc_magn]).astype(np.float32)
+
+
+class FlatForest:
+    """
+    Trees stored as parallel arrays. Node i is a split on feature[i] at
+    threshold[i] (go to left[i] if x <= threshold) or, when feature[i] is -1,
+    a leaf voting for value[i]. roots[t] is the first node of tree t.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, n_classes):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.int32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.n_classes = int(n_classes)
+        self.depth = self._depth()
+        self.max_depth = int(self.depth.max()) if self.n_nodes else 0
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def _depth(self):
+        depth = np.zeros(self.n_nodes, dtype=np.int32)
+        # Children always follow their parent, so one forward pass suffices
+        for node in range(self.n_nodes):
+            if self.feature[node] >= 0:
+                depth[self.left[node]] = depth[self.right[node]] = depth[node] + 1
+        return depth
+
+    def leaves(self, X):
+        """Leaf index reached in every tree, shape (n_samples, n_trees)"""
+        return tree_arrays.leaves(vars(self), X)
+
+    def votes(self, X):
+        """Votes per class, shape (n_samples, n_classes)"""
+        leaf_class = self.value[self.leaves(X)]
+        sample = np.repeat(np.arange(len(leaf_class)), self.n_trees)
+        counts = np.bincount(sample * self.n_classes + leaf_class.ravel(),
+                             minlength=len(leaf_class) * self.n_classes)
+        return counts.reshape(len(leaf_class), self.n_classes)
+
+    def predict(self, X):
+        """Class per sample; ties go to the lowest class index, as in the C argmax"""
+        return np.argmax(self.votes(X), axis=1)
+
+    def predict_proba(self, X):
+        return self.votes(X) / self.n_trees
+
+    def save(self, path):
+        np.savez_compressed(path, feature=self.feature, threshold=self.threshold, left=self.left,
+                            right=self.right, value=self.value, roots=self.roots,
+                            n_classes=self.n_classes)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['feature'], data['threshold'], data['left'], data['right'],
+                       data['value'], data['roots'], int(data['n_classes']))
+
+    @classmethod
+    def from_header(cls, path):
+        with open(path, 'r') as f:
+            return cls.from_source(f.read())
+
+    @classmethod
+    def from_source(cls, source):
+        """Parse the predict() body of an exported classifier header"""
+        lines = [line.strip() for line in source.splitlines()]
+        lines = [line for line in lines if line and not line.startswith(('//', '/*', '*'))]
+        declared = next((int(m.group(1)) for m in map(_VOTES_DECL.search, lines) if m), None)
+        if declared is None:
+            raise ForestParseError("No votes[] declaration found")
+
+        arrays = {'feature': [], 'threshold': [], 'left': [], 'right': [], 'value': []}
+        roots = []
+        pos = lines.index(next(line for line in lines if _VOTES_DECL.search(line))) + 1
+
+        def add_node(feature=-1, threshold=0.0, value=-1):
+            for name, v in (('feature', feature), ('threshold', threshold), ('left', -1),
+                            ('right', -1), ('value', value)):
+                arrays[name].append(v)
+            return len(arrays['feature']) - 1
+
+        def parse_node(pos):
+            """Parse the subtree starting at lines[pos]; returns (node, next pos)"""
+            split = _SPLIT.fullmatch(lines[pos])
+            if split is None:
+                vote = _VOTE.fullmatch(lines[pos])
+                if vote is None:
+                    raise ForestParseError(f"Unexpected line in tree: {lines[pos]!r}")
+                return add_node(value=int(vote.group(1))), pos + 1
+
+            node = add_node(int(split.group(1)), float(split.group(2)))
+            arrays['left'][node], pos = parse_node(pos + 1)
+            if lines[pos:pos + 2] != ['}', 'else {']:
+                raise ForestParseError(f"Expected else branch near line {pos}")
+            arrays['right'][node], pos = parse_node(pos + 2)
+            if lines[pos] != '}':
+                raise ForestParseError(f"Unclosed else branch near line {pos}")
+            return node, pos + 1
+
+        while pos < len(lines) and (_SPLIT.fullmatch(lines[pos]) or _VOTE.fullmatch(lines[pos])):
+            root, pos = parse_node(pos)
+            roots.append(root)
+        if not roots:
+            raise ForestParseError("No trees found")
+        return cls(roots=roots, n_classes=declared, **arrays)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten a fitted RandomForestClassifier (or a single DecisionTreeClassifier)"""
+        estimators = getattr(model, 'estimators_', [model])
+        arrays = {'feature': [], 'threshold': [], 'left': [], 'right': [], 'value': []}
+        roots = []
+        for estimator in estimators:
+            tree = estimator.tree_
+            offset = len(arrays['feature'])
+            roots.append(offset)
+            is_leaf = tree.children_left < 0
+            arrays['feature'].extend(np.where(is_leaf, -1, tree.feature))
+            arrays['threshold'].extend(np.where(is_leaf, 0.0, tree.threshold))
+            arrays['left'].extend(np.where(is_leaf, -1, tree.children_left + offset))
+            arrays['right'].extend(np.where(is_leaf, -1, tree.children_right + offset))
+            arrays['value'].extend(np.where(is_leaf, tree.value[:, 0, :].argmax(axis=1), -1))
+        return cls(roots=roots, n_classes=len(model.classes_), **arrays)
+
+
+def load_device_forest(device_type):
+    """Forest parsed from the header flashed on a washer or dryer"""
+    return FlatForest.from_header(DEVICE_HEADERS[device_type])
+
+
+def load_readings(path):
+    """Readings from a VibrationData export (JSON list or CSV) as a list of dicts"""
+    with open(path, 'r', newline='') as f:
+        if path.endswith('.csv'):
+            return list(csv.DictReader(f))
+        data = json.load(f)
+    return data.get('Items', data) if isinstance(data, dict) else data
+
+
+def readings_matrix(readings):
+    """Feature matrix for readings carrying ax/ay/az (acc_magn derived if absent)"""
+    readings = [r for r in readings if all(r.get(axis) not in (None, '') for axis in FEATURE_NAMES[:3])]
+    X = device_features(*([int(float(r[axis])) for r in readings] for axis in FEATURE_NAMES[:3]))
+    return readings, X
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score vibration readings with the device forests.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--device', choices=sorted(DEVICE_HEADERS), help="Use the header flashed on this device")
+    source.add_argument('--header', help="Path to an exported *_clf.h")
+    source.add_argument('--model', help="Path to a FlatForest .npz")
+    parser.add_argument('--input', help="VibrationData export (.json or .csv) to score")
+    parser.add_argument('--save', help="Write the flattened forest to this .npz")
+    args = parser.parse_args(argv)
+
+    if args.model:
+        forest = FlatForest.load(args.model)
+    else:
+        forest = FlatForest.from_header(args.header or DEVICE_HEADERS[args.device])
+    print(f"{forest.n_trees} trees, {forest.n_nodes} nodes, max depth {forest.max_depth}")
+    if args.save:
+        forest.save(args.save)
+
+    if args.input:
+        readings, X = readings_matrix(load_readings(args.input))
+        predictions = forest.predict(X)
+        print(f"Scored {len(readings)} readings: {int(predictions.sum())} spinning")
+        reported = [r.get('is_spinning') for r in readings]
+        known = [i for i, v in enumerate(reported) if v not in (None, '')]
+        if known:
+            agree = np.mean([int(float(reported[i])) == predictions[i] for i in known])
+            print(f"Agreement with device-reported is_spinning: {agree:.1%} over {len(known)} readings")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
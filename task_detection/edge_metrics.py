@@ -0,0 +1,232 @@
+"""
+Lightweight metrics for the edge processors.
+
+Counters, gauges and fixed-bucket histograms kept in a MetricsRegistry and
+exported in the Prometheus text format over a local HTTP endpoint, or as
+periodic JSON snapshots on a local MQTT topic. Recording a sample is a dict
+lookup, a bisect and an increment under a per-metric lock, so it is cheap
+enough to wrap every stage of every frame.
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; spans sub-millisecond classification up to multi-second CPU inference
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DEFAULT_METRICS_PORT = 9108
+DEFAULT_METRICS_TOPIC = 'edge/metrics'
+
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(label_key, extra=None):
+    pairs = list(label_key) + list(extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        # One slot per bound plus the +Inf overflow slot; counts are per bucket,
+        # made cumulative only when exported.
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self):
+        with self._lock:
+            counts = list(self.counts)
+        total = 0
+        cumulative = []
+        for count in counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+
+class MetricsRegistry:
+    """Get-or-create store of labelled metrics"""
+
+    def __init__(self):
+        self._metrics = {}  # name -> (type, help, {label_key: metric})
+        self._lock = threading.Lock()
+
+    def _get(self, kind, factory, name, help_text, labels):
+        key = _label_key(labels)
+        family = self._metrics.get(name)
+        if family is None or key not in family[2]:
+            with self._lock:
+                family = self._metrics.setdefault(name, (kind, help_text, {}))
+                if family[0] != kind:
+                    raise ValueError(f"Metric {name} already registered as {family[0]}")
+                family[2].setdefault(key, factory())
+        return family[2][key]
+
+    def counter(self, name, help_text='', labels=None):
+        return self._get('counter', Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text='', labels=None):
+        return self._get('gauge', Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text='', labels=None, buckets=DEFAULT_BUCKETS):
+        return self._get('histogram', lambda: Histogram(buckets), name, help_text, labels)
+
+    @contextmanager
+    def timer(self, name, help_text='', labels=None):
+        """Observe the monotonic duration of the with-block into a histogram"""
+        histogram = self.histogram(name, help_text, labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    def _families(self):
+        """(name, type, help, [(label_key, metric)]) copied under the lock, so a
+        metric registered meanwhile cannot change a dict being iterated"""
+        with self._lock:
+            return [(name, kind, help_text, list(series.items()))
+                    for name, (kind, help_text, series) in self._metrics.items()]
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, kind, help_text, series in sorted(self._families(), key=lambda family: family[0]):
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, metric in sorted(series, key=lambda entry: entry[0]):
+                if kind == 'histogram':
+                    cumulative = metric.cumulative()
+                    for bound, count in zip(metric.bounds + ('+Inf',), cumulative):
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {metric.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {metric.count}")
+                else:
+                    lines.append(f"{name}{_format_labels(key)} {metric.value}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """JSON-serialisable view of all metrics"""
+        snapshot = {'timestamp': time.time(), 'metrics': {}}
+        for name, kind, _, series in self._families():
+            entries = []
+            for key, metric in series:
+                entry = {'labels': dict(key)}
+                if kind == 'histogram':
+                    entry.update({'count': metric.count, 'sum': metric.sum,
+                                  'buckets': dict(zip([str(b) for b in metric.bounds] + ['+Inf'],
+                                                      metric.cumulative()))})
+                else:
+                    entry['value'] = metric.value
+                entries.append(entry)
+            snapshot['metrics'][name] = {'type': kind, 'series': entries}
+        return snapshot
+
+
+class MetricsHTTPServer:
+    """Serves GET /metrics from a registry on a daemon thread"""
+
+    def __init__(self, registry, host='127.0.0.1', port=DEFAULT_METRICS_PORT):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split('?')[0] != '/metrics':
+                    handler.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'text/plain; version=0.0.4')
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MqttMetricsPublisher:
+    """Publishes registry snapshots as JSON to an MQTT topic every interval seconds"""
+
+    def __init__(self, registry, client, topic=DEFAULT_METRICS_TOPIC, interval=15.0):
+        self.registry = registry
+        self.client = client
+        self.topic = topic
+        self.interval = interval
+        self._stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def publish_once(self):
+        self.client.publish(self.topic, json.dumps(self.registry.snapshot()))
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.publish_once()
+            except Exception as e:
+                print(f"ERROR publishing metrics: {e}")
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
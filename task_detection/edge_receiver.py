@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+asyncio edge receiver.
+
+One event loop owns the local MQTT connection (aiomqtt) and routes each
+message by topic filter to its own bounded asyncio.Queue: camera frames on
+/cam/<camera_id> go to CameraDataProcessor, vibration readings on laundry/vibration
+are forwarded to AWS IoT Core. Consumer tasks hand the blocking work to a
+thread pool with run_in_executor, so a slow inference never stalls the
+MQTT connection. When a queue is full the oldest message is dropped and
+counted, which keeps latency bounded under bursts. With --rate-control the
+receiver also publishes frame-rate hints to each camera (rate_control.py)
+from its queue depth, frame service time and detection activity.
+A lost broker connection is retried with exponential backoff (1 s up to
+30 s). SIGINT/SIGTERM stops reading from the broker, drains the queued and
+in-flight work, then closes the AWS connection.
+
+Replaces the paho loop_forever receivers (img_receiver.py, mqtt_img.py).
+
+Scaling out to several processor instances, either:
+  - camera affinity: --partition 0/2 on one instance, --partition 1/2 on
+    the other; each camera is handled by exactly one instance, so
+    per-machine temporal state stays process-local; or
+  - MQTT v5 shared subscriptions: --share-group cams on every instance
+    ($share/cams//cam/+), with the broker spreading frames across them.
+    Brokers that dispatch by topic hash (EMQX hash_topic) keep camera
+    affinity; round-robin brokers (mosquitto) need a shared
+    --detection-state such as sqlite:/var/lib/dllm/detections.db.
+
+Usage:
+    python3 edge_receiver.py --host localhost --workers 2
+    python3 edge_receiver.py --share-group cams --detection-state sqlite:detections.db
+    mosquitto -c mosquitto.conf   # local broker for testing
+"""
+
+import argparse
+import asyncio
+import json
+import signal
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from frame_sources import CAMERA_TOPIC_FILTER, Frame, camera_id_from_topic, topic_matches
+from rate_control import RateController
+
+VIBRATION_TOPIC = 'laundry/vibration'
+AWS_VIBRATION_TOPIC = 'laundry/vibration'
+
+DEFAULT_CAMERA_QUEUE = 4
+DEFAULT_VIBRATION_QUEUE = 256
+DEFAULT_DRAIN_TIMEOUT = 30.0
+RATE_CONTROL_TICK_S = 5.0
+# Backoff between attempts to reach the local broker, doubling up to the max
+RECONNECT_MIN_S = 1.0
+RECONNECT_MAX_S = 30.0
+
+
+def parse_partition(value):
+    """'1/4' -> (1, 4)"""
+    index, count = (int(part) for part in value.split('/'))
+    if not 0 <= index < count:
+        raise ValueError(f"Partition index must be in [0, {count}): {value}")
+    return index, count
+
+
+def camera_partition(camera_id, count):
+    """Stable partition of a camera across processes and restarts (unlike hash())"""
+    return zlib.crc32(camera_id.encode()) % count
+
+
+class Route:
+    """A topic filter with its bounded queue, handler and consumer count"""
+
+    def __init__(self, name, topic_filter, handler, maxsize, consumers=1, accept=None):
+        self.name = name
+        self.topic_filter = topic_filter
+        # Optional per-topic predicate, e.g. this instance's camera partition
+        self.accept = accept
+        self.handler = handler
+        self.maxsize = maxsize
+        self.consumers = consumers
+        self.queue = None
+
+
+class EdgeReceiver:
+    def __init__(self, processor, host='localhost', port=1883, workers=2,
+                 camera_queue=DEFAULT_CAMERA_QUEUE, vibration_queue=DEFAULT_VIBRATION_QUEUE,
+                 drain_timeout=DEFAULT_DRAIN_TIMEOUT, share_group=None, partition=None, rate_control=False):
+        self.processor = processor
+        # The receiver is the processor's frame source, so processor.stop() stops it
+        processor.source = self
+        self.host = host
+        self.port = port
+        self.drain_timeout = drain_timeout
+        self.share_group = share_group
+        self.partition = partition
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='edge-worker')
+        self.routes = [
+            Route('camera', CAMERA_TOPIC_FILTER, self.handle_camera, camera_queue, consumers=workers,
+                  accept=self.owns_camera if partition else None),
+            # Partitioned instances all receive vibration readings; only partition 0 forwards them
+            Route('vibration', VIBRATION_TOPIC, self.handle_vibration, vibration_queue,
+                  accept=(lambda topic: partition[0] == 0) if partition else None),
+        ]
+
+        metrics = processor.metrics
+        self.queue_depth = {r.name: metrics.gauge('edge_queue_depth', 'Messages waiting per route',
+                                                  {'queue': r.name}) for r in self.routes}
+        self.dropped = {r.name: metrics.counter('edge_messages_dropped_total', 'Messages dropped on a full queue',
+                                                {'queue': r.name}) for r in self.routes}
+        self.not_owned = metrics.counter('edge_messages_not_owned_total',
+                                         'Messages left to the instance owning their partition')
+
+        # Frame-rate hints to the cameras, published on the local broker
+        self.rate_controller = RateController(self.publish_control, workers=workers) if rate_control else None
+
+        self._loop = None
+        self._stopping = None
+        self._consumers = []
+        self._client = None
+
+    def owns_camera(self, topic):
+        index, count = self.partition
+        return camera_partition(camera_id_from_topic(topic), count) == index
+
+    def subscription(self, route):
+        """Topic filter to subscribe with, as a shared subscription when a group is set"""
+        if self.share_group:
+            return f"$share/{self.share_group}/{route.topic_filter}"
+        return route.topic_filter
+
+    def publish_control(self, topic, payload):
+        """Send a retained control message to a camera; safe to call from any thread"""
+        if self._client is None or self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(
+            lambda: asyncio.ensure_future(self._client.publish(topic, payload, qos=1, retain=True)))
+
+    def _process_frame(self, frame):
+        """handle_frame on a worker thread; returns the detection and the seconds it took"""
+        start = time.perf_counter()
+        detection = self.processor.handle_frame(frame)
+        return detection, time.perf_counter() - start
+
+    async def handle_camera(self, topic, payload, received_at):
+        frame = Frame(topic, payload, received_at)
+        detection, service_time = await self._loop.run_in_executor(self.executor, self._process_frame, frame)
+        if self.rate_controller is not None:
+            self.rate_controller.frame_done(camera_id_from_topic(topic), service_time, detection is not None)
+
+    async def handle_vibration(self, topic, payload, received_at):
+        try:
+            reading = json.loads(payload)
+        except ValueError:
+            print(f"Ignoring malformed vibration payload: {payload[:40]!r}")
+            return
+        await self._loop.run_in_executor(
+            self.executor, self.processor.publisher.publish, reading, AWS_VIBRATION_TOPIC)
+
+    def dispatch(self, topic, payload, received_at=None):
+        """Queue a message on the first matching route; returns the route name or None"""
+        received_at = received_at if received_at is not None else time.time()
+        for route in self.routes:
+            if not topic_matches(route.topic_filter, topic):
+                continue
+            if route.accept is not None and not route.accept(topic):
+                self.not_owned.inc()
+                return None
+            if route.queue.full():
+                # Newest data wins: drop the oldest queued message
+                dropped_topic, _, _ = route.queue.get_nowait()
+                route.queue.task_done()
+                self.dropped[route.name].inc()
+                if route.name == 'camera' and self.rate_controller is not None:
+                    self.rate_controller.frame_dropped(camera_id_from_topic(dropped_topic))
+            route.queue.put_nowait((topic, payload, received_at))
+            if route.name == 'camera' and self.rate_controller is not None:
+                self.rate_controller.frame_queued(camera_id_from_topic(topic))
+            self.queue_depth[route.name].set(route.queue.qsize())
+            return route.name
+        return None
+
+    async def _consume(self, route):
+        while True:
+            topic, payload, received_at = await route.queue.get()
+            self.queue_depth[route.name].set(route.queue.qsize())
+            try:
+                await route.handler(topic, payload, received_at)
+            except Exception as e:
+                print(f"ERROR handling {route.name} message on {topic}: {e}")
+            finally:
+                route.queue.task_done()
+
+    def start_consumers(self):
+        """Create the route queues and consumer tasks on the running loop"""
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        for route in self.routes:
+            route.queue = asyncio.Queue(maxsize=route.maxsize)
+            self._consumers += [asyncio.create_task(self._consume(route)) for _ in range(route.consumers)]
+        if self.rate_controller is not None:
+            self._consumers.append(asyncio.create_task(self._tick_rate_control()))
+
+    async def _tick_rate_control(self):
+        # Lets cameras fall back to the idle cadence once activity stops
+        while True:
+            await asyncio.sleep(RATE_CONTROL_TICK_S)
+            self.rate_controller.tick()
+
+    async def drain(self):
+        """Wait for queued and in-flight messages, then stop the consumers and tasks"""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(r.queue.join() for r in self.routes)), self.drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"Drain timed out after {self.drain_timeout:g}s; dropping remaining messages")
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        self.executor.shutdown(wait=True)
+
+    async def _read_messages(self, client):
+        async for message in client.messages:
+            self.dispatch(message.topic.value, message.payload)
+
+    async def run(self):
+        import aiomqtt
+
+        self.start_consumers()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(sig, self._stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        try:
+            # Like paho's loop_forever, keep reconnecting until asked to stop
+            backoff = RECONNECT_MIN_S
+            while not self._stopping.is_set():
+                try:
+                    await self._connect_and_read(aiomqtt)
+                    backoff = RECONNECT_MIN_S
+                except aiomqtt.MqttError as e:
+                    if self._stopping.is_set():
+                        break
+                    print(f"Lost local MQTT broker {self.host}:{self.port}: {e}; reconnecting in {backoff:g}s")
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), backoff)
+                    except asyncio.TimeoutError:
+                        pass
+                    backoff = min(backoff * 2, RECONNECT_MAX_S)
+        finally:
+            print("Draining in-flight messages...")
+            await self.drain()
+
+    async def _connect_and_read(self, aiomqtt):
+        """One broker session: subscribe and dispatch until stopped or the connection fails"""
+        print(f"Connecting to local MQTT broker {self.host}:{self.port}...")
+        try:
+            async with aiomqtt.Client(self.host, self.port, protocol=aiomqtt.ProtocolVersion.V5) as client:
+                self._client = client
+                for route in self.routes:
+                    await client.subscribe(self.subscription(route))
+                    print(f"Subscribed to {self.subscription(route)} ({route.name}, queue {route.maxsize})")
+
+                reader = asyncio.create_task(self._read_messages(client))
+                stopping = asyncio.create_task(self._stopping.wait())
+                done, _ = await asyncio.wait({reader, stopping}, return_when=asyncio.FIRST_COMPLETED)
+                reader.cancel()
+                stopping.cancel()
+                await asyncio.gather(reader, stopping, return_exceptions=True)
+                if reader in done:
+                    # The message stream only ends when the connection does
+                    if reader.exception() is not None:
+                        raise reader.exception()
+                    raise aiomqtt.MqttError("Message stream ended")
+        finally:
+            self._client = None
+
+    def stop(self):
+        """Request shutdown from any thread"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+
+def main(argv=None):
+    from detection_state import open_detection_state
+    from img_receiver_aws import (CameraDataProcessor, LOCAL_BROKER, LOCAL_BROKER_PORT, build_inference_pool,
+                                  start_metrics)
+
+    parser = argparse.ArgumentParser(description="Receive camera and vibration data from the local broker.")
+    parser.add_argument('--host', default=LOCAL_BROKER)
+    parser.add_argument('--port', type=int, default=LOCAL_BROKER_PORT)
+    parser.add_argument('--workers', type=int, default=2, help="Executor threads for blocking work")
+    parser.add_argument('--camera-queue', type=int, default=DEFAULT_CAMERA_QUEUE)
+    parser.add_argument('--vibration-queue', type=int, default=DEFAULT_VIBRATION_QUEUE)
+    parser.add_argument('--drain-timeout', type=float, default=DEFAULT_DRAIN_TIMEOUT)
+    # Either scaling mode on its own: in a shared group each frame reaches one instance,
+    # which would drop it when the camera belongs to another partition
+    scaling = parser.add_mutually_exclusive_group()
+    scaling.add_argument('--share-group', help="Join MQTT shared subscription group $share/<group>/...")
+    scaling.add_argument('--partition', type=parse_partition,
+                         help="Handle only cameras in partition INDEX/COUNT (camera affinity)")
+    parser.add_argument('--detection-state', default='memory',
+                        help="Temporal state backend: 'memory' or 'sqlite:<path>'")
+    parser.add_argument('--rate-control', action='store_true',
+                        help="Publish frame-rate hints on /cam/<camera_id>/control")
+    args = parser.parse_args(argv)
+
+    inference_pool = build_inference_pool()
+    detection_state = open_detection_state(args.detection_state)
+    processor = CameraDataProcessor(threaded=False, inference_pool=inference_pool, detection_state=detection_state)
+    receiver = EdgeReceiver(processor, args.host, args.port, args.workers,
+                            args.camera_queue, args.vibration_queue, args.drain_timeout,
+                            args.share_group, args.partition, args.rate_control)
+    exporters = start_metrics(processor.metrics)
+    try:
+        asyncio.run(receiver.run())
+    finally:
+        processor.publisher.close()
+        detection_state.close()
+        for exporter in exporters:
+            exporter.stop()
+        if inference_pool is not None:
+            inference_pool.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
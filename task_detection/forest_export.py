@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Export scikit-learn forests as C headers for the IMU sensor boards.
+
+The generated header keeps the Eloquent layout the sketches already include
+(Eloquent::ML::Port::RandomForest::predict(float *x)), but the forest is
+made smaller and cheaper to evaluate first:
+
+- pruning: keep the first max_trees trees and cut every tree at max_depth,
+  turning the cut node into a leaf for its majority class;
+- leaf merging: a split whose two subtrees are identical (typically two
+  leaves voting for the same class) is replaced by that subtree, and splits
+  that can no longer be reached given the thresholds above them are dropped;
+- threshold quantisation: the features are integer sensor units
+  (int16 ax, ay, az, acc_magn), so x <= t is the same test as x <= floor(t)
+  and thresholds are written as integers. Unquantised thresholds are written
+  as float literals rounded down to float32, which is also exact; either way
+  the board compares in single precision instead of promoting to double.
+
+export() returns the header and a report with node counts, an estimate of
+the instructions spent per sample and the accuracy against a held-out set,
+for both the source forest and the exported one.
+
+Usage:
+    python3 forest_export.py --model washer_forest.joblib --holdout holdout.csv \\
+        --max-depth 6 --max-trees 10 --quantize --output washer_clf.h
+"""
+
+import argparse
+import json
+import math
+import sys
+
+import numpy as np
+from device_forest import FEATURE_NAMES, FlatForest, device_features
+
+# Rough Xtensa LX6 (ESP32) costs per operation, for comparing exports only
+FLOAT_COMPARE_INSTRUCTIONS = 4     # load x[i], load constant, compare, branch
+DOUBLE_COMPARE_INSTRUCTIONS = 40   # float -> double promotion plus soft-float compare
+VOTE_INSTRUCTIONS = 3              # load, increment, store
+ARGMAX_INSTRUCTIONS_PER_CLASS = 5
+
+
+def _subtree(tree, node, depth, max_depth):
+    """Nested ('split', feature, threshold, left, right) / ('leaf', class) tuples"""
+    is_leaf = tree.children_left[node] < 0
+    if is_leaf or (max_depth is not None and depth >= max_depth):
+        return ('leaf', int(tree.value[node, 0].argmax()))
+    return ('split', int(tree.feature[node]), float(tree.threshold[node]),
+            _subtree(tree, tree.children_left[node], depth + 1, max_depth),
+            _subtree(tree, tree.children_right[node], depth + 1, max_depth))
+
+
+def prune(model, max_depth=None, max_trees=None):
+    """Trees of a fitted forest as nested tuples, cut to max_trees and max_depth"""
+    estimators = getattr(model, 'estimators_', [model])[:max_trees]
+    return [_subtree(estimator.tree_, 0, 0, max_depth) for estimator in estimators]
+
+
+def _float32_floor(value):
+    """Largest float32 not above value, so float32 x <= value iff x <= result"""
+    rounded = np.float32(value)
+    if float(rounded) > value:
+        rounded = np.nextafter(rounded, np.float32(-np.inf))
+    return float(rounded)
+
+
+def simplify(tree, quantize=False, lower=None, upper=None):
+    """
+    Quantise thresholds, drop splits already decided by the path above them
+    and merge splits with identical subtrees
+    """
+    if tree[0] == 'leaf':
+        return tree
+    lower, upper = lower or {}, upper or {}
+    _, feature, threshold, left, right = tree
+    threshold = float(math.floor(threshold)) if quantize else _float32_floor(threshold)
+
+    # Along this path x[feature] is in (lower, upper]
+    if feature in upper and threshold >= upper[feature]:
+        return simplify(left, quantize, lower, upper)
+    if feature in lower and threshold <= lower[feature]:
+        return simplify(right, quantize, lower, upper)
+
+    left = simplify(left, quantize, lower, {**upper, feature: threshold})
+    right = simplify(right, quantize, {**lower, feature: threshold}, upper)
+    if left == right:
+        return left
+    return ('split', feature, threshold, left, right)
+
+
+def flatten(trees, n_classes):
+    """FlatForest from nested tuples, nodes in pre-order like the parsed headers"""
+    arrays = {'feature': [], 'threshold': [], 'left': [], 'right': [], 'value': []}
+    roots = []
+
+    def add(tree):
+        node = len(arrays['feature'])
+        for values in arrays.values():
+            values.append(-1)
+        if tree[0] == 'leaf':
+            arrays['threshold'][node] = 0.0
+            arrays['value'][node] = tree[1]
+        else:
+            arrays['feature'][node] = tree[1]
+            arrays['threshold'][node] = tree[2]
+            arrays['left'][node] = add(tree[3])
+            arrays['right'][node] = add(tree[4])
+        return node
+
+    for tree in trees:
+        roots.append(add(tree))
+    return FlatForest(roots=roots, n_classes=n_classes, **arrays)
+
+
+def _literal(threshold, quantize):
+    if quantize:
+        return str(int(threshold))
+    return f"{threshold!r}f"
+
+
+def render_header(trees, n_classes, quantize=False):
+    """C header in the Eloquent RandomForest layout used by the sketches"""
+    lines = [
+        '#pragma once',
+        '#include <cstdarg>',
+        'namespace Eloquent {',
+        '    namespace ML {',
+        '        namespace Port {',
+        '            class RandomForest {',
+        '                public:',
+        '                    /**',
+        '                    * Predict class for features vector',
+        '                    */',
+        '                    int predict(float *x) {',
+        f'                        uint8_t votes[{n_classes}] = {{ 0 }};',
+    ]
+
+    def emit(tree, indent):
+        pad = ' ' * indent
+        if tree[0] == 'leaf':
+            lines.append(f'{pad}votes[{tree[1]}] += 1;')
+            return
+        _, feature, threshold, left, right = tree
+        lines.append(f'{pad}if (x[{feature}] <= {_literal(threshold, quantize)}) {{')
+        emit(left, indent + 4)
+        lines.append(f'{pad}}}')
+        lines.append('')
+        lines.append(f'{pad}else {{')
+        emit(right, indent + 4)
+        lines.append(f'{pad}}}')
+
+    for number, tree in enumerate(trees, 1):
+        lines.append(f'                        // tree #{number}')
+        emit(tree, 24)
+        lines.append('')
+
+    lines += [
+        '                        // return argmax of votes',
+        '                        uint8_t classIdx = 0;',
+        '                        float maxVotes = votes[0];',
+        '',
+        f'                        for (uint8_t i = 1; i < {n_classes}; i++) {{',
+        '                            if (votes[i] > maxVotes) {',
+        '                                classIdx = i;',
+        '                                maxVotes = votes[i];',
+        '                            }',
+        '                        }',
+        '',
+        '                        return classIdx;',
+        '                    }',
+        '',
+        '                protected:',
+        '                };',
+        '            }',
+        '        }',
+        '    }',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def estimate_cost(forest, X, compare_instructions=FLOAT_COMPARE_INSTRUCTIONS):
+    """Mean comparisons and estimated instructions per prediction over X"""
+    comparisons = forest.depth[forest.leaves(X)].sum(axis=1).mean()
+    instructions = (comparisons * compare_instructions
+                    + forest.n_trees * VOTE_INSTRUCTIONS
+                    + forest.n_classes * ARGMAX_INSTRUCTIONS_PER_CLASS)
+    return float(comparisons), float(instructions)
+
+
+def describe(forest, X=None, y=None, compare_instructions=FLOAT_COMPARE_INSTRUCTIONS):
+    splits = int((forest.feature >= 0).sum())
+    summary = {
+        'trees': forest.n_trees,
+        'splits': splits,
+        'leaves': forest.n_nodes - splits,
+        'max_depth': forest.max_depth,
+    }
+    if X is not None:
+        summary['comparisons_per_sample'], summary['instructions_per_sample'] = estimate_cost(
+            forest, X, compare_instructions)
+    if y is not None:
+        summary['accuracy'] = float((forest.predict(X) == np.asarray(y)).mean())
+    return summary
+
+
+def export(model, X_holdout=None, y_holdout=None, max_depth=None, max_trees=None, quantize=False):
+    """
+    Prune, merge and quantise a fitted forest; returns (header, report).
+    The report compares the source forest, as a generic exporter would emit
+    it (double-precision literals), with the exported one on the held-out set.
+    """
+    n_classes = len(model.classes_)
+    trees = [simplify(tree, quantize) for tree in prune(model, max_depth, max_trees)]
+    header = render_header(trees, n_classes, quantize)
+
+    source = FlatForest.from_sklearn(model)
+    exported = flatten(trees, n_classes)
+    report = {
+        'settings': {'max_depth': max_depth, 'max_trees': max_trees, 'quantize': quantize},
+        'source': describe(source, X_holdout, y_holdout, DOUBLE_COMPARE_INSTRUCTIONS),
+        'exported': describe(exported, X_holdout, y_holdout),
+        'header_lines': header.count('\n'),
+        'header_bytes': len(header.encode()),
+    }
+    if X_holdout is not None:
+        report['agreement'] = float((source.predict(X_holdout) == exported.predict(X_holdout)).mean())
+    if y_holdout is not None:
+        report['accuracy_loss'] = report['source']['accuracy'] - report['exported']['accuracy']
+    return header, report
+
+
+def load_holdout(path, label_column):
+    """Held-out features and labels from a CSV with ax, ay, az (and optionally acc_magn)"""
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    if 'acc_magn' in df:
+        X = df[list(FEATURE_NAMES)].to_numpy(dtype=np.float32)
+    else:
+        X = device_features(df['ax'], df['ay'], df['az'])
+    return X, df[label_column].to_numpy()
+
+
+def main(argv=None):
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Export a scikit-learn forest as a sensor-board C header.")
+    parser.add_argument('--model', required=True, help="joblib file with a fitted forest or decision tree")
+    parser.add_argument('--holdout', help="CSV of held-out readings for the report")
+    parser.add_argument('--label-column', default='is_spinning')
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--max-trees', type=int, default=None)
+    parser.add_argument('--quantize', action='store_true', help="Integer thresholds in sensor units")
+    parser.add_argument('--output', help="Header path (printed to stdout if omitted)")
+    args = parser.parse_args(argv)
+
+    model = joblib.load(args.model)
+    X, y = load_holdout(args.holdout, args.label_column) if args.holdout else (None, None)
+    header, report = export(model, X, y, args.max_depth, args.max_trees, args.quantize)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(header)
+    else:
+        sys.stdout.write(header)
+    print(json.dumps(report, indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
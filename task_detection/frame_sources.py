@@ -0,0 +1,188 @@
+"""
+Frame sources for CameraDataProcessor.
+
+A source delivers Frame objects to a callback via run(callback) until it is
+exhausted or stop() is called. MqttFrameSource is the live ESP32 feed;
+the recorded sources replay timestamped JPEGs from a directory or archive,
+or keypoint records from a keypoint store, at real-time, accelerated or
+maximum speed.
+"""
+
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from collections import namedtuple
+
+from keypoint_store import iter_segments, list_segments, timestamp_from_filename
+
+CAMERA_TOPIC = "/cam/room"
+# One topic per camera, /cam/<camera_id>; deeper levels (e.g. /cam/<id>/control) are not frames
+CAMERA_TOPIC_FILTER = "/cam/+"
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg')
+
+# keypoints is set when the frame carries pose keypoints instead of a JPEG
+Frame = namedtuple('Frame', ['topic', 'payload', 'timestamp', 'name', 'keypoints'])
+Frame.__new__.__defaults__ = (None, None)
+
+
+class FrameSource:
+    """Base class for sources; subclasses implement frames() or run()"""
+
+    def __init__(self, speed=None):
+        # speed: None or 0 for as fast as possible, 1.0 for real time, N for N x
+        self.speed = speed
+        self._stopped = threading.Event()
+
+    def frames(self):
+        raise NotImplementedError
+
+    def run(self, callback):
+        """Deliver frames to callback, paced by their timestamps"""
+        wall_start = None
+        first_ts = None
+        for frame in self.frames():
+            if self._stopped.is_set():
+                break
+            if self.speed:
+                if wall_start is None:
+                    wall_start, first_ts = time.monotonic(), frame.timestamp
+                delay = (frame.timestamp - first_ts) / self.speed - (time.monotonic() - wall_start)
+                if delay > 0 and self._stopped.wait(delay):
+                    break
+            callback(frame)
+
+    def stop(self):
+        self._stopped.set()
+
+
+class MqttFrameSource(FrameSource):
+    """Live frames from the local MQTT broker"""
+
+    def __init__(self, host='localhost', port=1883, topics=(CAMERA_TOPIC,)):
+        super().__init__()
+        import paho.mqtt.client as mqtt
+
+        self.host = host
+        self.port = port
+        self.topics = list(topics)
+        self.client = mqtt.Client()
+        self.client.on_connect = self._on_connect
+        self._callback = None
+
+    def _on_connect(self, client, userdata, flags, rc):
+        print(f"Connected to local MQTT broker with result code: {rc}")
+        for topic in self.topics:
+            client.subscribe(topic)
+            print(f"Subscribed to {topic}")
+
+    def run(self, callback):
+        def on_message(client, userdata, message):
+            callback(Frame(message.topic, message.payload, time.time()))
+
+        self.client.on_message = on_message
+        print(f"\nConnecting to local MQTT broker {self.host}:{self.port}...")
+        self.client.connect(self.host, self.port, 60)
+        print("Starting MQTT loop...")
+        self.client.loop_forever()
+
+    def stop(self):
+        super().stop()
+        self.client.disconnect()
+
+
+class DirectoryFrameSource(FrameSource):
+    """Timestamped JPEGs (images/<%Y%m%d-%H%M%S>.jpg) from a directory"""
+
+    def __init__(self, directory, speed=None, topic=CAMERA_TOPIC):
+        super().__init__(speed)
+        self.directory = directory
+        self.topic = topic
+
+    def frames(self):
+        paths = [
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        for ts, path in sorted((timestamp_from_filename(p), p) for p in paths):
+            with open(path, 'rb') as f:
+                yield Frame(self.topic, f.read(), ts, os.path.basename(path))
+
+
+class ArchiveFrameSource(FrameSource):
+    """Timestamped JPEGs from a .tar(.gz) or .zip archive"""
+
+    def __init__(self, path, speed=None, topic=CAMERA_TOPIC):
+        super().__init__(speed)
+        self.path = path
+        self.topic = topic
+
+    def frames(self):
+        if zipfile.is_zipfile(self.path):
+            with zipfile.ZipFile(self.path) as archive:
+                members = [m for m in archive.infolist() if m.filename.lower().endswith(IMAGE_EXTENSIONS)]
+                entries = sorted((_archive_timestamp(m.filename, time.mktime(m.date_time + (0, 0, -1))), m)
+                                 for m in members)
+                for ts, member in entries:
+                    yield Frame(self.topic, archive.read(member), ts, os.path.basename(member.filename))
+        else:
+            with tarfile.open(self.path) as archive:
+                members = [m for m in archive.getmembers() if m.isfile() and m.name.lower().endswith(IMAGE_EXTENSIONS)]
+                entries = sorted(((_archive_timestamp(m.name, m.mtime), m) for m in members), key=lambda e: e[0])
+                for ts, member in entries:
+                    yield Frame(self.topic, archive.extractfile(member).read(), ts, os.path.basename(member.name))
+
+
+class KeypointStoreFrameSource(FrameSource):
+    """Keypoint records from a keypoint store, skipping pose estimation"""
+
+    def __init__(self, directory, speed=None, camera=None):
+        super().__init__(speed)
+        self.directory = directory
+        self.camera = camera.encode() if camera else None
+
+    def frames(self):
+        for records in iter_segments(self.directory):
+            for record in records:
+                if self.camera is not None and record['camera'] != self.camera:
+                    continue
+                camera = record['camera'].decode()
+                yield Frame(f"/cam/{camera}", None, float(record['timestamp']),
+                            str(record['track_id']), record['keypoints'])
+
+
+def topic_matches(topic_filter, topic):
+    """MQTT topic filter matching with + and # wildcards"""
+    filter_parts = topic_filter.split('/')
+    topic_parts = topic.split('/')
+    for i, part in enumerate(filter_parts):
+        if part == '#':
+            return True
+        if i >= len(topic_parts) or (part != '+' and part != topic_parts[i]):
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+def camera_id_from_topic(topic):
+    """'/cam/room' -> 'room'"""
+    return topic.rsplit('/', 1)[-1]
+
+
+def _archive_timestamp(name, fallback):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    try:
+        return time.mktime(time.strptime(stem[:15], '%Y%m%d-%H%M%S'))
+    except ValueError:
+        return float(fallback)
+
+
+def open_recording(path, speed=None):
+    """Pick the recorded source for a directory, archive or keypoint store"""
+    if os.path.isdir(path):
+        if list_segments(path):
+            return KeypointStoreFrameSource(path, speed)
+        return DirectoryFrameSource(path, speed)
+    if zipfile.is_zipfile(path) or tarfile.is_tarfile(path):
+        return ArchiveFrameSource(path, speed)
+    raise ValueError(f"Unsupported recording: {path}")
@@ -0,0 +1,81 @@
+"""
+Garbage collection policy for the frame loops.
+
+Forcing gc.collect() after every frame makes each frame pay for a full
+collection of every object the process owns, including the pose model.
+GcPolicy replaces that with a collection every N frames, every N seconds
+or when resident memory crosses a limit, and freezes long-lived objects
+(the loaded model) out of the collector's generations.
+
+Configured from the environment:
+    POSE_GC_EVERY_FRAMES   collect every N frames (0 = off)
+    POSE_GC_EVERY_SECONDS  collect at most every N seconds (default 60, 0 = off)
+    POSE_GC_RSS_LIMIT_MB   collect whenever resident memory exceeds this (0 = off)
+"""
+
+import gc
+import os
+import threading
+import time
+
+DEFAULT_EVERY_SECONDS = 60.0
+
+
+def resident_memory_mb():
+    """Current resident set size in MB, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+class GcPolicy:
+    def __init__(self, every_frames=0, every_seconds=DEFAULT_EVERY_SECONDS, rss_limit_mb=0, on_collect=None):
+        self.every_frames = every_frames
+        self.every_seconds = every_seconds
+        self.rss_limit_mb = rss_limit_mb
+        # Called after each collection, e.g. to release the CUDA cache
+        self.on_collect = on_collect
+        self.frames = 0
+        self.collections = 0
+        self._last_collect = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        return cls(
+            every_frames=int(os.getenv('POSE_GC_EVERY_FRAMES', '0')),
+            every_seconds=float(os.getenv('POSE_GC_EVERY_SECONDS', DEFAULT_EVERY_SECONDS)),
+            rss_limit_mb=float(os.getenv('POSE_GC_RSS_LIMIT_MB', '0')),
+            **kwargs,
+        )
+
+    def freeze(self):
+        """Move everything allocated so far (model weights, modules) out of future collections"""
+        gc.collect()
+        gc.freeze()
+
+    def should_collect(self):
+        if self.every_frames and self.frames % self.every_frames == 0:
+            return True
+        if self.every_seconds and time.monotonic() - self._last_collect >= self.every_seconds:
+            return True
+        if self.rss_limit_mb:
+            rss = resident_memory_mb()
+            return rss is not None and rss > self.rss_limit_mb
+        return False
+
+    def after_frame(self):
+        """Count a processed frame and collect if the policy says so; returns True if it did"""
+        with self._lock:
+            self.frames += 1
+            if not self.should_collect():
+                return False
+            self._last_collect = time.monotonic()
+            self.collections += 1
+        gc.collect()
+        if self.on_collect is not None:
+            self.on_collect()
+        return True
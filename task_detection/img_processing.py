@@ -7,22 +7,27 @@ import sys
 import threading
 import gc
 import os
-import torch
+import time
 import cv2
-from torchvision import transforms
 import numpy as np
 import json
 
 sys.path.append('yolov7')
-from utils.datasets import letterbox
-from utils.general import non_max_suppression_kpt
-from utils.plots import output_to_keypoint, plot_skeleton_kpts
+from utils.plots import plot_skeleton_kpts
+from pose_engine import PoseEngine
+from keypoint_store import KeypointStoreWriter, timestamp_from_filename
+
+# Stage timings reported to img_receiver_aws.py on a "STAGE_TIMINGS {...}" stdout line;
+# it measures start-up from when it spawned this process to imported_at
+stage_timings = {'imported_at': time.time()}
 
 gc.enable()
 # Initialize parser
 parser = argparse.ArgumentParser(description="Process the filename from command line arguments.")
 # Add an argument for the filename with a default value
 parser.add_argument('-f', '--file', type=str, default="empty.jpg", help="Filename to process")
+parser.add_argument('-c', '--camera', type=str, default=os.getenv('CAMERA_ID', 'room'),
+                    help="Camera the frame came from, recorded in the keypoint store")
 # Parse the arguments
 args = parser.parse_args()
 input_image = args.file
@@ -31,6 +36,9 @@ path_input_image = 'images/' + input_image
 # path_input_image = input_image 
 path_output_json = 'json_output/' + file_name + '.json'
 path_output_image = 'images_output/' + file_name + '_out.' + file_format
+# Optional binary keypoint history (see keypoint_store.py)
+keypoint_store_dir = os.getenv('KEYPOINT_STORE_DIR')
+camera_id = args.camera
 
 def rotate_image(filepath, rotation_type):
     # Read the image from the file path
@@ -58,42 +66,18 @@ def rotate_image(filepath, rotation_type):
 thr = threading.Thread(rotate_image(path_input_image, '90_clockwise'))
 thr.start()
 
-def clear_resources():
-  gc.collect()
-  torch.cuda.empty_cache()
-
-th_cl = threading.Thread(clear_resources())
-th_cl.start()
-
 # Initialize the model
 model_weight = "yolov7-w6-pose.pt"
-device_type = "cuda" if torch.cuda.is_available() else ("mps" if torch.backends.mps.is_available() else "cpu")
-device = torch.device(device_type)
-weights = torch.load(model_weight, map_location=device)
-model = weights['model']
-for param in model.parameters():
-    param.grad = None
-_ = model.float().eval()
-if device_type != "cpu":
-  model.half().to(device)
+load_start = time.perf_counter()
+# Collection and the CUDA cache are left to the engine's GcPolicy
+engine = PoseEngine(model_weight)
+stage_timings['model_load'] = time.perf_counter() - load_start
+device_type = engine.device_type
 print(device_type)
 
 def process_image(image_path, rotate=None):
-  image = cv2.imread(image_path)
-  # image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-  image = letterbox(image, 960, stride=128, auto=True)[0]
-  image = transforms.ToTensor()(image)
-  image = torch.tensor(np.array([image.numpy()]))
-  if device_type != "cpu":
-    image = image.half().to(device)
-  output, _ = model(image)
-  output = non_max_suppression_kpt(output, 0.25, 0.65, nc=model.yaml['nc'], nkpt=model.yaml['nkpt'], kpt_label=True)
-  with torch.no_grad():
-    output = output_to_keypoint(output)
-  image_tensor = image
-  gc.collect()
-  torch.cuda.empty_cache()
-  return output, image_tensor
+  # The input file has already been rotated on disk by rotate_image
+  return engine.process_image(image_path)
 
 def save_output(output, image_tensor, output_image_path, output_json_path, label=None):
   keypoints = output[0, 7:].T.tolist()
@@ -160,13 +144,19 @@ def display_image(fp):
   # 15: Left Ankle
   # 16: Right Ankle
 print(path_input_image)
+inference_start = time.perf_counter()
 output, image_tensor = process_image(path_input_image, cv2.ROTATE_90_CLOCKWISE)
+stage_timings['inference'] = time.perf_counter() - inference_start
+print('STAGE_TIMINGS ' + json.dumps(stage_timings))
 pose_coordinate = output_to_pose_coordinate(output)
 if len(pose_coordinate) == 0:
   print("No person detected.")
   display_image(path_input_image)
 else:  
   save_output(output, image_tensor, path_output_image, path_output_json)
+  if keypoint_store_dir:
+    with KeypointStoreWriter(keypoint_store_dir) as writer:
+      writer.append(output[0, 7:], timestamp_from_filename(path_input_image), camera_id)
   display_image(path_output_image)
   thr = threading.Thread(target=os.system,
                             args=(f'python3 CS3237_camera_model_3.py -f {path_output_json}',))
@@ -175,6 +165,4 @@ else:
   # os.remove(path_output_json)
 print(f"Output image: {path_output_image}: {pose_coordinate}")
 # os.remove(path_input_image)
-
-clear_resources()
   
\ No newline at end of file
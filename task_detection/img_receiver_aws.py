@@ -3,15 +3,26 @@
 Camera Data Processor for AWS IoT Core Integration
 This script receives camera images from local MQTT, processes them with YOLOv7,
 and publishes detection results to AWS IoT Core for centralized state management.
+
+The frame source and the detection publisher are injectable, so the same
+processor can be driven from recorded frames (see replay.py) with results
+captured in memory instead of sent to AWS.
 """
 
 import os
+import re
 import json
 import time
+import itertools
 import subprocess
 import threading
-import gc
-import paho.mqtt.client as mqtt
+from concurrent.futures import wait
+
+from CS3237_camera_model_3 import get_prediction
+from edge_metrics import DEFAULT_METRICS_PORT, MetricsHTTPServer, MetricsRegistry, MqttMetricsPublisher
+from detection_state import InMemoryDetectionState
+from frame_sources import CAMERA_TOPIC_FILTER, MqttFrameSource, camera_id_from_topic, topic_matches
+from gc_policy import GcPolicy
 
 # AWS IoT imports (requires: pip install awsiotsdk)
 try:
@@ -38,23 +49,32 @@ AWS_CAMERA_TOPIC = 'laundry/camera'
 IMAGE_INPUT_FOLDER = 'images/'
 JSON_OUTPUT_FOLDER = 'json_output/'
 
-class CameraDataProcessor:
+# Metrics endpoint (METRICS_PORT=0 disables it) and optional JSON snapshots on local MQTT
+METRICS_PORT = int(os.getenv('METRICS_PORT', DEFAULT_METRICS_PORT))
+METRICS_MQTT_TOPIC = os.getenv('METRICS_MQTT_TOPIC')
+METRICS_MQTT_INTERVAL = float(os.getenv('METRICS_MQTT_INTERVAL', '15'))
+
+# Worker-pool inference (see inference_pool.py); 0 keeps the img_processing.py subprocess path
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '0'))
+INFERENCE_THREADS_PER_WORKER = int(os.getenv('INFERENCE_THREADS_PER_WORKER', '0')) or None
+POSE_WEIGHTS = os.getenv('POSE_WEIGHTS', 'yolov7-w6-pose.pt')
+# Longest an unthreaded caller waits for a pool frame before dropping it
+INFERENCE_TIMEOUT_S = float(os.getenv('INFERENCE_TIMEOUT_S', '30'))
+
+# img_processing.py reports its internal stage timings on a line with this prefix
+STAGE_TIMINGS_PREFIX = 'STAGE_TIMINGS '
+
+
+class AwsIotPublisher:
+    """Publishes detection results to AWS IoT Core"""
+
     def __init__(self):
-        # Local MQTT client (receives raw images from ESP32)
-        self.local_client = mqtt.Client()
-        self.local_client.on_connect = self.on_local_connect
-        self.local_client.on_message = self.on_local_message
-        
-        # AWS IoT connection (publishes detection results)
         self.aws_connection = None
         if AWS_IOT_AVAILABLE:
             self.setup_aws_connection()
         else:
             print("WARNING: Running in local-only mode without AWS IoT connection")
-        
-        # Track recent detections for temporal consistency
-        self.recent_detections = {}  # machine_id -> list of recent detection times
-        
+
     def setup_aws_connection(self):
         """Setup AWS IoT Core MQTT connection"""
         try:
@@ -66,12 +86,12 @@ class CameraDataProcessor:
                 print(f"  - {AWS_CA_PATH}")
                 print("Running in local-only mode.")
                 return
-            
+
             # Create event loop
             event_loop_group = io.EventLoopGroup(1)
             host_resolver = io.DefaultHostResolver(event_loop_group)
             client_bootstrap = io.ClientBootstrap(event_loop_group, host_resolver)
-            
+
             # Build MQTT connection
             self.aws_connection = mqtt_connection_builder.mtls_from_path(
                 endpoint=AWS_IOT_ENDPOINT,
@@ -83,132 +103,368 @@ class CameraDataProcessor:
                 clean_session=False,
                 keep_alive_secs=30
             )
-            
+
             print(f"Connecting to AWS IoT Core at {AWS_IOT_ENDPOINT}...")
             connect_future = self.aws_connection.connect()
             connect_future.result()
             print("✓ Connected to AWS IoT Core!")
-            
+
         except Exception as e:
             print(f"ERROR: Failed to connect to AWS IoT Core: {e}")
             print("Running in local-only mode.")
             self.aws_connection = None
-    
-    def on_local_connect(self, client, userdata, flags, rc):
-        """Callback when connected to local MQTT broker"""
-        print(f"Connected to local MQTT broker with result code: {rc}")
-        client.subscribe("/cam/room")
-        print("Subscribed to /cam/room")
-    
-    def on_local_message(self, client, userdata, message):
-        """Receive raw image from ESP32, process locally, publish results to AWS"""
-        if message.topic == "/cam/room":
-            print(f"\nReceived camera image ({len(message.payload)} bytes)")
-            
-            timestamp = time.strftime("%Y%m%d-%H%M%S")
-            filename = f"{timestamp}.jpg"
-            filepath = os.path.join(IMAGE_INPUT_FOLDER, filename)
-            
-            # Save image locally
-            os.makedirs(IMAGE_INPUT_FOLDER, exist_ok=True)
-            with open(filepath, "wb") as f:
-                f.write(message.payload)
-            print(f"Saved to: {filepath}")
-            
+
+    @property
+    def connected(self):
+        return self.aws_connection is not None
+
+    def publish(self, detection_result, topic=AWS_CAMERA_TOPIC):
+        """Publish detection result (or another JSON message) to AWS IoT Core"""
+        if not self.aws_connection:
+            print("AWS IoT connection not available")
+            return
+
+        try:
+            payload = json.dumps(detection_result)
+
+            print(f"Publishing to AWS IoT Core topic '{topic}'...")
+            publish_future, packet_id = self.aws_connection.publish(
+                topic=topic,
+                payload=payload,
+                qos=aws_mqtt.QoS.AT_LEAST_ONCE
+            )
+
+            publish_future.result()
+            print(f"✓ Published to AWS IoT Core (packet_id: {packet_id})")
+
+        except Exception as e:
+            print(f"ERROR publishing to AWS: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def close(self):
+        if self.aws_connection:
+            disconnect_future = self.aws_connection.disconnect()
+            disconnect_future.result()
+            print("Disconnected from AWS IoT Core")
+
+
+class InMemoryPublisher:
+    """Collects detection results instead of publishing them (replay and tests)"""
+
+    connected = True
+
+    def __init__(self):
+        self.published = []  # camera detections
+        self.messages = []  # (topic, message) for every publish
+        self._lock = threading.Lock()
+
+    def publish(self, detection_result, topic=AWS_CAMERA_TOPIC):
+        with self._lock:
+            if topic == AWS_CAMERA_TOPIC:
+                self.published.append(detection_result)
+            self.messages.append((topic, detection_result))
+
+    def close(self):
+        pass
+
+
+class CameraDataProcessor:
+    def __init__(self, source=None, publisher=None, pose_engine=None, threaded=True, on_stage=None,
+                 metrics=None, inference_pool=None, gc_policy=None, detection_state=None):
+        # Frame source (defaults to raw images from ESP32 via local MQTT, created on start)
+        self.source = source
+
+        # Publisher for detection results (defaults to AWS IoT Core)
+        self.publisher = publisher or AwsIotPublisher()
+
+        # In-process pose engine; without one each frame runs img_processing.py
+        self.pose_engine = pose_engine
+
+        # Multi-process pose workers fed through shared memory; takes precedence over pose_engine
+        self.inference_pool = inference_pool
+
+        # Periodic garbage collection instead of a full collection after every frame
+        # (an in-process pose engine applies its own policy per inference)
+        self.gc_policy = gc_policy or GcPolicy.from_env()
+
+        # Process frames on daemon threads (live) or inline (replay)
+        self.threaded = threaded
+
+        # Per-process frame counter, keeps saved image names unique across threads
+        self._frame_ids = itertools.count()
+
+        # Called with (stage, seconds) after each timed stage
+        self.on_stage = on_stage or (lambda stage, seconds: None)
+
+        # Stage histograms, frame counters and in-flight gauge (see edge_metrics.py)
+        self.metrics = metrics or MetricsRegistry()
+        self.frames_received = self.metrics.counter(
+            'camera_frames_received_total', 'Frames delivered by the frame source')
+        self.frames_inferred = self.metrics.counter(
+            'camera_frames_inferred_total', 'Frames that went through pose estimation')
+        self.detections_published = self.metrics.counter(
+            'camera_detections_published_total', 'Detection results published')
+        self.frames_in_flight = self.metrics.gauge(
+            'camera_frames_in_flight', 'Frames queued or being processed on worker threads')
+
+        # Recent detections per machine for temporal consistency; shared between
+        # processor instances when cameras are not pinned to one instance
+        self.detection_state = detection_state or InMemoryDetectionState()
+
+    def record_stage(self, stage, seconds):
+        self.metrics.histogram('camera_stage_seconds', 'Time spent in each processing stage',
+                               {'stage': stage}).observe(seconds)
+        self.on_stage(stage, seconds)
+
+    def skip_frame(self, reason):
+        self.metrics.counter('camera_frames_skipped_total', 'Frames dropped without a detection',
+                             {'reason': reason}).inc()
+
+    def _timed(self, stage, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.record_stage(stage, time.perf_counter() - start)
+
+    def handle_frame(self, frame):
+        """
+        Receive a frame from the source, process it, publish results.
+        Returns the detection result when processed inline (threaded=False).
+        """
+        self.frames_received.inc()
+
+        if frame.keypoints is not None:
+            # Pre-computed keypoints (recorded pose history) - skip pose estimation
+            return self.process_keypoints(frame.keypoints, frame.timestamp, camera_id_from_topic(frame.topic))
+
+        if not topic_matches(CAMERA_TOPIC_FILTER, frame.topic):
+            self.skip_frame('topic')
+            return None
+
+        print(f"\nReceived camera image ({len(frame.payload)} bytes)")
+
+        self.frames_in_flight.inc()
+        if self.inference_pool is not None:
+            return self.submit_to_pool(frame)
+        elif self.threaded:
             # Process image in background thread to not block MQTT
             thread = threading.Thread(
                 target=self.process_and_publish,
-                args=(filename,),
+                args=(frame,),
                 daemon=True
             )
             thread.start()
-    
-    def process_and_publish(self, filename):
-        """Process camera image and publish results to AWS IoT Core"""
+            return None
+        else:
+            return self.process_and_publish(frame)
+
+    def save_image(self, frame):
+        """
+        Save the raw image for img_processing.py; returns the filename.
+        Frames are processed concurrently in one folder, so the name carries the
+        milliseconds, the camera and a frame counter after the %Y%m%d-%H%M%S
+        prefix; img_processing.py names json_output/<name>.json after it.
+        """
+        timestamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(frame.timestamp))
+        millis = int(frame.timestamp * 1000) % 1000
+        camera = re.sub(r'[^A-Za-z0-9_-]', '_', camera_id_from_topic(frame.topic))
+        filename = f"{timestamp}-{millis:03d}-{camera}-{next(self._frame_ids)}.jpg"
+        filepath = os.path.join(IMAGE_INPUT_FOLDER, filename)
+
+        os.makedirs(IMAGE_INPUT_FOLDER, exist_ok=True)
+        with open(filepath, "wb") as f:
+            f.write(frame.payload)
+        print(f"Saved to: {filepath}")
+        return filename
+
+    def process_and_publish(self, frame):
+        """Process camera image and publish results; returns the detection, if any"""
         try:
             # Run YOLOv7 pose detection
-            detection_result = self.process_camera_image(filename)
-            
-            if detection_result:
-                print(f"Detection result: {json.dumps(detection_result, indent=2)}")
-                
-                # Publish to AWS IoT Core
-                if self.aws_connection:
-                    self.publish_to_aws(detection_result)
-                else:
-                    print("AWS IoT not connected - result not published to cloud")
+            if self.pose_engine is not None:
+                keypoints = self.run_pose_engine(frame)
             else:
+                filename = self._timed('write_payload', self.save_image, frame)
+                keypoints = self.process_camera_image(filename, camera_id_from_topic(frame.topic))
+            self.frames_inferred.inc()
+
+            if keypoints is None:
                 print("No person detected in image")
-            
+                self.skip_frame('no_person')
+                return None
+
+            return self.process_keypoints(keypoints, frame.timestamp, camera_id_from_topic(frame.topic))
+
         except Exception as e:
             print(f"ERROR processing image: {e}")
             import traceback
             traceback.print_exc()
+            self.skip_frame('error')
+            return None
         finally:
             # Cleanup
-            gc.collect()
-    
-    def process_camera_image(self, filename):
-        """Run YOLOv7 pose detection and classification"""
+            self.frames_in_flight.dec()
+            if self.pose_engine is None:
+                self.gc_policy.after_frame()
+
+    def process_keypoints(self, keypoints, timestamp=None, camera_id=None):
+        """Classify pose keypoints and publish the detection, if any"""
+        detection_result = self._timed('classify', self.classify_pose, keypoints, timestamp, camera_id)
+
+        if detection_result:
+            print(f"Detection result: {json.dumps(detection_result, indent=2)}")
+
+            if self.publisher.connected:
+                self._timed('publish', self.publisher.publish, detection_result)
+                self.detections_published.inc()
+            else:
+                print("AWS IoT not connected - result not published to cloud")
+                self.skip_frame('not_connected')
+        else:
+            self.skip_frame('no_detection')
+        return detection_result
+
+    def submit_to_pool(self, frame):
+        """Decode the frame into a shared-memory slot; the pool's callback classifies it"""
+        import cv2
+        from inference_pool import PoolBusyError
+
+        submitted = time.perf_counter()
+        try:
+            future = self._timed('decode', self.inference_pool.submit_jpeg, frame.payload,
+                                 cv2.ROTATE_90_CLOCKWISE, not self.threaded)
+        except PoolBusyError:
+            print("Inference workers busy - dropping frame")
+            self.frames_in_flight.dec()
+            self.skip_frame('pool_busy')
+            return None
+        except Exception as e:
+            print(f"ERROR decoding image: {e}")
+            self.frames_in_flight.dec()
+            self.skip_frame('error')
+            return None
+
+        def on_done(future):
+            try:
+                self.record_stage('inference', time.perf_counter() - submitted)
+                people = future.result()
+                self.frames_inferred.inc()
+                if len(people) == 0:
+                    print("No person detected in image")
+                    self.skip_frame('no_person')
+                    return None
+                return self.process_keypoints(people[0].tolist(), frame.timestamp,
+                                              camera_id_from_topic(frame.topic))
+            except Exception as e:
+                print(f"ERROR processing image: {e}")
+                self.skip_frame('error')
+                return None
+            finally:
+                self.frames_in_flight.dec()
+
+        if self.threaded:
+            future.add_done_callback(on_done)
+            return None
+        if not wait([future], timeout=INFERENCE_TIMEOUT_S).done:
+            # The pool frees the slot once the worker finishes (or is found dead)
+            print("Inference timed out - dropping frame")
+            self.frames_in_flight.dec()
+            self.skip_frame('timeout')
+            return None
+        return on_done(future)
+
+    def run_pose_engine(self, frame):
+        """Decode the frame and run the in-process pose engine"""
+        import cv2
+        from pose_engine import decode_image
+
+        image = self._timed('decode', decode_image, frame.payload)
+        people = self._timed('inference', self.pose_engine.keypoints, image, cv2.ROTATE_90_CLOCKWISE)
+        if len(people) == 0:
+            return None
+        return people[0].tolist()
+
+    def _run_img_processing(self, filename, camera_id):
+        spawned_at = time.time()
+        result = subprocess.run(
+            ['python3', 'img_processing.py', '-f', filename, '-c', camera_id],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        self.record_subprocess_stages(result.stdout, spawned_at)
+        return result
+
+    def record_subprocess_stages(self, stdout, spawned_at):
+        """Record the start-up, model load and inference times img_processing.py reports"""
+        for line in (stdout or '').splitlines():
+            if not line.startswith(STAGE_TIMINGS_PREFIX):
+                continue
+            try:
+                timings = json.loads(line[len(STAGE_TIMINGS_PREFIX):])
+            except ValueError:
+                return
+            if 'imported_at' in timings:
+                # Interpreter start plus torch/cv2 imports, measured across processes
+                self.record_stage('subprocess_start', max(0.0, timings['imported_at'] - spawned_at))
+            for stage in ('model_load', 'inference'):
+                if stage in timings:
+                    self.record_stage(stage, timings[stage])
+            return
+
+    def process_camera_image(self, filename, camera_id):
+        """Run YOLOv7 pose detection in img_processing.py; returns keypoints"""
         try:
             # Run img_processing.py (existing YOLOv7 processing)
             print("Running pose detection...")
-            result = subprocess.run(
-                ['python3', 'img_processing.py', '-f', filename],
-                capture_output=True,
-                text=True,
-                cwd=os.path.dirname(os.path.abspath(__file__))
-            )
-            
+            result = self._timed('pose', self._run_img_processing, filename, camera_id)
+
             if result.returncode != 0:
                 print(f"ERROR in img_processing: {result.stderr}")
                 return None
-            
+
             # Get the output JSON file
             file_base = filename.split('.')[0]
             json_path = os.path.join(JSON_OUTPUT_FOLDER, f"{file_base}.json")
-            
+
             if not os.path.exists(json_path):
                 print(f"No pose JSON found at {json_path}")
                 return None
-            
+
             # Load pose keypoints
             with open(json_path, 'r') as f:
                 pose_data = json.load(f)
-            
-            # Run classification model
-            detection = self.classify_pose(pose_data['pose_keypoints_2d'], file_base)
-            
-            return detection
-            
+
+            return pose_data['pose_keypoints_2d']
+
         except Exception as e:
             print(f"ERROR in process_camera_image: {e}")
             return None
-    
-    def classify_pose(self, keypoints, timestamp):
+
+    def classify_pose(self, keypoints, timestamp=None, camera_id=None):
         """
         Classify pose using existing logic from CS3237_camera_model_3.py
-        Returns detection result with confidence
+        Returns detection result with confidence. The camera id and the
+        millisecond timestamp identify the detection (processCameraDataFunction
+        drops redeliveries by them), so frames within one second stay distinct.
         """
         try:
-            # Import the get_prediction function
-            import sys
-            sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-            from CS3237_camera_model_3 import get_prediction
-            
+            now = timestamp if timestamp is not None else time.time()
             prediction = get_prediction(keypoints)
-            
+
             is_person = prediction[0][0] == 1
             is_washer = prediction[0][1] == 0
             is_dryer = prediction[0][1] == 1
             is_collecting = prediction[0][2] == 1
-            
+
             if not is_person:
                 return None
-            
+
             # Calculate confidence based on keypoint confidence values
             confidence = self.calculate_confidence(keypoints)
-            
+
             # Determine machine ID
             # In production, this should be mapped from camera position
             # For now, use classification result
@@ -221,83 +477,50 @@ class CameraDataProcessor:
             else:
                 # Walking/unknown - skip
                 return None
-            
-            # Update temporal tracking
-            if machine_id not in self.recent_detections:
-                self.recent_detections[machine_id] = []
-            
-            self.recent_detections[machine_id].append(time.time())
-            
-            # Keep only last 10 seconds of detections
-            cutoff = time.time() - 10
-            self.recent_detections[machine_id] = [
-                t for t in self.recent_detections[machine_id] if t > cutoff
-            ]
-            
+
+            # Update temporal tracking (detections in the last 10 seconds)
+            num_recent = self.detection_state.record(machine_id, now)
+
             # Calculate temporal consistency confidence
-            num_recent = len(self.recent_detections[machine_id])
             temporal_confidence = min(num_recent / 2.0, 1.0)  # Max at 2 detections
-            
+
             # Combined confidence
             combined_confidence = (confidence * 0.7 + temporal_confidence * 0.3)
-            
+
             return {
                 "machine_id": machine_id,
                 "device_type": device_type,
                 "event_type": "person_detected",
                 "is_bending": is_collecting,
                 "confidence": round(combined_confidence, 3),
-                "timestamp": int(time.time()),
+                "timestamp": round(now, 3),
+                "camera_id": camera_id,
                 "sensor_type": "camera",
                 "temporal_detections": num_recent,
                 "raw_confidence": round(confidence, 3)
             }
-            
+
         except Exception as e:
             print(f"ERROR in classify_pose: {e}")
             import traceback
             traceback.print_exc()
             return None
-    
+
     def calculate_confidence(self, keypoints):
         """Calculate confidence score from keypoint confidence values"""
         # Keypoints format: [x1, y1, conf1, x2, y2, conf2, ...]
         confidences = [keypoints[i] for i in range(2, len(keypoints), 3)]
-        
+
         if not confidences:
             return 0.0
-        
+
         # Use average of top 70% confidence keypoints
         confidences_sorted = sorted(confidences, reverse=True)
         top_70_percent = confidences_sorted[:max(1, int(len(confidences_sorted) * 0.7))]
         avg_confidence = sum(top_70_percent) / len(top_70_percent)
-        
-        return avg_confidence
-    
-    def publish_to_aws(self, detection_result):
-        """Publish detection result to AWS IoT Core"""
-        if not self.aws_connection:
-            print("AWS IoT connection not available")
-            return
-        
-        try:
-            payload = json.dumps(detection_result)
-            
-            print(f"Publishing to AWS IoT Core topic '{AWS_CAMERA_TOPIC}'...")
-            publish_future, packet_id = self.aws_connection.publish(
-                topic=AWS_CAMERA_TOPIC,
-                payload=payload,
-                qos=aws_mqtt.QoS.AT_LEAST_ONCE
-            )
-            
-            publish_future.result()
-            print(f"✓ Published to AWS IoT Core (packet_id: {packet_id})")
-            
-        except Exception as e:
-            print(f"ERROR publishing to AWS: {e}")
-            import traceback
-            traceback.print_exc()
-    
+
+        return float(avg_confidence)
+
     def start(self):
         """Start the processor"""
         print("=" * 60)
@@ -308,28 +531,50 @@ class CameraDataProcessor:
         print(f"AWS Client ID: {AWS_CLIENT_ID}")
         print(f"Camera Topic: {AWS_CAMERA_TOPIC}")
         print("=" * 60)
-        
+
         # Ensure directories exist
         os.makedirs(IMAGE_INPUT_FOLDER, exist_ok=True)
         os.makedirs(JSON_OUTPUT_FOLDER, exist_ok=True)
-        
-        print("\nConnecting to local MQTT broker...")
-        self.local_client.connect(LOCAL_BROKER, LOCAL_BROKER_PORT, 60)
-        print("Starting MQTT loop...")
-        self.local_client.loop_forever()
+
+        if self.source is None:
+            self.source = MqttFrameSource(LOCAL_BROKER, LOCAL_BROKER_PORT, [CAMERA_TOPIC_FILTER])
+        self.source.run(self.handle_frame)
+
+    def stop(self):
+        """Stop the frame source and close the publisher"""
+        if self.source is not None:
+            self.source.stop()
+        self.publisher.close()
+
+def start_metrics(registry):
+    """Start the metrics endpoint and optional MQTT snapshots; returns the started exporters"""
+    exporters = []
+    if METRICS_PORT:
+        server = MetricsHTTPServer(registry, port=METRICS_PORT).start()
+        print(f"Metrics endpoint: http://127.0.0.1:{server.port}/metrics")
+        exporters.append(server)
+    if METRICS_MQTT_TOPIC:
+        import paho.mqtt.client as mqtt
+
+        client = mqtt.Client()
+        client.connect(LOCAL_BROKER, LOCAL_BROKER_PORT, 60)
+        client.loop_start()
+        exporters.append(MqttMetricsPublisher(registry, client, METRICS_MQTT_TOPIC, METRICS_MQTT_INTERVAL).start())
+        print(f"Publishing metrics to {METRICS_MQTT_TOPIC} every {METRICS_MQTT_INTERVAL:g}s")
+    return exporters
+
+def build_inference_pool():
+    """Worker-pool inference when INFERENCE_WORKERS is set, else None"""
+    if not INFERENCE_WORKERS:
+        return None
+    from inference_pool import InferencePool
+    print(f"Inference pool: {INFERENCE_WORKERS} workers")
+    return InferencePool(INFERENCE_WORKERS, POSE_WEIGHTS, threads_per_worker=INFERENCE_THREADS_PER_WORKER)
 
 def main():
-    """Main entry point"""
-    processor = CameraDataProcessor()
-    try:
-        processor.start()
-    except KeyboardInterrupt:
-        print("\n\nShutting down...")
-        if processor.aws_connection:
-            disconnect_future = processor.aws_connection.disconnect()
-            disconnect_future.result()
-            print("Disconnected from AWS IoT Core")
+    """Main entry point (the asyncio receiver in edge_receiver.py)"""
+    from edge_receiver import main as receiver_main
+    return receiver_main()
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,265 @@
+"""
+Multi-process pose inference with shared-memory frame hand-off.
+
+The receiving thread copies each decoded frame into a free slot of a fixed
+ring of multiprocessing.shared_memory buffers and queues only the slot index
+and frame shape. N worker processes each keep a pose engine resident, run it
+on the slot in place and write the keypoints back into the slot's result
+region, so frames and keypoints never go through a pipe. This spreads
+pre-processing, inference, NMS and post-processing over all cores instead
+of contending for one GIL.
+
+Each task carries an id, and each worker records the id it is running in a
+shared array. The collector thread checks the workers whenever it waits
+for results: the frame a dead worker was running fails with
+WorkerDiedError, its slot is freed and the worker is respawned, so a crash
+in the engine never leaves a caller waiting or a slot in use for good.
+
+Usage:
+    with InferencePool(workers=4) as pool:
+        processor = CameraDataProcessor(inference_pool=pool)
+        processor.start()
+"""
+
+import functools
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+KEYPOINT_VALUES = 51
+MAX_PEOPLE = 8
+# Largest frame a slot can hold; ESP32 cameras top out at UXGA (1600x1200)
+MAX_FRAME_SHAPE = (1600, 1600, 3)
+# How often the collector checks for dead workers while no results arrive
+WORKER_CHECK_INTERVAL_S = 1.0
+IDLE = -1
+
+
+class PoolBusyError(RuntimeError):
+    """Raised when no frame slot is free and the caller asked not to wait"""
+
+
+class WorkerDiedError(RuntimeError):
+    """Set on the future of a frame whose worker process exited while running it"""
+
+
+class FrameRing:
+    """Fixed ring of shared-memory frame slots, each with a keypoint result region"""
+
+    def __init__(self, slots, max_frame_shape=MAX_FRAME_SHAPE, max_people=MAX_PEOPLE, names=None):
+        self.slots = slots
+        self.slot_bytes = int(np.prod(max_frame_shape))
+        self.max_people = max_people
+        self.owner = names is None
+
+        keypoint_bytes = slots * max_people * KEYPOINT_VALUES * np.dtype(np.float32).itemsize
+        if self.owner:
+            self._frames_shm = shared_memory.SharedMemory(create=True, size=slots * self.slot_bytes)
+            self._keypoints_shm = shared_memory.SharedMemory(create=True, size=keypoint_bytes)
+        else:
+            self._frames_shm = shared_memory.SharedMemory(name=names[0])
+            self._keypoints_shm = shared_memory.SharedMemory(name=names[1])
+
+        self.frames = np.ndarray((slots, self.slot_bytes), dtype=np.uint8, buffer=self._frames_shm.buf)
+        self.keypoints = np.ndarray((slots, max_people, KEYPOINT_VALUES), dtype=np.float32,
+                                    buffer=self._keypoints_shm.buf)
+
+    @property
+    def spec(self):
+        """Arguments for attaching to this ring from another process"""
+        return {
+            'slots': self.slots,
+            'max_frame_shape': (self.slot_bytes,),
+            'max_people': self.max_people,
+            'names': (self._frames_shm.name, self._keypoints_shm.name),
+        }
+
+    def frame(self, slot, shape):
+        """Contiguous uint8 view of a slot with the given image shape"""
+        size = int(np.prod(shape))
+        if size > self.slot_bytes:
+            raise ValueError(f"Frame of shape {shape} does not fit a {self.slot_bytes}-byte slot")
+        return self.frames[slot, :size].reshape(shape)
+
+    def close(self):
+        # Drop the numpy views before closing, or the mmap reports exported pointers
+        del self.frames, self.keypoints
+        self._frames_shm.close()
+        self._keypoints_shm.close()
+        if self.owner:
+            self._frames_shm.unlink()
+            self._keypoints_shm.unlink()
+
+
+def load_pose_engine(weights, device=None, num_threads=None):
+    """Default worker engine factory: a resident PoseEngine with tuned intra-op threads"""
+    import torch
+    from pose_engine import PoseEngine
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    return PoseEngine(weights, device=device)
+
+
+def _worker_main(index, running, ring_spec, engine_factory, tasks, results):
+    ring = FrameRing(**ring_spec)
+    engine = engine_factory()
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            task_id, slot, shape, rotate = task
+            # Shared memory, so the collector sees it even if this process is killed
+            running[index] = task_id
+            try:
+                people = engine.keypoints(ring.frame(slot, shape), rotate)
+                count = min(len(people), ring.max_people)
+                ring.keypoints[slot, :count] = people[:count]
+                results.put((task_id, slot, count, None))
+            except Exception as e:
+                results.put((task_id, slot, 0, f"{type(e).__name__}: {e}"))
+    finally:
+        ring.close()
+
+
+class InferencePool:
+    def __init__(self, workers=None, weights='yolov7-w6-pose.pt', device='cpu', threads_per_worker=None,
+                 slots=None, max_frame_shape=MAX_FRAME_SHAPE, engine_factory=None, context='spawn'):
+        cpus = os.cpu_count() or 1
+        self.workers = workers or cpus
+        # Split the cores between workers so torch intra-op threads do not oversubscribe them
+        threads_per_worker = threads_per_worker or max(1, cpus // self.workers)
+        engine_factory = engine_factory or functools.partial(
+            load_pose_engine, weights, device, threads_per_worker)
+
+        # Two slots per worker: one being inferred, one queued behind it
+        self.ring = FrameRing(slots or 2 * self.workers, max_frame_shape)
+        self._free = queue.Queue()
+        for slot in range(self.ring.slots):
+            self._free.put(slot)
+        self._pending = {}  # slot -> (task id, Future)
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._closing = False
+
+        self._ctx = get_context(context)
+        self._engine_factory = engine_factory
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        # Task id each worker is running (or last ran), IDLE before its first
+        self._running = self._ctx.RawArray('q', [IDLE] * self.workers)
+        self._processes = [self._start_worker(index) for index in range(self.workers)]
+
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def submit(self, image, rotate=None, block=True, timeout=None):
+        """Queue a decoded frame; returns a Future for its (N, 51) keypoints"""
+        try:
+            slot = self._free.get(block, timeout)
+        except queue.Empty:
+            raise PoolBusyError("All frame slots are in use") from None
+        try:
+            np.copyto(self.ring.frame(slot, image.shape), image)
+        except Exception:
+            self._free.put(slot)
+            raise
+        future = Future()
+        task_id = next(self._task_ids)
+        with self._lock:
+            self._pending[slot] = (task_id, future)
+        self._tasks.put((task_id, slot, image.shape, rotate))
+        return future
+
+    def submit_jpeg(self, payload, rotate=None, block=True, timeout=None):
+        """Decode JPEG bytes in the calling thread and queue the frame"""
+        import cv2
+
+        image = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Could not decode JPEG payload")
+        return self.submit(image, rotate, block, timeout)
+
+    def keypoints(self, image, rotate=None):
+        """Blocking call with the same signature as PoseEngine.keypoints"""
+        return self.submit(image, rotate).result()
+
+    def _start_worker(self, index):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self._running, self.ring.spec, self._engine_factory, self._tasks, self._results),
+            daemon=True)
+        process.start()
+        return process
+
+    def _finish(self, task_id, slot):
+        """The task's future if it is still pending, and free its slot; None for a stale result"""
+        with self._lock:
+            pending = self._pending.get(slot)
+            if pending is None or pending[0] != task_id:
+                return None
+            del self._pending[slot]
+        self._free.put(slot)
+        return pending[1]
+
+    def _replace_dead_workers(self):
+        """Fail the frame each dead worker was running and start a new worker in its place"""
+        for index, process in enumerate(self._processes):
+            if self._closing or process.is_alive():
+                continue
+            task_id = self._running[index]
+            with self._lock:
+                slots = [slot for slot, pending in self._pending.items() if pending[0] == task_id]
+            for slot in slots:
+                future = self._finish(task_id, slot)
+                if future is not None:
+                    future.set_exception(WorkerDiedError(
+                        f"Inference worker {index} exited with code {process.exitcode}"))
+            print(f"Inference worker {index} exited with code {process.exitcode} - restarting it")
+            self._running[index] = IDLE
+            self._processes[index] = self._start_worker(index)
+
+    def _collect(self):
+        while True:
+            try:
+                item = self._results.get(timeout=WORKER_CHECK_INTERVAL_S)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                task_id, slot, count, error = item
+                # Copy before _finish frees the slot for the next frame
+                people = None if error else self.ring.keypoints[slot, :count].copy()
+                future = self._finish(task_id, slot)
+                if future is not None:
+                    if error:
+                        future.set_exception(RuntimeError(error))
+                    else:
+                        future.set_result(people)
+            self._replace_dead_workers()
+
+    def close(self):
+        """Let workers finish queued frames, then release the shared memory"""
+        self._closing = True
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join()
+        self._results.put(None)
+        self._collector.join()
+        for _, future in self._pending.values():
+            future.cancel()
+        self.ring.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
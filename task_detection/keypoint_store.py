@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Compact binary storage for pose keypoint history.
+
+Records are fixed-size: a small header (timestamp, camera, track id, label)
+followed by the 17 x [x, y, confidence] keypoint block as float32. They are
+appended to segment files in a store directory; each segment starts with a
+64-byte file header and can be opened with np.memmap for zero-copy batch
+loads, with each field available as a column view (records['keypoints'],
+records['timestamp'], ...).
+
+Usage:
+    python3 keypoint_store.py convert json_output/ --out pose_store/ --camera room
+    python3 keypoint_store.py info pose_store/
+"""
+
+import argparse
+import fcntl
+import glob
+import json
+import os
+import struct
+import sys
+from datetime import datetime
+
+import numpy as np
+
+KEYPOINT_VALUES = 51
+CAMERA_ID_BYTES = 16
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('camera', f'S{CAMERA_ID_BYTES}'),
+    ('track_id', '<i4'),
+    ('label', '<i4'),
+    ('keypoints', '<f4', (KEYPOINT_VALUES,)),
+])
+
+MAGIC = b'DLLMKPS\x00'
+FORMAT_VERSION = 1
+FILE_HEADER_SIZE = 64
+FILE_HEADER = struct.Struct('<8sII')
+
+SEGMENT_SUFFIX = '.kps'
+DEFAULT_SEGMENT_RECORDS = 1 << 16
+
+UNLABELLED = -1
+NO_TRACK = -1
+
+
+def _segment_name(index):
+    return f"segment-{index:06d}{SEGMENT_SUFFIX}"
+
+
+def _file_header():
+    header = FILE_HEADER.pack(MAGIC, FORMAT_VERSION, RECORD_DTYPE.itemsize)
+    return header.ljust(FILE_HEADER_SIZE, b'\x00')
+
+
+def list_segments(directory):
+    """Segment files of a store in append order"""
+    return sorted(glob.glob(os.path.join(directory, f"segment-*{SEGMENT_SUFFIX}")))
+
+
+def open_segment(path):
+    """
+    Memory-map a segment as a structured record array without copying.
+    A trailing partial record left by an interrupted write is ignored.
+    """
+    with open(path, 'rb') as f:
+        magic, version, record_size = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a keypoint segment")
+    if version != FORMAT_VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} has unsupported format version {version} / record size {record_size}")
+
+    count = (os.path.getsize(path) - FILE_HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=FILE_HEADER_SIZE, shape=(count,))
+
+
+def make_records(keypoints, timestamps, camera, track_ids=NO_TRACK, labels=UNLABELLED):
+    """Build a record array from an (N, 51) keypoint array and per-record header values"""
+    keypoints = np.asarray(keypoints, dtype=np.float32).reshape(-1, KEYPOINT_VALUES)
+    records = np.empty(len(keypoints), dtype=RECORD_DTYPE)
+    records['timestamp'] = timestamps
+    records['camera'] = camera
+    records['track_id'] = track_ids
+    records['label'] = labels
+    records['keypoints'] = keypoints
+    return records
+
+
+class KeypointStoreWriter:
+    """
+    Append-only writer that rolls over to a new segment when one is full.
+    Writes take an exclusive lock on the segment so several processes can
+    append to the same store.
+    """
+
+    def __init__(self, directory, segment_records=DEFAULT_SEGMENT_RECORDS):
+        self.directory = directory
+        self.segment_records = segment_records
+        os.makedirs(directory, exist_ok=True)
+
+        segments = list_segments(directory)
+        self._segment_index = int(os.path.basename(segments[-1])[8:14]) if segments else 1
+        self._file = None
+
+    def _open(self):
+        path = os.path.join(self.directory, _segment_name(self._segment_index))
+        self._file = open(path, 'ab')
+
+    def _locked_count(self):
+        """
+        Number of complete records in the open segment; must hold the lock.
+        Writes the file header for a new segment and drops any partial record
+        left by an interrupted write.
+        """
+        size = self._file.seek(0, os.SEEK_END)
+        if size < FILE_HEADER_SIZE:
+            self._file.truncate(0)
+            self._file.write(_file_header())
+            return 0
+        count, partial = divmod(size - FILE_HEADER_SIZE, RECORD_DTYPE.itemsize)
+        if partial:
+            self._file.truncate(size - partial)
+        return count
+
+    def append_records(self, records):
+        """Append a structured record array, splitting it across segments as needed"""
+        records = np.ascontiguousarray(records, dtype=RECORD_DTYPE)
+        offset = 0
+        while offset < len(records):
+            if self._file is None:
+                self._open()
+
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                free = self.segment_records - self._locked_count()
+                if free > 0:
+                    n = min(len(records) - offset, free)
+                    self._file.write(records[offset:offset + n].tobytes())
+                    self._file.flush()
+                    offset += n
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+
+            if free <= 0 or offset < len(records):
+                self.close()
+                self._segment_index += 1
+
+    def append(self, keypoints, timestamp, camera, track_id=NO_TRACK, label=UNLABELLED):
+        """Append a single keypoint record"""
+        self.append_records(make_records(keypoints, timestamp, camera, track_id, label))
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_segments(directory):
+    """Yield each segment of a store as a memory-mapped record array"""
+    for path in list_segments(directory):
+        records = open_segment(path)
+        if len(records):
+            yield records
+
+
+def load_records(directory, start=None, end=None, camera=None):
+    """
+    Load records from every segment into one array, optionally filtered by
+    timestamp range [start, end) and camera id.
+    """
+    selected = []
+    for records in iter_segments(directory):
+        mask = np.ones(len(records), dtype=bool)
+        if start is not None:
+            mask &= records['timestamp'] >= start
+        if end is not None:
+            mask &= records['timestamp'] < end
+        if camera is not None:
+            mask &= records['camera'] == camera.encode()
+        selected.append(records[mask])
+
+    if not selected:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.concatenate(selected)
+
+
+def timestamp_from_filename(path):
+    """
+    Parse the %Y%m%d-%H%M%S timestamp used for json_output/ and images/ files,
+    plus the -<milliseconds> the receiver appends when present
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    try:
+        timestamp = datetime.strptime(stem[:15], '%Y%m%d-%H%M%S').timestamp()
+    except ValueError:
+        return os.path.getmtime(path)
+    millis = stem[16:19]
+    if stem[15:16] == '-' and len(millis) == 3 and millis.isdigit():
+        timestamp += int(millis) / 1000
+    return timestamp
+
+
+def convert_json(paths, directory, camera, segment_records=DEFAULT_SEGMENT_RECORDS):
+    """Convert json_output/<ts>.json keypoint files into a store; returns the record count"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, '*.json')))
+        else:
+            files.append(path)
+
+    converted = 0
+    with KeypointStoreWriter(directory, segment_records) as writer:
+        for path in sorted(files):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            keypoints = data.get('pose_keypoints_2d', [])
+            if len(keypoints) != KEYPOINT_VALUES:
+                print(f"Skipping {path}: expected {KEYPOINT_VALUES} keypoint values")
+                continue
+            writer.append(
+                keypoints,
+                timestamp_from_filename(path),
+                camera,
+                label=data.get('label', UNLABELLED),
+            )
+            converted += 1
+    return converted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keypoint record store tools.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help="Convert JSON keypoint files into a store")
+    convert_parser.add_argument('paths', nargs='+', help="JSON files or directories")
+    convert_parser.add_argument('--out', required=True, help="Store directory")
+    convert_parser.add_argument('--camera', default='room', help="Camera id for the converted records")
+
+    info_parser = subparsers.add_parser('info', help="Summarise a store")
+    info_parser.add_argument('directory')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        count = convert_json(args.paths, args.out, args.camera)
+        print(f"Converted {count} records into {args.out}")
+    else:
+        total = 0
+        for path in list_segments(args.directory):
+            records = open_segment(path)
+            total += len(records)
+            span = (
+                f"{records['timestamp'].min():.0f}..{records['timestamp'].max():.0f}" if len(records) else "empty"
+            )
+            print(f"{os.path.basename(path)}: {len(records)} records ({span})")
+        print(f"Total: {total} records, {total * RECORD_DTYPE.itemsize} bytes of keypoint data")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Versioned model artefacts for the pose classifiers.
+
+Each trained model is written to ``<registry>/<name>/<version>/`` as a joblib
+file plus a ``metadata.json`` sidecar describing the features, evaluation
+metrics and the SHA-256 of the artefact. Tree models are also exported as
+``model.npz`` arrays (see tree_arrays) for the Lambda predictor. A
+``CURRENT`` file per model name records the version that inference should
+load by default.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import tree_arrays
+
+REGISTRY_DIR = os.getenv(
+    'MODEL_REGISTRY_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+)
+MODEL_FILENAME = 'model.joblib'
+METADATA_FILENAME = 'metadata.json'
+CURRENT_FILENAME = 'CURRENT'
+
+
+class ModelNotFoundError(LookupError):
+    """Raised when a model name or version is not present in the registry"""
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_versions(name, registry_dir=None):
+    """List the versions stored for a model name, oldest first"""
+    model_dir = os.path.join(registry_dir or REGISTRY_DIR, name)
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(
+        entry for entry in os.listdir(model_dir)
+        if entry.startswith('v') and os.path.isfile(os.path.join(model_dir, entry, METADATA_FILENAME))
+    )
+
+
+def current_version(name, registry_dir=None):
+    """Return the promoted version for a model name, or None"""
+    pointer = os.path.join(registry_dir or REGISTRY_DIR, name, CURRENT_FILENAME)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, 'r') as f:
+        return f.read().strip() or None
+
+
+def resolve_version(name, version=None, registry_dir=None):
+    """
+    Resolve 'current' (the default), 'latest' or an explicit version string.
+    'current' falls back to the latest version when nothing has been promoted.
+    """
+    versions = list_versions(name, registry_dir)
+    if not versions:
+        raise ModelNotFoundError(f"No versions of model '{name}' in registry")
+
+    if version in (None, 'current'):
+        version = current_version(name, registry_dir) or versions[-1]
+    elif version == 'latest':
+        version = versions[-1]
+
+    if version not in versions:
+        raise ModelNotFoundError(f"Model '{name}' has no version '{version}'")
+    return version
+
+
+def save_model(model, name, metadata, registry_dir=None):
+    """Write a new version of a model with its metadata sidecar; returns the version"""
+    registry_dir = registry_dir or REGISTRY_DIR
+    versions = list_versions(name, registry_dir)
+    next_number = int(versions[-1][1:]) + 1 if versions else 1
+    version = f"v{next_number:04d}"
+
+    version_dir = os.path.join(registry_dir, name, version)
+    os.makedirs(version_dir)
+
+    model_path = os.path.join(version_dir, MODEL_FILENAME)
+    joblib.dump(model, model_path)
+
+    sidecar = dict(metadata)
+    sidecar.update({
+        'name': name,
+        'version': version,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'artifact': MODEL_FILENAME,
+        'sha256': file_sha256(model_path),
+    })
+
+    # Tree models also get NumPy arrays for the pandas-free Lambda predictor
+    if tree_arrays.is_tree_model(model):
+        arrays_path = os.path.join(version_dir, tree_arrays.ARRAYS_FILENAME)
+        tree_arrays.export(model, arrays_path)
+        sidecar['tree_arrays'] = {'artifact': tree_arrays.ARRAYS_FILENAME, 'sha256': file_sha256(arrays_path)}
+
+    with open(os.path.join(version_dir, METADATA_FILENAME), 'w') as f:
+        json.dump(sidecar, f, indent=2, sort_keys=True)
+
+    return version
+
+
+def load_metadata(name, version=None, registry_dir=None):
+    """Load the metadata sidecar for a model version"""
+    registry_dir = registry_dir or REGISTRY_DIR
+    version = resolve_version(name, version, registry_dir)
+    with open(os.path.join(registry_dir, name, version, METADATA_FILENAME), 'r') as f:
+        return json.load(f)
+
+
+def load_model(name, version=None, registry_dir=None):
+    """Load a model version, verifying the artefact against its recorded hash"""
+    registry_dir = registry_dir or REGISTRY_DIR
+    metadata = load_metadata(name, version, registry_dir)
+    model_path = os.path.join(registry_dir, name, metadata['version'], metadata['artifact'])
+
+    if file_sha256(model_path) != metadata['sha256']:
+        raise ValueError(f"Artefact hash mismatch for {name} {metadata['version']}")
+
+    return joblib.load(model_path), metadata
+
+
+def promote(name, version, registry_dir=None):
+    """Point CURRENT at a version so inference picks it up by default"""
+    registry_dir = registry_dir or REGISTRY_DIR
+    version = resolve_version(name, version, registry_dir)
+    pointer = os.path.join(registry_dir, name, CURRENT_FILENAME)
+    tmp_pointer = pointer + '.tmp'
+    with open(tmp_pointer, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_pointer, pointer)
+    return version
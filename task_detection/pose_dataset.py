@@ -0,0 +1,150 @@
+"""
+Labelled pose keypoint dataset loading and feature extraction.
+
+Records are read one at a time from JSON (a single object or a list of
+objects) and JSONL files, so large datasets never have to be materialised as
+Python lists. Each record carries a ``label`` and either the full
+``pose_keypoints_2d`` vector (17 keypoints x [x, y, confidence]) or an already
+extracted ``head`` coordinate pair. Binary keypoint store segments (.kps) are
+memory-mapped and their labelled records used directly.
+"""
+
+import glob
+import json
+import os
+
+import numpy as np
+
+import keypoint_store
+
+NUM_KEYPOINTS = 17
+KEYPOINT_VALUES = NUM_KEYPOINTS * 3
+
+# Nose, left eye, right eye, left ear, right ear - in the order get_prediction
+# falls back through them.
+HEAD_KEYPOINTS = 5
+KEYPOINT_CONFIDENCE_THRESHOLD = 0.5
+
+FEATURE_NAMES = ["head_x", "head_y"]
+
+DATASET_EXTENSIONS = (".json", ".jsonl", keypoint_store.SEGMENT_SUFFIX)
+
+
+def expand_paths(paths):
+    """Expand directories and glob patterns into a sorted list of dataset files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for ext in DATASET_EXTENSIONS:
+                files.extend(glob.glob(os.path.join(path, "**", f"*{ext}"), recursive=True))
+        elif any(ch in path for ch in "*?["):
+            files.extend(glob.glob(path, recursive=True))
+        else:
+            files.append(path)
+    return sorted(set(files))
+
+
+def iter_records(paths):
+    """Yield labelled records from JSON and JSONL files one at a time"""
+    for path in expand_paths(paths):
+        if path.endswith(keypoint_store.SEGMENT_SUFFIX):
+            continue
+        if path.endswith(".jsonl"):
+            with open(path, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+        else:
+            with open(path, "r") as f:
+                data = json.load(f)
+            if isinstance(data, list):
+                yield from data
+            else:
+                yield data
+
+
+def head_features(keypoints):
+    """
+    Extract head coordinates from an (N, 51) keypoint array.
+
+    For each row the first head keypoint with confidence above the threshold
+    is used, matching the fallback order in get_prediction. Rows without a
+    confident head keypoint are returned as NaN.
+    """
+    keypoints = np.asarray(keypoints, dtype=np.float32).reshape(-1, KEYPOINT_VALUES)
+    head = keypoints[:, :HEAD_KEYPOINTS * 3].reshape(-1, HEAD_KEYPOINTS, 3)
+
+    confident = head[:, :, 2] > KEYPOINT_CONFIDENCE_THRESHOLD
+    first = confident.argmax(axis=1)
+    rows = np.arange(len(head))
+
+    features = head[rows, first, :2]
+    features[~confident.any(axis=1)] = np.nan
+    return features
+
+
+def load_dataset(paths, chunk_size=4096):
+    """
+    Load labelled records into a feature matrix and label vector.
+
+    Records are accumulated into fixed-size float32 chunks; full keypoint
+    vectors are converted to head features per chunk with vectorised NumPy.
+    Records without a confident head keypoint are dropped.
+    """
+    feature_chunks = []
+    label_chunks = []
+
+    for path in expand_paths(paths):
+        if path.endswith(keypoint_store.SEGMENT_SUFFIX):
+            records = keypoint_store.open_segment(path)
+            records = records[records["label"] != keypoint_store.UNLABELLED]
+            features = head_features(records["keypoints"])
+            valid = ~np.isnan(features).any(axis=1)
+            feature_chunks.append(features[valid])
+            label_chunks.append(records["label"][valid].astype(np.int64))
+
+    keypoints = np.empty((chunk_size, KEYPOINT_VALUES), dtype=np.float32)
+    keypoint_labels = np.empty(chunk_size, dtype=np.int64)
+    n_keypoints = 0
+
+    heads = np.empty((chunk_size, len(FEATURE_NAMES)), dtype=np.float32)
+    head_labels = np.empty(chunk_size, dtype=np.int64)
+    n_heads = 0
+
+    def flush_keypoints():
+        features = head_features(keypoints[:n_keypoints])
+        valid = ~np.isnan(features).any(axis=1)
+        feature_chunks.append(features[valid])
+        label_chunks.append(keypoint_labels[:n_keypoints][valid].copy())
+
+    def flush_heads():
+        feature_chunks.append(heads[:n_heads].copy())
+        label_chunks.append(head_labels[:n_heads].copy())
+
+    for record in iter_records(paths):
+        if "label" not in record:
+            continue
+        if "head" in record:
+            heads[n_heads] = record["head"]
+            head_labels[n_heads] = record["label"]
+            n_heads += 1
+            if n_heads == chunk_size:
+                flush_heads()
+                n_heads = 0
+        elif "pose_keypoints_2d" in record:
+            keypoints[n_keypoints] = record["pose_keypoints_2d"]
+            keypoint_labels[n_keypoints] = record["label"]
+            n_keypoints += 1
+            if n_keypoints == chunk_size:
+                flush_keypoints()
+                n_keypoints = 0
+
+    if n_keypoints:
+        flush_keypoints()
+    if n_heads:
+        flush_heads()
+
+    if not feature_chunks:
+        return np.empty((0, len(FEATURE_NAMES)), dtype=np.float32), np.empty(0, dtype=np.int64)
+    return np.concatenate(feature_chunks), np.concatenate(label_chunks)
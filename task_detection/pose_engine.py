@@ -0,0 +1,122 @@
+"""
+In-process YOLOv7 pose estimation.
+
+Loads the pose model once and runs it on decoded frames, so callers that
+handle many frames (the replay harness, benchmarks, long-running receivers)
+do not pay the interpreter start-up and model load of one img_processing.py
+subprocess per image.
+
+Input tensors are preallocated per thread and letterboxed resolution and
+filled in place, so one engine can serve several threads, and garbage
+collection follows a GcPolicy instead of running on every frame.
+"""
+
+import os
+import sys
+import threading
+
+import cv2
+import numpy as np
+import torch
+
+from gc_policy import GcPolicy
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'yolov7'))
+from utils.datasets import letterbox
+from utils.general import non_max_suppression_kpt
+from utils.plots import output_to_keypoint
+
+DEFAULT_WEIGHTS = 'yolov7-w6-pose.pt'
+IMAGE_SIZE = 960
+STRIDE = 128
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.65
+
+
+def available_devices():
+    """Torch devices usable on this host, best first"""
+    devices = []
+    if torch.cuda.is_available():
+        devices.append('cuda')
+    if torch.backends.mps.is_available():
+        devices.append('mps')
+    devices.append('cpu')
+    return devices
+
+
+def decode_image(payload):
+    """Decode JPEG bytes from a camera into a BGR image"""
+    return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+class PoseEngine:
+    def __init__(self, weights=DEFAULT_WEIGHTS, device=None, image_size=IMAGE_SIZE, gc_policy=None):
+        self.device_type = device or available_devices()[0]
+        self.device = torch.device(self.device_type)
+        self.image_size = image_size
+        # Per thread: (height, width) -> (host tensor, host numpy view, device tensor)
+        self._local = threading.local()
+
+        checkpoint = torch.load(weights, map_location=self.device)
+        self.model = checkpoint['model']
+        for param in self.model.parameters():
+            param.grad = None
+        _ = self.model.float().eval()
+        if self.device_type != "cpu":
+            self.model.half().to(self.device)
+
+        self.gc_policy = gc_policy or GcPolicy.from_env(
+            on_collect=torch.cuda.empty_cache if self.device_type == "cuda" else None)
+        self.gc_policy.freeze()
+
+    def input_tensor(self, image):
+        """
+        Write a letterboxed HWC uint8 image into the reusable (1, 3, H, W)
+        input tensor for this thread and resolution, as CHW floats in [0, 1]
+        """
+        height, width = image.shape[:2]
+        if not hasattr(self._local, 'input_buffers'):
+            self._local.input_buffers = {}
+        buffers = self._local.input_buffers.get((height, width))
+        if buffers is None:
+            host = torch.empty((1, 3, height, width), dtype=torch.float32)
+            device = host
+            if self.device_type != "cpu":
+                device = torch.empty((1, 3, height, width), dtype=torch.float16, device=self.device)
+            buffers = self._local.input_buffers[(height, width)] = (host, host.numpy(), device)
+        host, host_array, device = buffers
+
+        # HWC -> CHW transpose and scaling in one pass, same values as ToTensor()
+        np.divide(image.transpose(2, 0, 1), 255, out=host_array[0], dtype=np.float32)
+        if device is not host:
+            device.copy_(host)
+        return device
+
+    def process_image(self, image, rotate=None):
+        """
+        Run pose detection on a BGR image (or image path). Returns the
+        output_to_keypoint rows and the letterboxed input tensor, which is
+        reused by the next call at the same resolution on the same thread.
+        """
+        if isinstance(image, str):
+            image = cv2.imread(image)
+        if rotate is not None:
+            image = cv2.rotate(image, rotate)
+        image = letterbox(image, self.image_size, stride=STRIDE, auto=True)[0]
+        image_tensor = self.input_tensor(image)
+        with torch.no_grad():
+            output, _ = self.model(image_tensor)
+            output = non_max_suppression_kpt(
+                output, CONF_THRESHOLD, IOU_THRESHOLD,
+                nc=self.model.yaml['nc'], nkpt=self.model.yaml['nkpt'], kpt_label=True
+            )
+            output = output_to_keypoint(output)
+        self.gc_policy.after_frame()
+        return output, image_tensor
+
+    def keypoints(self, image, rotate=None):
+        """Keypoint vectors (N, 51) for every person detected in the image"""
+        output, _ = self.process_image(image, rotate)
+        if len(output) == 0:
+            return np.zeros((0, 51), dtype=np.float32)
+        return np.asarray(output[:, 7:], dtype=np.float32)
@@ -0,0 +1,126 @@
+"""
+Feedback-driven frame-rate hints for the cameras.
+
+RateController tracks per-camera load - frames queued, per-frame service
+time (EWMA) and the time of the last detection - and publishes a target
+frame interval on /cam/<camera_id>/control:
+
+    {"interval_ms": 500, "mode": "tracking", "timestamp": 1731466195}
+
+A camera that recently produced a detection is asked for the fast cadence,
+an idle camera for the slow one, and either is stretched when the processor
+cannot keep up (service time times queue depth, spread over the workers).
+Service time excludes queue wait, so a backlog is not counted twice. Hints
+are only re-sent when the target changes by more than min_change or the
+heartbeat expires, and are published retained so a camera picks up its
+current hint on reconnect.
+"""
+
+import json
+import threading
+import time
+
+CONTROL_TOPIC = '/cam/{camera_id}/control'
+
+FAST_INTERVAL_S = 0.5
+IDLE_INTERVAL_S = 5.0
+MAX_INTERVAL_S = 30.0
+ACTIVE_WINDOW_S = 30.0
+EWMA_ALPHA = 0.2
+
+
+def control_topic(camera_id):
+    return CONTROL_TOPIC.format(camera_id=camera_id)
+
+
+class CameraLoad:
+    def __init__(self):
+        self.queued = 0
+        self.service_time = None  # EWMA of seconds a worker spends on a frame
+        self.last_detection = None
+        self.sent_interval = None
+        self.sent_at = None
+
+
+class RateController:
+    def __init__(self, publish, fast_interval=FAST_INTERVAL_S, idle_interval=IDLE_INTERVAL_S,
+                 max_interval=MAX_INTERVAL_S, active_window=ACTIVE_WINDOW_S, min_change=0.2,
+                 heartbeat=60.0, workers=1, clock=time.monotonic):
+        # publish(topic, payload) sends one retained control message
+        self.publish = publish
+        self.fast_interval = fast_interval
+        self.idle_interval = idle_interval
+        self.max_interval = max_interval
+        self.active_window = active_window
+        self.min_change = min_change
+        self.heartbeat = heartbeat
+        # Frames are processed this many at a time
+        self.workers = workers
+        self.clock = clock
+        self.cameras = {}
+        self._lock = threading.Lock()
+
+    def _load(self, camera_id):
+        load = self.cameras.get(camera_id)
+        if load is None:
+            load = self.cameras[camera_id] = CameraLoad()
+        return load
+
+    def frame_queued(self, camera_id):
+        with self._lock:
+            self._load(camera_id).queued += 1
+
+    def frame_dropped(self, camera_id):
+        with self._lock:
+            load = self._load(camera_id)
+            load.queued = max(0, load.queued - 1)
+
+    def frame_done(self, camera_id, service_time, detected):
+        """Record a processed frame and send a new hint if the target moved"""
+        with self._lock:
+            load = self._load(camera_id)
+            load.queued = max(0, load.queued - 1)
+            load.service_time = service_time if load.service_time is None else (
+                EWMA_ALPHA * service_time + (1 - EWMA_ALPHA) * load.service_time)
+            if detected:
+                load.last_detection = self.clock()
+        self.update(camera_id)
+
+    def mode(self, camera_id):
+        load = self._load(camera_id)
+        if load.last_detection is not None and self.clock() - load.last_detection < self.active_window:
+            return 'tracking'
+        return 'idle'
+
+    def target_interval(self, camera_id):
+        """Seconds between frames this camera should aim for"""
+        load = self._load(camera_id)
+        interval = self.fast_interval if self.mode(camera_id) == 'tracking' else self.idle_interval
+        if load.service_time is not None:
+            # Never ask for frames faster than they are drained, including those already queued
+            interval = max(interval, load.service_time * (1 + load.queued) / self.workers)
+        return min(interval, self.max_interval)
+
+    def update(self, camera_id):
+        """Publish the camera's target interval if it changed enough; returns True if sent"""
+        with self._lock:
+            load = self._load(camera_id)
+            interval = self.target_interval(camera_id)
+            now = self.clock()
+            if load.sent_interval is not None:
+                changed = abs(interval - load.sent_interval) > self.min_change * load.sent_interval
+                if not changed and now - load.sent_at < self.heartbeat:
+                    return False
+            load.sent_interval, load.sent_at = interval, now
+            mode = self.mode(camera_id)
+        self.publish(control_topic(camera_id), json.dumps({
+            'interval_ms': int(round(interval * 1000)),
+            'mode': mode,
+            'timestamp': int(time.time()),
+        }))
+        return True
+
+    def tick(self):
+        """Re-evaluate every camera, e.g. to fall back to idle after activity stops"""
+        for camera_id in list(self.cameras):
+            self.update(camera_id)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Offline replay of recorded frames through the edge pipeline.
+
+Feeds a directory or archive of timestamped JPEGs, or a keypoint store,
+into CameraDataProcessor with detections captured in memory instead of
+published to AWS, and reports per-stage latency percentiles, throughput
+and the detection events that would have been emitted.
+
+Usage:
+    python3 replay.py images/ --speed max
+    python3 replay.py evening.tar.gz --speed 10 --json report.json
+    python3 replay.py pose_store/ --speed realtime
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from frame_sources import KeypointStoreFrameSource, open_recording
+from img_receiver_aws import CameraDataProcessor, InMemoryPublisher
+
+PERCENTILES = (50, 90, 99)
+
+
+class StageRecorder:
+    """Collects (stage, seconds) samples reported by the processor"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def __call__(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def summary(self):
+        summary = {}
+        for stage, values in self.samples.items():
+            values_ms = np.asarray(values) * 1000.0
+            summary[stage] = {
+                'count': len(values),
+                'mean_ms': float(values_ms.mean()),
+                'max_ms': float(values_ms.max()),
+                **{f'p{p}_ms': float(np.percentile(values_ms, p)) for p in PERCENTILES},
+            }
+        return summary
+
+
+def parse_speed(value):
+    """'max' (as fast as possible), 'realtime', or a speed-up factor such as '10' or '10x'"""
+    value = value.lower()
+    if value == 'max':
+        return None
+    if value == 'realtime':
+        return 1.0
+    return float(value.rstrip('x'))
+
+
+def replay(source, pose_engine=None):
+    """Run a recorded source through the processor; returns the report dict"""
+    recorder = StageRecorder()
+    publisher = InMemoryPublisher()
+    processor = CameraDataProcessor(
+        source=source,
+        publisher=publisher,
+        pose_engine=pose_engine,
+        threaded=False,
+        on_stage=recorder,
+    )
+
+    frames = 0
+
+    def count_and_handle(frame):
+        nonlocal frames
+        frames += 1
+        processor.handle_frame(frame)
+
+    start = time.perf_counter()
+    source.run(count_and_handle)
+    elapsed = time.perf_counter() - start
+
+    events = publisher.published
+    return {
+        'frames': frames,
+        'elapsed_s': elapsed,
+        'frames_per_s': frames / elapsed if elapsed > 0 else 0.0,
+        'events': len(events),
+        'events_by_machine': dict(Counter(e['machine_id'] for e in events)),
+        'bending_events': sum(1 for e in events if e['is_bending']),
+        'stages': recorder.summary(),
+        'detections': events,
+    }
+
+
+def print_report(report):
+    print("=" * 60)
+    print(f"Frames: {report['frames']} in {report['elapsed_s']:.2f}s ({report['frames_per_s']:.1f} frames/s)")
+    print(f"Events: {report['events']} ({report['bending_events']} bending) {report['events_by_machine']}")
+    print("-" * 60)
+    print(f"{'stage':15s} {'count':>7s} {'mean':>9s} " + " ".join(f"{'p' + str(p):>9s}" for p in PERCENTILES)
+          + f" {'max':>9s}")
+    for stage, s in report['stages'].items():
+        print(f"{stage:15s} {s['count']:7d} {s['mean_ms']:8.2f}ms "
+              + " ".join(f"{s[f'p{p}_ms']:7.2f}ms" for p in PERCENTILES) + f" {s['max_ms']:7.2f}ms")
+    print("=" * 60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded frames through the edge pipeline.")
+    parser.add_argument('recording', help="Directory of JPEGs, .tar/.zip archive, or keypoint store")
+    parser.add_argument('--speed', type=parse_speed, default=None,
+                        help="'max' (default), 'realtime', or a speed-up factor like 10x")
+    parser.add_argument('--weights', default='yolov7-w6-pose.pt', help="Pose model weights for JPEG input")
+    parser.add_argument('--device', default=None, help="Torch device for the pose engine")
+    parser.add_argument('--json', dest='json_path', help="Write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    source = open_recording(args.recording, args.speed)
+
+    pose_engine = None
+    if not isinstance(source, KeypointStoreFrameSource):
+        from pose_engine import PoseEngine
+        pose_engine = PoseEngine(args.weights, device=args.device)
+
+    report = replay(source, pose_engine)
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
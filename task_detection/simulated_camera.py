@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Simulated ESP32 camera for exercising the edge receiver and rate control.
+
+Publishes JPEG frames to /cam/<camera_id> and follows the frame-rate hints
+the receiver sends on /cam/<camera_id>/control, logging every change of
+interval. Frames come from a directory of JPEGs (cycled), or a fixed dummy
+payload when none is given.
+
+Usage:
+    python3 simulated_camera.py --camera-id room --images images/ --frames 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from itertools import cycle
+
+from frame_sources import IMAGE_EXTENSIONS
+from rate_control import IDLE_INTERVAL_S, control_topic
+
+DUMMY_FRAME = b'\xff\xd8\xff\xe0simulated-frame\xff\xd9'
+
+
+def load_payloads(directory=None):
+    if not directory:
+        return [DUMMY_FRAME]
+    payloads = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with open(os.path.join(directory, name), 'rb') as f:
+                payloads.append(f.read())
+    return payloads or [DUMMY_FRAME]
+
+
+class SimulatedCamera:
+    def __init__(self, camera_id, payloads=None, interval=IDLE_INTERVAL_S):
+        self.camera_id = camera_id
+        self.topic = f"/cam/{camera_id}"
+        self.control_topic = control_topic(camera_id)
+        self.payloads = payloads or [DUMMY_FRAME]
+        self.interval = interval
+        self.hints = []  # (time, control message) as received
+        self.frames_sent = 0
+
+    def apply_control(self, payload):
+        """Adopt the interval from a control message; ignores malformed ones"""
+        try:
+            message = json.loads(payload)
+            interval = message['interval_ms'] / 1000.0
+        except (ValueError, KeyError, TypeError):
+            return False
+        if interval <= 0:
+            return False
+        self.hints.append((time.time(), message))
+        if interval != self.interval:
+            print(f"[{self.camera_id}] interval {self.interval:.2f}s -> {interval:.2f}s ({message.get('mode')})")
+        self.interval = interval
+        return True
+
+    async def _follow_control(self, client):
+        async for message in client.messages:
+            if message.topic.matches(self.control_topic):
+                self.apply_control(message.payload)
+
+    async def run(self, client, frames=None):
+        """Publish frames at the current interval until `frames` have been sent (forever if None)"""
+        await client.subscribe(self.control_topic, qos=1)
+        follower = asyncio.create_task(self._follow_control(client))
+        try:
+            for payload in cycle(self.payloads):
+                if frames is not None and self.frames_sent >= frames:
+                    break
+                await client.publish(self.topic, payload)
+                self.frames_sent += 1
+                await asyncio.sleep(self.interval)
+        finally:
+            follower.cancel()
+
+
+async def _run(args):
+    import aiomqtt
+
+    camera = SimulatedCamera(args.camera_id, load_payloads(args.images), args.interval)
+    async with aiomqtt.Client(args.host, args.port, protocol=aiomqtt.ProtocolVersion.V5) as client:
+        await camera.run(client, args.frames)
+    print(f"[{camera.camera_id}] sent {camera.frames_sent} frames, received {len(camera.hints)} hints")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulated camera publishing frames to the local broker.")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=1883)
+    parser.add_argument('--camera-id', default='room')
+    parser.add_argument('--images', help="Directory of JPEGs to cycle through")
+    parser.add_argument('--frames', type=int, default=None, help="Stop after this many frames")
+    parser.add_argument('--interval', type=float, default=IDLE_INTERVAL_S, help="Initial seconds between frames")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_run(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
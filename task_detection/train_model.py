@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Train, compare and register pose classifiers.
+
+Reads labelled keypoint JSON/JSONL files, runs seeded stratified k-fold
+cross-validation for each candidate model in parallel, measures predict
+latency, and writes the best candidate to the model registry. With
+--promote the new version only becomes CURRENT when it is both more accurate
+and faster than the version currently in use.
+
+Example:
+    python3 train_model.py datasets/ --name head-position --n-jobs -1 --promote
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold, cross_validate
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+import model_registry
+from pose_dataset import FEATURE_NAMES, load_dataset
+
+DEFAULT_MODEL_NAME = 'head-position'
+LATENCY_REPEATS = 200
+
+CANDIDATES = {
+    'decision_tree': lambda seed: DecisionTreeClassifier(random_state=seed),
+    'shallow_tree': lambda seed: DecisionTreeClassifier(max_depth=6, random_state=seed),
+    'random_forest': lambda seed: RandomForestClassifier(n_estimators=50, max_depth=8, random_state=seed),
+    'knn': lambda seed: KNeighborsClassifier(n_neighbors=5),
+}
+
+
+def measure_predict_latency(model, X, repeats=LATENCY_REPEATS):
+    """
+    Median latency in microseconds of a single-sample predict (the edge hot
+    path) and of a batched predict normalised per sample.
+    """
+    sample = X[:1]
+    single = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(sample)
+        single.append(time.perf_counter() - start)
+
+    batch = []
+    for _ in range(max(1, repeats // 20)):
+        start = time.perf_counter()
+        model.predict(X)
+        batch.append((time.perf_counter() - start) / len(X))
+
+    return {
+        'single_us': float(np.median(single) * 1e6),
+        'batch_per_sample_us': float(np.median(batch) * 1e6),
+    }
+
+
+def smallest_class(y):
+    """(label, count) of the least frequent class"""
+    labels, counts = np.unique(y, return_counts=True)
+    index = int(np.argmin(counts))
+    return labels[index], int(counts[index])
+
+
+def evaluate_candidate(name, X, y, folds, seed, n_jobs):
+    """Cross-validate one candidate and measure its predict latency"""
+    # Stratified folds need every class in each; main() rejects classes under 2 samples
+    n_splits = max(2, min(folds, smallest_class(y)[1]))
+    cv = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+
+    scores = cross_validate(
+        CANDIDATES[name](seed), X, y, cv=cv, scoring='accuracy', n_jobs=n_jobs
+    )
+    model = CANDIDATES[name](seed).fit(X, y)
+
+    return model, {
+        'candidate': name,
+        'folds': n_splits,
+        'accuracy_mean': float(scores['test_score'].mean()),
+        'accuracy_std': float(scores['test_score'].std()),
+        'fit_time_s': float(scores['fit_time'].mean()),
+        **measure_predict_latency(model, X),
+    }
+
+
+def is_improvement(candidate, current):
+    """A candidate must beat the current model on both accuracy and latency"""
+    return (
+        candidate['accuracy_mean'] > current['accuracy_mean']
+        and candidate['single_us'] < current['single_us']
+    )
+
+
+def select_best(results, max_latency_us=None):
+    """
+    Highest accuracy wins; single-sample latency breaks ties. Candidates over
+    the latency budget are only considered if none fit within it.
+    """
+    if max_latency_us is not None:
+        within_budget = [r for r in results if r[1]['single_us'] <= max_latency_us]
+        results = within_budget or results
+    return max(results, key=lambda r: (round(r[1]['accuracy_mean'], 6), -r[1]['single_us']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and register pose classifiers.")
+    parser.add_argument('data', nargs='+', help="Labelled JSON/JSONL files or directories")
+    parser.add_argument('--name', default=DEFAULT_MODEL_NAME, help="Registry model name")
+    parser.add_argument('--candidates', nargs='+', default=list(CANDIDATES), choices=list(CANDIDATES))
+    parser.add_argument('--folds', type=int, default=5, help="Number of cross-validation folds")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Parallel jobs for cross-validation")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for splits and models")
+    parser.add_argument('--max-latency-us', type=float, default=None,
+                        help="Prefer candidates whose single-sample predict fits this budget")
+    parser.add_argument('--registry', default=None, help="Registry directory (default: models/)")
+    parser.add_argument('--promote', action='store_true',
+                        help="Make the new version CURRENT if it is more accurate and faster")
+    args = parser.parse_args(argv)
+
+    np.random.seed(args.seed)
+
+    X, y = load_dataset(args.data)
+    if len(X) == 0:
+        print("Error: no labelled samples found.")
+        return 1
+    label, count = smallest_class(y)
+    if count < 2:
+        print(f"Error: class {label} has only {count} sample; cross-validation needs at least 2 per class.")
+        return 1
+    print(f"Loaded {len(X)} samples, {len(np.unique(y))} classes")
+
+    results = []
+    for name in args.candidates:
+        model, metrics = evaluate_candidate(name, X, y, args.folds, args.seed, args.n_jobs)
+        results.append((model, metrics))
+        print(f"  {name:15s} accuracy={metrics['accuracy_mean']:.3f}±{metrics['accuracy_std']:.3f} "
+              f"predict={metrics['single_us']:.1f}us/single {metrics['batch_per_sample_us']:.2f}us/batched")
+
+    best_model, best_metrics = select_best(results, args.max_latency_us)
+    metadata = {
+        'features': FEATURE_NAMES,
+        'classes': [int(c) for c in best_model.classes_],
+        'n_samples': len(X),
+        'seed': args.seed,
+        'metrics': best_metrics,
+        'candidates': [metrics for _, metrics in results],
+        'data': args.data,
+    }
+    version = model_registry.save_model(best_model, args.name, metadata, args.registry)
+    print(f"Saved {args.name} {version} ({best_metrics['candidate']})")
+
+    if args.promote:
+        current = model_registry.current_version(args.name, args.registry)
+        current_metrics = (
+            model_registry.load_metadata(args.name, current, args.registry)['metrics'] if current else None
+        )
+        if current_metrics is None or is_improvement(best_metrics, current_metrics):
+            model_registry.promote(args.name, version, args.registry)
+            print(f"Promoted {args.name} {version} to CURRENT")
+        else:
+            print(f"Kept {args.name} {current} as CURRENT: {json.dumps(current_metrics)}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
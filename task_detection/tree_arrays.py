@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Dependency-light export of tree classifiers for the Lambda predictors.
+
+A fitted DecisionTreeClassifier or RandomForestClassifier is flattened into
+NumPy arrays and written as an .npz that processCameraJSONFunction scores
+with NumPy alone (no pandas, joblib or scikit-learn in the Lambda):
+
+    feature    int32   split feature per node, -1 for leaves
+    threshold  float64 go left when x <= threshold
+    left/right int32   child node indices, -1 for leaves
+    proba      float64 class distribution per node (rows sum to 1)
+    roots      int32   first node of each tree
+    classes            class labels, as in model.classes_
+    n_features int     expected feature count
+
+Predictions average the leaf distributions over the trees and take the
+argmax, which is what scikit-learn's predict does for both model types.
+leaves() is the one tree walk shared by predict() and device_forest; this
+file is packaged next to processCameraJSONFunction (see lambda.tf), so it
+imports nothing beyond NumPy.
+
+Usage:
+    python3 tree_arrays.py json_model_2.joblib json_model.npz
+"""
+
+import sys
+
+import numpy as np
+
+ARRAYS_FILENAME = 'model.npz'
+
+
+def is_tree_model(model):
+    estimators = getattr(model, 'estimators_', [model])
+    return all(hasattr(estimator, 'tree_') for estimator in estimators)
+
+
+def to_arrays(model):
+    """Flattened arrays for a fitted tree classifier or forest of trees"""
+    estimators = getattr(model, 'estimators_', [model])
+    parts = {'feature': [], 'threshold': [], 'left': [], 'right': [], 'proba': []}
+    roots = []
+    offset = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        is_leaf = tree.children_left < 0
+        value = tree.value[:, 0, :].astype(np.float64)
+        parts['feature'].append(np.where(is_leaf, -1, tree.feature))
+        parts['threshold'].append(np.where(is_leaf, 0.0, tree.threshold))
+        parts['left'].append(np.where(is_leaf, -1, tree.children_left + offset))
+        parts['right'].append(np.where(is_leaf, -1, tree.children_right + offset))
+        parts['proba'].append(value / value.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        offset += tree.node_count
+
+    return {
+        'feature': np.concatenate(parts['feature']).astype(np.int32),
+        'threshold': np.concatenate(parts['threshold']).astype(np.float64),
+        'left': np.concatenate(parts['left']).astype(np.int32),
+        'right': np.concatenate(parts['right']).astype(np.int32),
+        'proba': np.concatenate(parts['proba']),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'classes': np.asarray(model.classes_),
+        'n_features': np.asarray(model.n_features_in_),
+    }
+
+
+def export(model, path):
+    """Write the .npz for a tree model"""
+    np.savez_compressed(path, **to_arrays(model))
+
+
+def leaves(arrays, X):
+    """
+    Leaf index reached in every tree, shape (n_samples, n_trees), for the
+    feature/threshold/left/right/roots arrays. Inputs are rounded to float32
+    and compared in double precision, as scikit-learn and the device C do.
+    """
+    X = np.atleast_2d(np.asarray(X, dtype=np.float32)).astype(np.float64)
+    rows = np.arange(len(X))[:, None]
+    node = np.broadcast_to(arrays['roots'], (len(X), len(arrays['roots']))).copy()
+    while True:
+        feature = arrays['feature'][node]
+        split = feature >= 0
+        if not split.any():
+            return node
+        go_left = X[rows, np.where(split, feature, 0)] <= arrays['threshold'][node]
+        node = np.where(split, np.where(go_left, arrays['left'][node], arrays['right'][node]), node)
+
+
+def predict(arrays, X):
+    """Class labels: the leaf distributions averaged over the trees, then the argmax"""
+    proba = arrays['proba'][leaves(arrays, X)].mean(axis=1)
+    return arrays['classes'][proba.argmax(axis=1)]
+
+
+def main(argv=None):
+    import joblib
+
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("Usage: tree_arrays.py MODEL.joblib OUTPUT.npz")
+        return 2
+    model = joblib.load(argv[0])
+    if not is_tree_model(model):
+        print(f"Error: {type(model).__name__} is not a tree model")
+        return 1
+    export(model, argv[1])
+    print(f"Wrote {argv[1]}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,51 @@
+import shutil
+import subprocess
 import sys
 from pathlib import Path
 
+import numpy as np
+import pytest
+
 
 ROOT = Path(__file__).resolve().parents[2]
-if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
+TASK_DETECTION = ROOT / "task_detection"
+# Lambda handlers import their packaged helper modules (e.g. serialization) top-level
+AWS_FUNCTIONS = ROOT / "aws" / "functions"
+for path in (ROOT, TASK_DETECTION, AWS_FUNCTIONS):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+# Reads [ax, ay, az, acc_magn] rows from stdin and prints the header's prediction for each
+CLASSIFIER_DRIVER = """
+#include <cstdint>
+#include <cstdio>
+#include "{header}"
+
+int main() {{
+    Eloquent::ML::Port::RandomForest classifier;
+    float x[4];
+    while (scanf("%f %f %f %f", &x[0], &x[1], &x[2], &x[3]) == 4) {{
+        printf("%d\\n", classifier.predict(x));
+    }}
+    return 0;
+}}
+"""
+
+
+@pytest.fixture
+def compiled_predict(tmp_path):
+    """compiled_predict(header_path, X): predictions of the classifier header compiled with g++"""
+    if shutil.which("g++") is None:
+        pytest.skip("needs a C++ compiler")
+
+    def predict(header, X):
+        source = tmp_path / "driver.cpp"
+        source.write_text(CLASSIFIER_DRIVER.format(header=header))
+        binary = tmp_path / "driver"
+        subprocess.run(["g++", "-O1", "-o", str(binary), str(source)], check=True)
+        stdin = "\n".join(" ".join(repr(float(v)) for v in row) for row in X)
+        output = subprocess.run([str(binary)], input=stdin, capture_output=True, text=True, check=True)
+        return np.array(output.stdout.split(), dtype=int)
 
+    return predict
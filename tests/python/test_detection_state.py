@@ -0,0 +1,35 @@
+import pytest
+
+from detection_state import InMemoryDetectionState, SQLiteDetectionState, open_detection_state
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def state(request, tmp_path):
+    backend = open_detection_state("memory" if request.param == "memory" else f"sqlite:{tmp_path / 'state.db'}")
+    yield backend
+    backend.close()
+
+
+def test_counts_detections_within_window(state):
+    assert [state.record("RVREB-W1", t) for t in (100.0, 104.0, 109.0)] == [1, 2, 3]
+    assert state.record("RVREB-D1", 109.0) == 1
+    # 100.0 and 104.0 fall out of the 10 s window ending at 114.5
+    assert state.record("RVREB-W1", 114.5) == 2
+
+
+def test_sqlite_state_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "state.db")
+    first, second = SQLiteDetectionState(path), SQLiteDetectionState(path)
+    try:
+        assert first.record("RVREB-W1", 100.0) == 1
+        assert second.record("RVREB-W1", 101.0) == 2
+        assert first.record("RVREB-W1", 102.0) == 3
+    finally:
+        first.close()
+        second.close()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        open_detection_state("redis://localhost")
+    assert isinstance(open_detection_state(), InMemoryDetectionState)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from device_forest import (
+    DEVICE_HEADERS,
+    FlatForest,
+    device_features,
+    load_device_forest,
+)
+
+
+def corpus(forest, seed=3237, n=4000):
+    """Raw readings spread over the range each axis is split on, so every branch is exercised"""
+    rng = np.random.default_rng(seed)
+    raw = []
+    for axis in range(3):
+        thresholds = forest.threshold[forest.feature == axis]
+        raw.append(rng.integers(int(thresholds.min()) - 100, int(thresholds.max()) + 100, size=n))
+    return device_features(*raw)
+
+
+@pytest.mark.parametrize("device_type", sorted(DEVICE_HEADERS))
+def test_matches_compiled_header(device_type, compiled_predict):
+    forest = load_device_forest(device_type)
+    X = corpus(forest)
+    expected = compiled_predict(DEVICE_HEADERS[device_type], X)
+
+    predictions = forest.predict(X)
+    assert len(expected) == len(X)
+    assert np.array_equal(predictions, expected)
+    assert 0 < predictions.sum() < len(X)
+
+
+def test_parses_structure_and_round_trips(tmp_path):
+    forest = load_device_forest("washer")
+    assert forest.n_classes == 2
+    assert forest.n_trees > 1
+    leaves = forest.feature < 0
+    assert set(forest.value[leaves]) == {0, 1}
+    assert (forest.left[~leaves] > np.flatnonzero(~leaves)).all()
+
+    path = tmp_path / "washer.npz"
+    forest.save(path)
+    X = corpus(forest, n=200)
+    assert np.array_equal(FlatForest.load(path).predict(X), forest.predict(X))
+
+
+def test_flattens_sklearn_forest():
+    ensemble = pytest.importorskip("sklearn.ensemble")
+    X = corpus(load_device_forest("washer"), n=500)
+    y = (X[:, 3] > 2000).astype(int)
+    model = ensemble.RandomForestClassifier(n_estimators=5, max_depth=4, random_state=0).fit(X, y)
+    forest = FlatForest.from_sklearn(model)
+    assert forest.max_depth <= 4
+    expected = np.stack([sum(est.predict(X) == c for est in model.estimators_) for c in (0, 1)], axis=1)
+    assert np.array_equal(forest.votes(X), expected)
+
+
+def test_device_features_truncate_magnitude():
+    X = device_features([3, -2000], [4, 100], [0, 100])
+    assert X.dtype == np.float32
+    assert X[0].tolist() == [3, 4, 0, 5]
+    assert X[1, 3] == 2004
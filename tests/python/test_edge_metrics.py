@@ -0,0 +1,113 @@
+import json
+import threading
+import urllib.request
+
+import numpy as np
+
+from edge_metrics import Histogram, MetricsHTTPServer, MetricsRegistry, MqttMetricsPublisher
+from frame_sources import Frame
+from img_receiver_aws import CameraDataProcessor, InMemoryPublisher
+
+
+def test_histogram_buckets_are_cumulative_with_overflow():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [2, 3, 4]
+    assert histogram.count == 4
+    assert histogram.sum == 5.65
+
+
+def test_prometheus_rendering_includes_labels_and_inf_bucket():
+    registry = MetricsRegistry()
+    registry.counter("frames_total", "Frames", {"reason": "topic"}).inc(3)
+    registry.histogram("stage_seconds", "Stages", {"stage": "classify"}, buckets=(0.5,)).observe(0.2)
+
+    text = registry.render_prometheus()
+
+    assert "# TYPE frames_total counter" in text
+    assert 'frames_total{reason="topic"} 3' in text
+    assert 'stage_seconds_bucket{stage="classify",le="0.5"} 1' in text
+    assert 'stage_seconds_bucket{stage="classify",le="+Inf"} 1' in text
+    assert 'stage_seconds_count{stage="classify"} 1' in text
+
+
+def test_rendering_while_metrics_are_registered():
+    registry = MetricsRegistry()
+    stop = threading.Event()
+
+    def register():
+        n = 0
+        while not stop.is_set():
+            registry.counter(f"metric_{n % 50}_total", labels={"n": str(n % 100)}).inc()
+            n += 1
+
+    thread = threading.Thread(target=register)
+    thread.start()
+    try:
+        for _ in range(50):
+            registry.render_prometheus()
+            json.dumps(registry.snapshot())
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_processor_counts_frames_and_serves_metrics():
+    registry = MetricsRegistry()
+    processor = CameraDataProcessor(
+        source=object(), publisher=InMemoryPublisher(), threaded=False, metrics=registry,
+    )
+    keypoints = np.zeros(51, dtype=np.float32)
+    keypoints[0:3] = [711.0, 623.5, 0.9]  # nose in the washer region
+    keypoints[15:18] = [0.0, 0.0, 0.9]  # left shoulder
+    keypoints[33:36] = [0.0, 100.0, 0.9]  # left hip
+    keypoints[39:42] = [100.0, 100.0, 0.9]  # left knee
+
+    processor.handle_frame(Frame("/cam/room", None, 1700000000.0, "1", keypoints))
+    processor.handle_frame(Frame("/cam/room/control", b"{}", 1700000001.0))
+
+    server = MetricsHTTPServer(registry, port=0).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            text = response.read().decode()
+    finally:
+        server.stop()
+
+    assert "camera_frames_received_total 2" in text
+    assert "camera_detections_published_total 1" in text
+    assert 'camera_frames_skipped_total{reason="topic"} 1' in text
+    assert 'camera_stage_seconds_count{stage="classify"} 1' in text
+    assert "camera_frames_in_flight 0" in text
+
+
+def test_subprocess_stage_timings_are_recorded():
+    registry = MetricsRegistry()
+    processor = CameraDataProcessor(source=object(), publisher=InMemoryPublisher(), metrics=registry)
+
+    stdout = 'cpu\nSTAGE_TIMINGS {"imported_at": 102.5, "model_load": 1.5, "inference": 0.75}\n'
+    processor.record_subprocess_stages(stdout, spawned_at=100.0)
+
+    snapshot = registry.snapshot()["metrics"]["camera_stage_seconds"]["series"]
+    sums = {s["labels"]["stage"]: s["sum"] for s in snapshot}
+    assert sums == {"subprocess_start": 2.5, "model_load": 1.5, "inference": 0.75}
+
+
+def test_mqtt_publisher_sends_json_snapshot():
+    class FakeClient:
+        def __init__(self):
+            self.messages = []
+
+        def publish(self, topic, payload):
+            self.messages.append((topic, payload))
+
+    registry = MetricsRegistry()
+    registry.gauge("camera_frames_in_flight").set(2)
+    client = FakeClient()
+
+    MqttMetricsPublisher(registry, client, topic="edge/metrics").publish_once()
+
+    topic, payload = client.messages[0]
+    assert topic == "edge/metrics"
+    assert json.loads(payload)["metrics"]["camera_frames_in_flight"]["series"][0]["value"] == 2
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+
+import aiomqtt
+import pytest
+
+import edge_receiver
+from edge_metrics import MetricsRegistry
+from edge_receiver import EdgeReceiver, main, topic_matches
+from img_receiver_aws import InMemoryPublisher
+
+
+class RecordingProcessor:
+    """Minimal CameraDataProcessor stand-in that records frames from worker threads"""
+
+    def __init__(self, release=None):
+        self.metrics = MetricsRegistry()
+        self.publisher = InMemoryPublisher()
+        self.frames = []
+        self.release = release
+
+    def handle_frame(self, frame):
+        if self.release is not None:
+            self.release.wait(5)
+        self.frames.append(frame)
+
+
+def test_topic_filters():
+    assert topic_matches("/cam/#", "/cam/room")
+    assert topic_matches("/cam/#", "/cam/level1/washer")
+    assert topic_matches("laundry/+", "laundry/vibration")
+    assert not topic_matches("laundry/vibration", "laundry/vibration/extra")
+    assert not topic_matches("/cam/#", "laundry/vibration")
+
+
+def test_routes_and_drains_in_flight_work():
+    processor = RecordingProcessor()
+    receiver = EdgeReceiver(processor, workers=2)
+
+    async def scenario():
+        receiver.start_consumers()
+        assert receiver.dispatch("/cam/room", b"jpg", 1.0) == "camera"
+        assert receiver.dispatch("laundry/vibration", b'{"machine_id": "RVREB-W1", "acc_magn": 1.2}') == "vibration"
+        assert receiver.dispatch("other/topic", b"") is None
+        await receiver.drain()
+
+    asyncio.run(scenario())
+
+    assert [f.payload for f in processor.frames] == [b"jpg"]
+    assert processor.publisher.messages == [("laundry/vibration", {"machine_id": "RVREB-W1", "acc_magn": 1.2})]
+    assert processor.publisher.published == []
+
+
+def test_full_camera_queue_drops_oldest_frame():
+    release = threading.Event()
+    processor = RecordingProcessor(release)
+    receiver = EdgeReceiver(processor, workers=1, camera_queue=2)
+
+    async def scenario():
+        receiver.start_consumers()
+        receiver.dispatch("/cam/room", b"0")
+        await asyncio.sleep(0.05)  # frame 0 is now blocked in the worker
+        for payload in (b"1", b"2", b"3"):
+            receiver.dispatch("/cam/room", payload)
+        release.set()
+        await receiver.drain()
+
+    asyncio.run(scenario())
+
+    assert [f.payload for f in processor.frames] == [b"0", b"2", b"3"]
+    assert receiver.dropped["camera"].value == 1
+    assert receiver.queue_depth["camera"].value == 0
+
+
+def test_partitions_give_each_camera_exactly_one_owner():
+    receivers = [EdgeReceiver(RecordingProcessor(), partition=(i, 2)) for i in range(2)]
+    cameras = [f"cam{i}" for i in range(20)]
+
+    async def scenario():
+        owners = {}
+        for receiver in receivers:
+            receiver.start_consumers()
+            for camera in cameras:
+                if receiver.dispatch(f"/cam/{camera}", b"jpg") == "camera":
+                    owners.setdefault(camera, []).append(receiver)
+            receiver.dispatch("laundry/vibration", b"{}")
+            await receiver.drain()
+        return owners
+
+    owners = asyncio.run(scenario())
+
+    assert sorted(owners) == sorted(cameras)
+    assert all(len(o) == 1 for o in owners.values())
+    assert {len(r.processor.frames) for r in receivers} != {0}
+    # Vibration readings are forwarded once, by partition 0
+    assert [len(r.processor.publisher.messages) for r in receivers] == [1, 0]
+
+
+def test_shared_subscription_filters():
+    receiver = EdgeReceiver(RecordingProcessor(), share_group="cams")
+    assert [receiver.subscription(r) for r in receiver.routes] == [
+        "$share/cams//cam/+", "$share/cams/laundry/vibration"]
+    assert topic_matches("/cam/+", "/cam/room")
+    assert not topic_matches("/cam/+", "/cam/room/control")
+
+
+def test_share_group_and_partition_are_mutually_exclusive(capsys):
+    with pytest.raises(SystemExit):
+        main(["--share-group", "cams", "--partition", "0/2"])
+    assert "not allowed with argument" in capsys.readouterr().err
+
+
+def test_reconnects_after_the_broker_connection_drops(monkeypatch):
+    sessions = []
+
+    class FlakyClient:
+        """Drops the first session; the second delivers one message and stops the receiver"""
+
+        def __init__(self, *args, **kwargs):
+            sessions.append(self)
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def subscribe(self, topic):
+            pass
+
+        @property
+        def messages(self):
+            return self._messages()
+
+        async def _messages(self):
+            if len(sessions) == 1:
+                raise aiomqtt.MqttError("Disconnected during message iteration")
+            yield type("Message", (), {"topic": aiomqtt.Topic("/cam/room"), "payload": b"jpg"})()
+            receiver.stop()
+            await asyncio.sleep(3600)
+
+    monkeypatch.setattr(aiomqtt, "Client", FlakyClient)
+    monkeypatch.setattr(edge_receiver, "RECONNECT_MIN_S", 0.01)
+    receiver = EdgeReceiver(RecordingProcessor())
+    asyncio.run(receiver.run())
+
+    assert len(sessions) == 2
+    assert [f.topic for f in receiver.processor.frames] == ["/cam/room"]
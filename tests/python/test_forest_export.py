@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from device_forest import FlatForest, device_features
+from forest_export import export, flatten, prune, simplify
+
+ensemble = pytest.importorskip("sklearn.ensemble")
+
+
+def readings(n, seed):
+    rng = np.random.default_rng(seed)
+    spinning = rng.random(n) < 0.5
+    noise = np.where(spinning, 400, 40)[:, None]
+    raw = rng.normal([0, -2048, 0], 1, size=(n, 3)) * noise + [0, -2048, 0]
+    X = device_features(*raw.round().astype(int).T)
+    return X, spinning.astype(int)
+
+
+@pytest.fixture(scope="module")
+def model():
+    X, y = readings(2000, seed=1)
+    return ensemble.RandomForestClassifier(n_estimators=8, random_state=0).fit(X, y)
+
+
+def test_quantised_export_is_lossless_on_sensor_units(model):
+    X, y = readings(1000, seed=2)
+    header, report = export(model, X, y, quantize=True)
+
+    assert report["agreement"] == 1.0
+    assert report["accuracy_loss"] == 0.0
+    assert report["exported"]["splits"] <= report["source"]["splits"]
+    assert report["exported"]["instructions_per_sample"] < report["source"]["instructions_per_sample"]
+    assert np.array_equal(FlatForest.from_source(header).predict(X), model.predict(X))
+
+
+def test_pruning_shrinks_the_forest(model):
+    X, y = readings(1000, seed=3)
+    _, full = export(model, X, y)
+    _, pruned = export(model, X, y, max_depth=3, max_trees=4, quantize=True)
+
+    assert pruned["exported"]["trees"] == 4
+    assert pruned["exported"]["max_depth"] <= 3
+    assert pruned["header_lines"] < full["header_lines"]
+    assert pruned["exported"]["accuracy"] > 0.8
+
+
+def test_identical_subtrees_are_merged():
+    tree = ("split", 0, 10.5, ("leaf", 1), ("split", 1, 3.0, ("leaf", 1), ("leaf", 1)))
+    assert simplify(tree) == ("leaf", 1)
+    # x[0] <= 10 already holds on the left branch, so the inner split is dropped
+    nested = ("split", 0, 10.5, ("split", 0, 20.0, ("leaf", 0), ("leaf", 1)), ("leaf", 1))
+    assert simplify(nested, quantize=True) == ("split", 0, 10.0, ("leaf", 0), ("leaf", 1))
+
+
+def test_generated_header_compiles_and_matches(model, compiled_predict, tmp_path):
+    X, _ = readings(1000, seed=4)
+    header, _ = export(model, max_depth=5, quantize=True)
+    (tmp_path / "clf.h").write_text(header)
+
+    expected = flatten([simplify(t, True) for t in prune(model, max_depth=5)], 2).predict(X)
+    assert np.array_equal(compiled_predict(tmp_path / "clf.h", X), expected)
@@ -0,0 +1,26 @@
+from gc_policy import GcPolicy
+
+
+def test_collects_every_n_frames_only():
+    collected = []
+    policy = GcPolicy(every_frames=3, every_seconds=0, on_collect=lambda: collected.append(policy.frames))
+
+    results = [policy.after_frame() for _ in range(7)]
+
+    assert results == [False, False, True, False, False, True, False]
+    assert collected == [3, 6]
+    assert policy.collections == 2
+
+
+def test_collects_when_interval_has_elapsed():
+    policy = GcPolicy(every_frames=0, every_seconds=3600)
+    assert not policy.after_frame()
+
+    policy._last_collect -= 3600
+    assert policy.after_frame()
+    assert not policy.after_frame()
+
+
+def test_rss_limit_triggers_collection():
+    assert GcPolicy(every_seconds=0, rss_limit_mb=0.001).after_frame()
+    assert not GcPolicy(every_seconds=0, rss_limit_mb=10 ** 9).after_frame()
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pytest
+
+from inference_pool import FrameRing, InferencePool, WorkerDiedError
+
+
+class ChannelMeanEngine:
+    """Stands in for PoseEngine: one 'person' per frame carrying the frame's channel means"""
+
+    def keypoints(self, image, rotate=None):
+        people = np.zeros((1, 51), dtype=np.float32)
+        people[0, :3] = image.reshape(-1, 3).mean(axis=0)
+        people[0, 3] = -1 if rotate is None else rotate
+        return people
+
+
+def make_engine():
+    return ChannelMeanEngine()
+
+
+class CrashingEngine(ChannelMeanEngine):
+    """Kills its worker process on an all-255 frame"""
+
+    def keypoints(self, image, rotate=None):
+        if image.min() == 255:
+            os._exit(3)
+        return super().keypoints(image, rotate)
+
+
+def make_crashing_engine():
+    return CrashingEngine()
+
+
+def test_pool_returns_keypoints_through_shared_memory():
+    frames = [np.full((4, 6, 3), value, dtype=np.uint8) for value in range(10)]
+
+    with InferencePool(workers=2, slots=3, max_frame_shape=(8, 8, 3), engine_factory=make_engine) as pool:
+        futures = [pool.submit(frame, rotate=0) for frame in frames]
+        results = [future.result(timeout=30) for future in futures]
+
+    for value, people in enumerate(results):
+        assert people.shape == (1, 51)
+        np.testing.assert_allclose(people[0, :4], [value, value, value, 0])
+
+
+def test_dead_worker_fails_its_frame_and_is_replaced():
+    with InferencePool(workers=1, slots=2, max_frame_shape=(8, 8, 3), engine_factory=make_crashing_engine) as pool:
+        crashed = pool.submit(np.full((4, 6, 3), 255, dtype=np.uint8))
+        with pytest.raises(WorkerDiedError):
+            crashed.result(timeout=30)
+
+        # The slot is free again and the respawned worker serves the next frames
+        futures = [pool.submit(np.full((4, 6, 3), value, dtype=np.uint8), block=False) for value in (1, 2)]
+        results = [future.result(timeout=60) for future in futures]
+
+    assert [people[0, 0] for people in results] == [1, 2]
+
+
+def test_frame_ring_rejects_oversized_frames():
+    ring = FrameRing(1, max_frame_shape=(2, 2, 3))
+    try:
+        assert ring.frame(0, (2, 2, 3)).flags['C_CONTIGUOUS']
+        with pytest.raises(ValueError):
+            ring.frame(0, (3, 3, 3))
+    finally:
+        ring.close()
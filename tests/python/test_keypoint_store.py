@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+
+import keypoint_store
+from pose_dataset import load_dataset
+
+
+def _keypoints(seed):
+    return np.random.default_rng(seed).random(keypoint_store.KEYPOINT_VALUES, dtype=np.float32)
+
+
+def test_writer_rolls_segments_and_reader_memmaps_columns(tmp_path):
+    with keypoint_store.KeypointStoreWriter(str(tmp_path), segment_records=3) as writer:
+        for i in range(5):
+            writer.append(_keypoints(i), 1000.0 + i, "room", track_id=i)
+        writer.append_records(keypoint_store.make_records(np.stack([_keypoints(5), _keypoints(6)]), [1005.0, 1006.0], "door"))
+
+    segments = keypoint_store.list_segments(str(tmp_path))
+    assert len(segments) == 3
+
+    first = keypoint_store.open_segment(segments[0])
+    assert isinstance(first, np.memmap)
+    assert first["timestamp"].tolist() == [1000.0, 1001.0, 1002.0]
+    np.testing.assert_array_equal(first["keypoints"][1], _keypoints(1))
+
+    records = keypoint_store.load_records(str(tmp_path), start=1003.0, camera="room")
+    assert records["track_id"].tolist() == [3, 4]
+    assert len(keypoint_store.load_records(str(tmp_path), camera="door")) == 2
+
+
+def test_partial_trailing_record_is_ignored_and_repaired(tmp_path):
+    with keypoint_store.KeypointStoreWriter(str(tmp_path)) as writer:
+        writer.append(_keypoints(0), 1.0, "room")
+    segment = keypoint_store.list_segments(str(tmp_path))[0]
+    with open(segment, "ab") as f:
+        f.write(b"\x01" * 10)
+
+    assert len(keypoint_store.open_segment(segment)) == 1
+
+    with keypoint_store.KeypointStoreWriter(str(tmp_path)) as writer:
+        writer.append(_keypoints(1), 2.0, "room")
+    assert keypoint_store.open_segment(segment)["timestamp"].tolist() == [1.0, 2.0]
+
+
+def test_convert_json_output_and_train_from_store(tmp_path):
+    json_dir = tmp_path / "json_output"
+    json_dir.mkdir()
+    for i, label in enumerate([0, 1, 2]):
+        keypoints = [0.0] * keypoint_store.KEYPOINT_VALUES
+        keypoints[0:3] = [100.0 * i, 50.0, 0.9]
+        (json_dir / f"20241113-10495{i}.json").write_text(json.dumps({"pose_keypoints_2d": keypoints, "label": label}))
+    (json_dir / "20241113-104959.json").write_text(json.dumps({"pose_keypoints_2d": [1.0]}))
+
+    store = tmp_path / "store"
+    assert keypoint_store.convert_json([str(json_dir)], str(store), "room") == 3
+
+    records = keypoint_store.load_records(str(store))
+    assert records["camera"].tolist() == [b"room"] * 3
+    assert np.all(np.diff(records["timestamp"]) == 1.0)
+
+    X, y = load_dataset([str(store)])
+    assert X[:, 0].tolist() == [0.0, 100.0, 200.0]
+    assert y.tolist() == [0, 1, 2]
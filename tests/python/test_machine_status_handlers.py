@@ -1,8 +1,10 @@
 import importlib
 import json
+from decimal import Decimal
 
 import boto3
 import pytest
+from botocore.exceptions import ClientError
 from moto import mock_aws
 
 
@@ -13,8 +15,40 @@ def machine_status_table():
         table_name = "MachineStatusTable"
         dynamodb.create_table(
             TableName=table_name,
-            AttributeDefinitions=[{"AttributeName": "machineID", "AttributeType": "S"}],
+            AttributeDefinitions=[
+                {"AttributeName": "machineID", "AttributeType": "S"},
+                {"AttributeName": "building", "AttributeType": "S"},
+                {"AttributeName": "timed_state", "AttributeType": "S"},
+                {"AttributeName": "deadline", "AttributeType": "N"},
+            ],
             KeySchema=[{"AttributeName": "machineID", "KeyType": "HASH"}],
+            GlobalSecondaryIndexes=[{
+                "IndexName": "BuildingIndex",
+                "KeySchema": [
+                    {"AttributeName": "building", "KeyType": "HASH"},
+                    {"AttributeName": "machineID", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            }, {
+                "IndexName": "DeadlineIndex",
+                "KeySchema": [
+                    {"AttributeName": "timed_state", "KeyType": "HASH"},
+                    {"AttributeName": "deadline", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "KEYS_ONLY"},
+            }],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        dynamodb.create_table(
+            TableName="MachineStateHistory",
+            AttributeDefinitions=[
+                {"AttributeName": "machine_id", "AttributeType": "S"},
+                {"AttributeName": "timestamp", "AttributeType": "N"},
+            ],
+            KeySchema=[
+                {"AttributeName": "machine_id", "KeyType": "HASH"},
+                {"AttributeName": "timestamp", "KeyType": "RANGE"},
+            ],
             BillingMode="PAY_PER_REQUEST",
         )
         resource = boto3.resource("dynamodb", region_name="us-east-1")
@@ -23,8 +57,9 @@ def machine_status_table():
 
 
 def test_fetch_machine_status_returns_items(machine_status_table, monkeypatch):
-    machine_status_table.put_item(Item={"machineID": "RVREB-W1", "status": "available"})
-    machine_status_table.put_item(Item={"machineID": "RVREB-D1", "status": "in-use"})
+    machine_status_table.put_item(Item={"machineID": "RVREB-W1", "building": "RVREB", "status": "available"})
+    machine_status_table.put_item(Item={"machineID": "RVREB-D1", "building": "RVREB", "status": "in-use"})
+    machine_status_table.put_item(Item={"machineID": "PGP-W1", "building": "PGP", "status": "in-use"})
 
     monkeypatch.setenv("MACHINE_STATUS_TABLE", "MachineStatusTable")
     module = importlib.import_module("aws.functions.fetchMachineStatusFunction")
@@ -36,6 +71,13 @@ def test_fetch_machine_status_returns_items(machine_status_table, monkeypatch):
     assert body["message"] == "Machine status retrieved successfully"
     assert len(body["data"]) == 2
 
+    response = module.lambda_handler({"queryStringParameters": {"building": "PGP"}}, {})
+    assert [m["machineID"] for m in json.loads(response["body"])["data"]] == ["PGP-W1"]
+
+    response = module.lambda_handler({"queryStringParameters": {"format": "columnar"}}, {})
+    assert json.loads(response["body"])["data"] == {
+        "ids": ["RVREB-D1", "RVREB-W1"], "status": ["in-use", "available"], "lastUpdated": [None, None]}
+
 
 def test_post_camera_image_updates_status(machine_status_table):
     machine_status_table.put_item(Item={"machineID": "RVREB-W1", "status": "available"})
@@ -50,8 +92,9 @@ def test_post_camera_image_updates_status(machine_status_table):
 
 
 def test_shuffle_machine_status_cycles_values(machine_status_table):
-    machine_status_table.put_item(Item={"machineID": "RVREB-W1", "status": "available"})
-    machine_status_table.put_item(Item={"machineID": "RVREB-D1", "status": "in-use"})
+    machine_status_table.put_item(Item={"machineID": "RVREB-W1", "building": "RVREB", "status": "available"})
+    machine_status_table.put_item(Item={"machineID": "RVREB-D1", "building": "RVREB", "status": "in-use"})
+    machine_status_table.put_item(Item={"machineID": "PGP-W1", "building": "PGP", "status": "available"})
 
     module = importlib.import_module("aws.functions.shuffle_machine_status")
     response = module.lambda_handler({}, {})
@@ -59,5 +102,326 @@ def test_shuffle_machine_status_cycles_values(machine_status_table):
     assert response["updated_machines"] == 2
     assert machine_status_table.get_item(Key={"machineID": "RVREB-W1"})["Item"]["status"] == "in-use"
     assert machine_status_table.get_item(Key={"machineID": "RVREB-D1"})["Item"]["status"] == "complete"
+    assert machine_status_table.get_item(Key={"machineID": "PGP-W1"})["Item"]["status"] == "available"
+
+
+def test_migration_backfills_registry_attributes(machine_status_table):
+    machine_status_table.put_item(Item={"machineID": "RVREB-W1", "type": "washer", "status": "available"})
+    machine_status_table.put_item(Item={"machineID": "RVREB-D2", "status": "in-use"})
+    machine_status_table.put_item(Item={"machineID": "PGP-D1", "building": "PGP", "device_type": "dryer",
+                                        "camera_id": "pgp-cam"})
+
+    module = importlib.import_module("aws.scripts.migrate_machine_registry")
+    counts = module.migrate(machine_status_table, {"RVREB": "RVREB-cam1"})
+    assert counts == {"updated": 2, "unchanged": 1, "incomplete": 0}
+
+    dryer = machine_status_table.get_item(Key={"machineID": "RVREB-D2"})["Item"]
+    assert (dryer["building"], dryer["device_type"], dryer["camera_id"]) == ("RVREB", "dryer", "RVREB-cam1")
+    building = machine_status_table.query(IndexName="BuildingIndex",
+                                          KeyConditionExpression="building = :b",
+                                          ExpressionAttributeValues={":b": "RVREB"})
+    assert building["Count"] == 2
+    assert module.migrate(machine_status_table, {"RVREB": "RVREB-cam1"})["updated"] == 0
+
+
+def create_rollup_table():
+    boto3.client("dynamodb", region_name="us-east-1").create_table(
+        TableName="MachineUsageRollup",
+        AttributeDefinitions=[
+            {"AttributeName": "machine_id", "AttributeType": "S"},
+            {"AttributeName": "bucket", "AttributeType": "S"},
+        ],
+        KeySchema=[
+            {"AttributeName": "machine_id", "KeyType": "HASH"},
+            {"AttributeName": "bucket", "KeyType": "RANGE"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return boto3.resource("dynamodb", region_name="us-east-1").Table("MachineUsageRollup")
+
+
+def test_state_machine_reads_device_type_from_registry(machine_status_table, monkeypatch, capsys):
+    create_rollup_table()
+    boto3.client("dynamodb", region_name="us-east-1").create_table(
+        TableName="CameraDetectionData",
+        AttributeDefinitions=[
+            {"AttributeName": "machine_id", "AttributeType": "S"},
+            {"AttributeName": "detection_key", "AttributeType": "S"},
+        ],
+        KeySchema=[
+            {"AttributeName": "machine_id", "KeyType": "HASH"},
+            {"AttributeName": "detection_key", "KeyType": "RANGE"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    module = importlib.import_module("aws.functions.updateMachineStateFunction")
+    monkeypatch.setattr(module.log, "event_sample_rate", 0)
+    monkeypatch.setattr(module, "device_type_profiles", {})
+    started = Decimal(str(module.datetime.now().timestamp() - 30 * 60))
+    # Named like a washer, registered as a dryer: 30 minutes is too short for a dryer cycle
+    for machine_id, device_type in (("RVREB-W9", "dryer"), ("RVREB-W1", "washer")):
+        machine_status_table.put_item(Item={"machineID": machine_id, "building": "RVREB", "device_type": device_type,
+                                            "status": "in-use", "lastUpdated": started})
+
+    for machine_id, expected in (("RVREB-W9", "in-use"), ("RVREB-W1", "finishing")):
+        event = {"source": "imu", "data": {"machine_id": machine_id, "is_spinning": 0, "confidence": 0.9}}
+        body = json.loads(module.lambda_handler(event, None)["body"])
+        assert body["new_state"] == expected
+
+    # At the default INFO level only the transition is logged, with the invocation context
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+    assert [(line["level"], line["machine_id"], line["source"]) for line in lines] == [("INFO", "RVREB-W1", "imu")]
+    assert lines[0]["message"] == "State transition: in-use -> finishing"
+
+    # Entering a timed state puts the machine in the deadline index
+    finishing = machine_status_table.get_item(Key={"machineID": "RVREB-W1"})["Item"]
+    assert finishing["timed_state"] == "finishing"
+    assert finishing["deadline"] == int(finishing["lastUpdated"]) + module.FINISHING_SECONDS
+    assert "deadline" not in machine_status_table.get_item(Key={"machineID": "RVREB-W9"})["Item"]
+
+
+def test_camera_detections_are_counted_on_the_machine_item(machine_status_table, monkeypatch):
+    module = importlib.import_module("aws.functions.updateMachineStateFunction")
+    monkeypatch.setattr(module.log, "event_sample_rate", 0)
+    machine_status_table.put_item(Item={"machineID": "RVREB-W1", "building": "RVREB", "status": "available"})
+
+    event = {"source": "camera", "data": {"machine_id": "RVREB-W1", "is_bending": True, "confidence": 0.9}}
+    # One detection is not temporally consistent; a second within 10 seconds is
+    assert json.loads(module.lambda_handler(event, None)["body"])["new_state"] == "available"
+    assert json.loads(module.lambda_handler(event, None)["body"])["new_state"] == "loading"
+
+    # Buckets that leave the window are dropped when a new bucket is opened
+    machine_status_table.put_item(Item={"machineID": "RVREB-D1", "building": "RVREB", "status": "available"})
+    start = 1_700_000_000
+    for offset in (0, 1, 6, 60):
+        machine = module.record_camera_detection(machine_status_table, "RVREB-D1", start + offset)
+    assert module.recent_detection_count(machine, 10, start + 60) == 1
+    assert module.recent_detection_count(machine, 120, start + 60) == 4
+    assert sorted(machine["detection_buckets"].values()) == [1, 1, 2]
+
+    machine = module.record_camera_detection(machine_status_table, "RVREB-D1", start + 300)
+    assert machine["detection_buckets"] == {str((start + 300) // module.DETECTION_BUCKET_SECONDS): 1}
+
+    # The oldest bucket the longest window reads is kept
+    machine = module.record_camera_detection(machine_status_table, "RVREB-D1", start + 420)
+    assert module.recent_detection_count(machine, module.DETECTION_WINDOW_SECONDS, start + 420) == 2
+
+    # Detections for an unknown machine do not create an item
+    assert module.record_camera_detection(machine_status_table, "RVREB-X9", start) == {}
+    assert "Item" not in machine_status_table.get_item(Key={"machineID": "RVREB-X9"})
+
+    # A batch forwarded by processCameraDataFunction counts each detection at its own time:
+    # two that are a minute old are not temporally consistent now, two recent ones are
+    machine_status_table.put_item(Item={"machineID": "RVREB-W2", "building": "RVREB", "status": "available"})
+    now = int(module.datetime.now().timestamp())
+
+    def batch(*seconds):
+        counts = {}
+        for second in seconds:
+            counts[str(second)] = counts.get(str(second), 0) + 1
+        event = {"source": "camera", "data": {"machine_id": "RVREB-W2", "is_bending": True, "confidence": 0.9,
+                                              "detections": counts}}
+        return json.loads(module.lambda_handler(event, None)["body"])["new_state"]
+
+    assert batch(now - 61, now - 60) == "available"
+    assert batch(now - 1, now) == "loading"
+    machine = machine_status_table.get_item(Key={"machineID": "RVREB-W2"})["Item"]
+    assert module.recent_detection_count(machine, 10, now) == 2
+    assert module.recent_detection_count(machine, 120, now) == 4
+
+
+def test_opening_a_bucket_keeps_concurrent_counts_in_other_buckets(machine_status_table):
+    module = importlib.import_module("aws.functions.updateMachineStateFunction")
+    start = 1_700_000_000
+    current = str(start // module.DETECTION_BUCKET_SECONDS)
+    machine_status_table.put_item(Item={"machineID": "RVREB-D1", "detection_buckets": {current: 1}})
+
+    class ConcurrentIncrement:
+        """Another invocation counts a detection in the kept bucket right before the rewrite"""
+
+        def __init__(self, table):
+            self.table = table
+            self.calls = 0
+
+        def update_item(self, **kwargs):
+            self.calls += 1
+            if self.calls == 2:
+                self.table.update_item(
+                    Key={"machineID": "RVREB-D1"}, UpdateExpression="SET #m.#b = #m.#b + :one",
+                    ExpressionAttributeNames={"#m": "detection_buckets", "#b": current},
+                    ExpressionAttributeValues={":one": 1})
+            return self.table.update_item(**kwargs)
+
+    machine = module.record_camera_detection(ConcurrentIncrement(machine_status_table), "RVREB-D1", start + 5)
+    assert machine["detection_buckets"] == {current: 2, str(int(current) + 1): 1}
+
+
+def test_sweeper_applies_only_due_timed_transitions(machine_status_table):
+    module = importlib.import_module("aws.functions.sweepTimedStatesFunction")
+    now = int(module.time.time())
+    machine_status_table.put_item(Item={"machineID": "RVREB-W1", "status": "finishing",
+                                        "timed_state": "finishing", "deadline": now - 10})
+    machine_status_table.put_item(Item={"machineID": "RVREB-W2", "status": "finishing",
+                                        "timed_state": "finishing", "deadline": now + 100})
+    machine_status_table.put_item(Item={"machineID": "RVREB-W3", "status": "in-use"})
+    # Stale index entry: the machine has moved on since it was indexed
+    machine_status_table.put_item(Item={"machineID": "RVREB-W4", "status": "available",
+                                        "timed_state": "finishing", "deadline": now - 10})
+
+    body = json.loads(module.lambda_handler({}, None)["body"])
+
+    assert body == {"transitioned": 1, "skipped": 1}
+    item = machine_status_table.get_item(Key={"machineID": "RVREB-W1"})["Item"]
+    assert item["status"] == "ready-to-unload"
+    assert item["lastSource"] == "timer"
+    assert "timed_state" not in item and "deadline" not in item
+    assert machine_status_table.get_item(Key={"machineID": "RVREB-W2"})["Item"]["status"] == "finishing"
+    stale = machine_status_table.get_item(Key={"machineID": "RVREB-W4"})["Item"]
+    assert stale["status"] == "available" and "deadline" not in stale
+
+
+def test_state_machine_uses_learned_cycle_profiles(machine_status_table, monkeypatch):
+    rollup = create_rollup_table()
+    module = importlib.import_module("aws.functions.updateMachineStateFunction")
+    monkeypatch.setattr(module.log, "event_sample_rate", 0)
+    monkeypatch.setattr(module, "device_type_profiles", {})
+    now = module.datetime.now().timestamp()
+    # A quick-wash machine: a 15 minute cycle is complete, although under the fixed 25 minutes
+    machine_status_table.put_item(Item={
+        "machineID": "RVREB-W1", "device_type": "washer", "status": "in-use",
+        "lastUpdated": Decimal(str(now - 15 * 60)),
+        "cycle_profile": {"p10": 12 * 60, "p50": 14 * 60, "p90": 18 * 60, "samples": 20},
+    })
+    stop = {"source": "imu", "data": {"machine_id": "RVREB-W1", "is_spinning": 0, "confidence": 0.9}}
+    assert json.loads(module.lambda_handler(stop, None)["body"])["new_state"] == "finishing"
+
+    # Without its own profile a machine uses its device type's pooled profile for the ETA
+    rollup.put_item(Item={"machine_id": "__profile__", "bucket": "device#dryer",
+                          "p10": 2400, "p50": 3000, "p90": 3600, "samples": 40})
+    machine_status_table.put_item(Item={"machineID": "RVREB-D1", "device_type": "dryer", "status": "loading"})
+    spin = {"source": "imu", "data": {"machine_id": "RVREB-D1", "is_spinning": 1, "confidence": 0.9}}
+    assert json.loads(module.lambda_handler(spin, None)["body"])["new_state"] == "in-use"
+
+    item = machine_status_table.get_item(Key={"machineID": "RVREB-D1"})["Item"]
+    assert item["expected_completion"] == int(item["lastUpdated"] + 3000)
+    assert item["expected_completion_latest"] == int(item["lastUpdated"] + 3600)
+    assert module.get_min_cycle_time(item, "dryer") == 2400 * module.CYCLE_MARGIN
+    # Cached per container: a changed pooled profile is only seen after PROFILE_CACHE_SECONDS
+    rollup.delete_item(Key={"machine_id": "__profile__", "bucket": "device#dryer"})
+    assert module.get_device_type_profile("dryer")["p50"] == 3000
+    assert module.get_device_type_profile("dryer", now + module.PROFILE_CACHE_SECONDS + 1) is None
+
+    # Leaving in-use clears the ETA
+    machine_status_table.update_item(Key={"machineID": "RVREB-D1"}, UpdateExpression="SET lastUpdated = :t",
+                                      ExpressionAttributeValues={":t": Decimal(str(now - 3000))})
+    module.device_type_profiles.clear()
+    stop["data"]["machine_id"] = "RVREB-D1"
+    assert json.loads(module.lambda_handler(stop, None)["body"])["new_state"] == "finishing"
+    assert "expected_completion" not in machine_status_table.get_item(Key={"machineID": "RVREB-D1"})["Item"]
+
+
+def test_transitions_are_logged_and_queryable(machine_status_table, monkeypatch):
+    create_rollup_table()
+    module = importlib.import_module("aws.functions.updateMachineStateFunction")
+    monkeypatch.setattr(module.log, "event_sample_rate", 0)
+    history = importlib.import_module("aws.functions.queryMachineHistoryFunction")
+    now = module.datetime.now().timestamp()
+    machine_status_table.put_item(Item={"machineID": "RVREB-W1", "device_type": "washer", "status": "loading",
+                                        "lastUpdated": Decimal(str(now - 60))})
+
+    def imu(spinning):
+        event = {"source": "imu", "data": {"machine_id": "RVREB-W1", "is_spinning": spinning, "confidence": 0.9}}
+        return json.loads(module.lambda_handler(event, None)["body"])["new_state"]
+
+    assert imu(1) == "in-use"
+    machine_status_table.update_item(Key={"machineID": "RVREB-W1"}, UpdateExpression="SET lastUpdated = :t",
+                                      ExpressionAttributeValues={":t": Decimal(str(now - 40 * 60))})
+    assert imu(0) == "finishing"
+
+    body = json.loads(history.lambda_handler({"queryStringParameters": {"machine_id": "RVREB-W1"}}, None)["body"])
+    assert [(t["from_state"], t["to_state"], t["source"]) for t in body["transitions"]] == [
+        ("loading", "in-use", "imu"), ("in-use", "finishing", "imu")]
+    assert 40 * 60 - 5 <= body["transitions"][1]["previous_duration"] <= 40 * 60 + 5
+
+    cycle = json.loads(history.lambda_handler(
+        {"queryStringParameters": {"machine_id": "RVREB-W1", "view": "cycle"}}, None)["body"])
+    assert cycle["cycle_start"] == body["transitions"][0]
+    assert cycle["latest"]["to_state"] == "finishing"
+
+    # The sweeper's timed transition is logged too, and unloading ends the cycle
+    sweeper = importlib.import_module("aws.functions.sweepTimedStatesFunction")
+    machine_status_table.update_item(Key={"machineID": "RVREB-W1"}, UpdateExpression="SET deadline = :d",
+                                      ExpressionAttributeValues={":d": int(now) - 1})
+    assert json.loads(sweeper.lambda_handler({}, None)["body"])["transitioned"] == 1
+    module.update_machine_state(machine_status_table, "RVREB-W1", "available", {}, "camera",
+                                machine={"status": "ready-to-unload"})
+    cycle = json.loads(history.lambda_handler(
+        {"queryStringParameters": {"machine_id": "RVREB-W1", "view": "cycle"}}, None)["body"])
+    assert cycle["cycle_start"] is None
+    assert cycle["latest"]["from_state"] == "ready-to-unload"
+
+    empty = history.lambda_handler({"queryStringParameters": {"machine_id": "RVREB-W1", "start": str(now - 7200),
+                                                              "end": str(now - 3600)}}, None)
+    assert json.loads(empty["body"])["transitions"] == []
+    assert history.lambda_handler({"queryStringParameters": {}}, None)["statusCode"] == 400
+
+
+class FakeManagementClient:
+    def __init__(self, gone=(), failing=()):
+        self.gone, self.failing = set(gone), set(failing)
+        self.posted = {}
+
+    def post_to_connection(self, ConnectionId, Data):
+        if ConnectionId in self.gone or ConnectionId in self.failing:
+            code = "GoneException" if ConnectionId in self.gone else "LimitExceededException"
+            raise ClientError({"Error": {"Code": code, "Message": code}}, "PostToConnection")
+        self.posted[ConnectionId] = json.loads(Data)
+
+
+def test_ready_machine_notifies_only_its_subscribers(machine_status_table, monkeypatch):
+    resource = boto3.resource("dynamodb", region_name="us-east-1")
+    boto3.client("dynamodb", region_name="us-east-1").create_table(
+        TableName="MachineSubscriptions",
+        AttributeDefinitions=[
+            {"AttributeName": "machine_id", "AttributeType": "S"},
+            {"AttributeName": "subscriber", "AttributeType": "S"},
+        ],
+        KeySchema=[
+            {"AttributeName": "machine_id", "KeyType": "HASH"},
+            {"AttributeName": "subscriber", "KeyType": "RANGE"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    subscriptions_table = resource.Table("MachineSubscriptions")
+    for machine_id, subscriber in [("RVREB-W1", "conn-a"), ("RVREB-W1", "conn-b"), ("RVREB-W1", "conn-gone"),
+                                   ("RVREB-W1", "conn-flaky"), ("RVREB-W2", "conn-c")]:
+        subscriptions_table.put_item(Item={"machine_id": machine_id, "subscriber": subscriber,
+                                           "subscribed_at": 1, "ttl": 2})
+
+    subscriptions = importlib.import_module("subscriptions")
+    client = FakeManagementClient(gone={"conn-gone"}, failing={"conn-flaky"})
+    monkeypatch.setattr(subscriptions, "WEBSOCKET_ENDPOINT", "https://example.execute-api/production")
+    monkeypatch.setattr(subscriptions, "management_client", client)
+    module = importlib.import_module("aws.functions.updateMachineStateFunction")
+
+    # Not a state anyone waits for
+    module.update_machine_state(machine_status_table, "RVREB-W1", "finishing", {}, "imu", machine={"status": "in-use"})
+    assert client.posted == {}
+
+    module.update_machine_state(machine_status_table, "RVREB-W1", "ready-to-unload", {}, "timer",
+                                machine={"status": "finishing"})
+    assert set(client.posted) == {"conn-a", "conn-b"}
+    assert client.posted["conn-a"]["machine_id"] == "RVREB-W1"
+    assert client.posted["conn-a"]["status"] == "ready-to-unload"
 
+    # Delivered and closed connections are unsubscribed; a failed delivery is kept
+    remaining = subscriptions_table.scan()["Items"]
+    assert sorted((item["machine_id"], item["subscriber"]) for item in remaining) == [
+        ("RVREB-W1", "conn-flaky"), ("RVREB-W2", "conn-c")]
 
+    # A subscription renewed after it was read is not removed
+    renewed = {"subscriber": "conn-flaky", "subscribed_at": Decimal(1)}
+    subscriptions_table.put_item(Item={"machine_id": "RVREB-W1", "subscriber": "conn-flaky",
+                                       "subscribed_at": 5, "ttl": 6})
+    subscriptions.remove_subscription("RVREB-W1", renewed)
+    assert "Item" in subscriptions_table.get_item(Key={"machine_id": "RVREB-W1", "subscriber": "conn-flaky"})
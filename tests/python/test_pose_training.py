@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+import model_registry
+from pose_dataset import head_features, load_dataset
+
+
+def _keypoints(head_index, x, y):
+    keypoints = [0.0] * 51
+    keypoints[head_index * 3:head_index * 3 + 3] = [x, y, 0.9]
+    return keypoints
+
+
+def test_head_features_uses_first_confident_head_keypoint():
+    rows = np.array([
+        _keypoints(0, 10.0, 20.0),
+        _keypoints(3, 30.0, 40.0),
+        [0.0] * 51,
+    ])
+
+    features = head_features(rows)
+
+    assert features[0].tolist() == [10.0, 20.0]
+    assert features[1].tolist() == [30.0, 40.0]
+    assert np.isnan(features[2]).all()
+
+
+def test_load_dataset_streams_json_and_jsonl(tmp_path):
+    (tmp_path / "heads.jsonl").write_text(
+        "\n".join(json.dumps({"head": [float(i), 1.0], "label": i % 2}) for i in range(5))
+    )
+    (tmp_path / "poses.json").write_text(json.dumps([
+        {"pose_keypoints_2d": _keypoints(1, 7.0, 8.0), "label": 2},
+        {"pose_keypoints_2d": [0.0] * 51, "label": 2},
+        {"pose_keypoints_2d": _keypoints(0, 1.0, 2.0)},
+    ]))
+
+    X, y = load_dataset([str(tmp_path)], chunk_size=2)
+
+    assert X.shape == (6, 2)
+    assert sorted(y.tolist()) == [0, 0, 0, 1, 1, 2]
+    assert [7.0, 8.0] in X.tolist()
+
+
+def test_training_rejects_a_class_with_one_sample(tmp_path, capsys):
+    from train_model import main
+
+    (tmp_path / "heads.jsonl").write_text(
+        "\n".join(json.dumps({"head": [float(i), 1.0], "label": 0 if i < 4 else 1}) for i in range(5))
+    )
+
+    assert main([str(tmp_path), "--registry", str(tmp_path / "models")]) == 1
+    assert "class 1 has only 1 sample" in capsys.readouterr().out
+    assert not (tmp_path / "models").exists()
+
+
+def test_registry_versions_promote_and_verify_hash(tmp_path):
+    X = np.array([[0.0, 0.0], [1.0, 1.0]])
+    model = DecisionTreeClassifier(random_state=0).fit(X, [0, 1])
+
+    v1 = model_registry.save_model(model, "head", {"metrics": {"accuracy_mean": 0.5}}, str(tmp_path))
+    v2 = model_registry.save_model(model, "head", {"metrics": {"accuracy_mean": 0.9}}, str(tmp_path))
+    assert (v1, v2) == ("v0001", "v0002")
+
+    model_registry.promote("head", v1, str(tmp_path))
+    loaded, metadata = model_registry.load_model("head", registry_dir=str(tmp_path))
+    assert metadata["version"] == v1
+    assert loaded.predict(X).tolist() == [0, 1]
+    assert model_registry.load_metadata("head", "latest", str(tmp_path))["version"] == v2
+
+    with open(tmp_path / "head" / v2 / model_registry.MODEL_FILENAME, "ab") as f:
+        f.write(b"tampered")
+    with pytest.raises(ValueError):
+        model_registry.load_model("head", v2, str(tmp_path))
+
+    with pytest.raises(model_registry.ModelNotFoundError):
+        model_registry.load_model("missing", registry_dir=str(tmp_path))
+
+
+def test_get_predictions_matches_per_frame_get_prediction():
+    from CS3237_camera_model_3 import get_prediction, get_predictions
+
+    rng = np.random.default_rng(0)
+    keypoints = rng.random((200, 51), dtype=np.float32)
+    keypoints[:, 0::3] *= 800
+    keypoints[:, 1::3] *= 800
+
+    batched = get_predictions(keypoints)
+    single = np.array([get_prediction(row.tolist())[0] for row in keypoints])
+
+    np.testing.assert_array_equal(batched, single)
@@ -0,0 +1,131 @@
+import importlib
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+
+class RecordingLambda:
+    def __init__(self):
+        self.invocations = []
+        self.failing = False
+
+    def invoke(self, **kwargs):
+        if self.failing:
+            raise RuntimeError("invoke failed")
+        self.invocations.append(kwargs)
+        return {"StatusCode": 202}
+
+
+@pytest.fixture
+def camera_data(monkeypatch):
+    with mock_aws():
+        dynamodb = boto3.client("dynamodb", region_name="us-east-1")
+        dynamodb.create_table(
+            TableName="CameraDetectionData",
+            AttributeDefinitions=[
+                {"AttributeName": "machine_id", "AttributeType": "S"},
+                {"AttributeName": "detection_key", "AttributeType": "S"},
+            ],
+            KeySchema=[
+                {"AttributeName": "machine_id", "KeyType": "HASH"},
+                {"AttributeName": "detection_key", "KeyType": "RANGE"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        module = importlib.reload(importlib.import_module("aws.functions.processCameraDataFunction"))
+        recorder = RecordingLambda()
+        monkeypatch.setattr(module, "lambda_client", recorder)
+        yield module, boto3.resource("dynamodb", region_name="us-east-1").Table("CameraDetectionData"), recorder
+
+
+def detection(ts, machine_id="RVREB-W1", is_bending=False, confidence=0.6):
+    return {"machine_id": machine_id, "timestamp": ts, "device_type": "washer", "event_type": "person_detected",
+            "is_bending": is_bending, "confidence": confidence, "sensor_type": "camera"}
+
+
+def test_batch_is_stored_with_ttl_and_forwarded_once_per_machine(camera_data):
+    module, table, recorder = camera_data
+    start = 1_700_000_000.25
+    response = module.lambda_handler({"camera_id": "cam-1", "detections": [
+        detection(start), detection(start + 1, is_bending=True, confidence=0.9), detection(start + 2),
+        detection(start, machine_id="RVREB-D1"),
+    ]}, None)
+
+    body = json.loads(response["body"])
+    assert (body["forwarded"], body["duplicates"], body["machines_forwarded"]) == (4, 0, 2)
+    items = table.scan()["Items"]
+    assert len(items) == 4
+    assert all(item["camera_id"] == "cam-1" for item in items)
+    assert all(item["ttl"] > start + 6 * 86400 for item in items)
+
+    payloads = {p["data"]["machine_id"]: p for p in (json.loads(i["Payload"]) for i in recorder.invocations)}
+    assert len(recorder.invocations) == 2
+    washer = payloads["RVREB-W1"]
+    assert washer["source"] == "camera"
+    # The bending detection decides the state; each detection is counted at its own second
+    assert washer["data"]["is_bending"] is True
+    assert washer["data"]["timestamp"] == start + 1
+    assert washer["data"]["detections"] == {"1700000000": 1, "1700000001": 1, "1700000002": 1}
+    assert payloads["RVREB-D1"]["data"]["detections"] == {"1700000000": 1}
+
+
+def test_redelivered_detections_are_neither_stored_nor_forwarded_twice(camera_data):
+    module, table, recorder = camera_data
+    start = 1_700_000_000
+    module.lambda_handler(detection(start), None)
+
+    # The same message twice in a batch, plus one already delivered earlier
+    response = module.lambda_handler([detection(start + 5), detection(start + 5), detection(start)], None)
+    body = json.loads(response["body"])
+    assert (body["detections"], body["forwarded"], body["duplicates"]) == (3, 1, 2)
+    assert len(table.scan()["Items"]) == 2
+    assert json.loads(recorder.invocations[-1]["Payload"])["data"]["detections"] == {str(start + 5): 1}
+
+    # Nothing new: nothing forwarded
+    module.lambda_handler({"body": json.dumps(detection(start + 5))}, None)
+    assert len(recorder.invocations) == 2
+
+
+def test_detections_not_forwarded_are_forwarded_on_redelivery(camera_data):
+    module, table, recorder = camera_data
+    start = 1_700_000_000
+    batch = [detection(start), detection(start + 1)]
+    recorder.failing = True
+    assert module.lambda_handler(batch, None)["statusCode"] == 500
+    # Stored only once forwarded
+    assert table.scan()["Items"] == []
+
+    recorder.failing = False
+    body = json.loads(module.lambda_handler(batch, None)["body"])
+    assert (body["forwarded"], body["duplicates"]) == (2, 0)
+    assert json.loads(recorder.invocations[0]["Payload"])["data"]["detections"] == {
+        str(start): 1, str(start + 1): 1}
+    assert len(table.scan()["Items"]) == 2
+
+
+def test_cameras_reporting_the_same_moment_are_kept_apart(camera_data):
+    module, table, recorder = camera_data
+    start = 1_700_000_000.5
+    body = json.loads(module.lambda_handler([{**detection(start), "camera_id": "cam-1"},
+                                             {**detection(start), "camera_id": "cam-2"}], None)["body"])
+    assert (body["forwarded"], body["duplicates"]) == (2, 0)
+    assert sorted(item["camera_id"] for item in table.scan()["Items"]) == ["cam-1", "cam-2"]
+    assert json.loads(recorder.invocations[0]["Payload"])["data"]["detections"] == {"1700000000": 2}
+
+
+def test_frames_within_a_second_are_distinct_detections(camera_data):
+    module, table, recorder = camera_data
+    # The edge's 0.5 s tracking cadence: two frames of one camera in the same second
+    body = json.loads(module.lambda_handler([{**detection(1_700_000_000.0), "camera_id": "room"},
+                                             {**detection(1_700_000_000.5), "camera_id": "room"}], None)["body"])
+    assert (body["forwarded"], body["duplicates"]) == (2, 0)
+    assert len(table.scan()["Items"]) == 2
+    assert json.loads(recorder.invocations[0]["Payload"])["data"]["detections"] == {"1700000000": 2}
+
+
+def test_rejects_batches_without_machine_ids(camera_data):
+    module, _, recorder = camera_data
+    assert module.lambda_handler({"detections": [{"confidence": 0.9}]}, None)["statusCode"] == 400
+    assert recorder.invocations == []
@@ -0,0 +1,105 @@
+import importlib
+from types import SimpleNamespace
+
+import boto3
+import profiling
+import pytest
+from moto import mock_aws
+
+CONTEXT = SimpleNamespace(function_name="updateMachineStateFunction", aws_request_id="req-1")
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setenv("LAMBDA_PROFILE", "1")
+    monkeypatch.setenv("LAMBDA_PROFILE_CAPTURE", "cprofile")
+    with mock_aws():
+        module = importlib.reload(profiling)
+        writer = module.LocalWriter()
+        module.set_writer(writer)
+        client = boto3.client("dynamodb", region_name="us-east-1")
+        client.create_table(
+            TableName="MachineStatusTable",
+            AttributeDefinitions=[{"AttributeName": "machineID", "AttributeType": "S"}],
+            KeySchema=[{"AttributeName": "machineID", "KeyType": "HASH"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield module, writer, client
+        module.uninstall_hooks()
+    monkeypatch.delenv("LAMBDA_PROFILE")
+    monkeypatch.delenv("LAMBDA_PROFILE_CAPTURE")
+    importlib.reload(profiling)
+
+
+def test_disabled_profiling_returns_handler_unchanged():
+    def handler(event, context):
+        return event
+
+    assert not profiling.ENABLED
+    assert profiling.profiled(handler) is handler
+
+
+def test_records_emf_metrics_and_consumed_capacity(enabled):
+    module, writer, client = enabled
+
+    @module.profiled
+    def handler(event, context):
+        client.put_item(TableName="MachineStatusTable", Item={"machineID": {"S": "RVREB-W1"}})
+        client.get_item(TableName="MachineStatusTable", Key={"machineID": {"S": "RVREB-W1"}})
+        return {"statusCode": 200}
+
+    assert handler({}, CONTEXT) == {"statusCode": 200}
+    handler({}, CONTEXT)
+
+    cold, warm = writer.records
+    assert cold["ColdStart"] and "InitDuration" in cold
+    # Counted from process start, not from when profiling.py was imported
+    assert cold["InitDuration"] >= module._AGE_AT_LOAD * 1000 > 0
+    assert not warm["ColdStart"] and "InitDuration" not in warm
+    assert warm["FunctionName"] == "updateMachineStateFunction"
+    assert warm["RequestId"] == "req-1"
+    assert warm["DynamoDBCalls"] == 2
+    assert warm["ConsumedCapacity"] > 0
+    assert set(warm["CapacityByTable"]) == {"MachineStatusTable"}
+    metric_names = {m["Name"] for m in warm["_aws"]["CloudWatchMetrics"][0]["Metrics"]}
+    assert metric_names == {"HandlerDuration", "DynamoDBCalls", "ConsumedCapacity"}
+    # Calls outside a sampled invocation are left alone
+    assert "ConsumedCapacity" not in client.get_item(TableName="MachineStatusTable", Key={"machineID": {"S": "x"}})
+
+
+def test_process_age_counts_from_process_start():
+    age = profiling.process_age()
+    assert age is not None and 0 < age < 24 * 3600
+
+
+def test_errors_are_recorded_and_reraised(enabled):
+    module, writer, _ = enabled
+
+    @module.profiled
+    def handler(event, context):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        handler({}, CONTEXT)
+    assert writer.records[-1]["Error"] is True
+
+
+def test_profile_captured_only_for_slow_invocations(enabled):
+    module, writer, _ = enabled
+
+    @module.profiled
+    def handler(event, context):
+        return sum(range(1000))
+
+    handler({}, CONTEXT)
+    assert "Profile" not in writer.records[-1]
+
+    # Slower than the 95th percentile of the container's recent invocations
+    module._durations.extend([0.0] * module.MIN_HISTORY)
+    handler({}, CONTEXT)
+    assert any("handler" in entry["function"] for entry in writer.records[-1]["Profile"])
+
+    module._durations.clear()
+    module._durations.extend([60_000.0] * module.MIN_HISTORY)
+    handler({}, CONTEXT)
+    assert "Profile" not in writer.records[-1]
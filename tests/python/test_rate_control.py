@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+from edge_metrics import MetricsRegistry
+from edge_receiver import EdgeReceiver
+from img_receiver_aws import InMemoryPublisher
+from rate_control import RateController
+from simulated_camera import SimulatedCamera
+
+
+class NoDetectionProcessor:
+    metrics = MetricsRegistry()
+    publisher = InMemoryPublisher()
+
+    def handle_frame(self, frame):
+        return None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_tracking_speeds_up_and_idle_slows_down():
+    clock = FakeClock()
+    camera = SimulatedCamera("room", interval=5.0)
+    controller = RateController(lambda topic, payload: camera.apply_control(payload), clock=clock)
+
+    controller.frame_queued("room")
+    controller.frame_done("room", service_time=0.1, detected=True)
+    assert camera.interval == 0.5
+    assert camera.hints[-1][1]["mode"] == "tracking"
+
+    clock.now += 31
+    controller.tick()
+    assert camera.interval == 5.0
+    assert camera.hints[-1][1]["mode"] == "idle"
+
+
+def test_interval_backs_off_when_processor_falls_behind():
+    sent = []
+    controller = RateController(lambda topic, payload: sent.append((topic, json.loads(payload))),
+                                clock=FakeClock())
+    for _ in range(3):
+        controller.frame_queued("room")
+    controller.frame_done("room", service_time=2.0, detected=True)
+
+    # Two frames still queued behind a 2 s frame: ask for one every 6 s
+    topic, message = sent[-1]
+    assert topic == "/cam/room/control"
+    assert message["interval_ms"] == 6000
+
+
+def test_interval_is_shared_across_workers():
+    sent = []
+    controller = RateController(lambda topic, payload: sent.append(json.loads(payload)), workers=2,
+                                clock=FakeClock())
+    for _ in range(3):
+        controller.frame_queued("room")
+    controller.frame_done("room", service_time=2.0, detected=True)
+
+    # Two workers drain the 2 s frames twice as fast
+    assert sent[-1]["interval_ms"] == 3000
+
+
+def test_small_changes_are_not_resent():
+    sent = []
+    controller = RateController(lambda topic, payload: sent.append(payload), clock=FakeClock())
+    controller.frame_done("room", service_time=0.1, detected=False)
+    controller.frame_done("room", service_time=0.2, detected=False)
+    assert len(sent) == 1
+
+
+def test_receiver_sends_hints_for_processed_frames():
+    receiver = EdgeReceiver(NoDetectionProcessor(), rate_control=True)
+    camera = SimulatedCamera("room")
+    receiver.rate_controller.publish = lambda topic, payload: camera.apply_control(payload)
+
+    async def scenario():
+        receiver.start_consumers()
+        receiver.dispatch("/cam/room", b"jpg")
+        await receiver.drain()
+
+    asyncio.run(scenario())
+
+    # No detection, so the camera stays on the idle cadence
+    assert camera.hints[0][1]["mode"] == "idle"
+    assert receiver.rate_controller.cameras["room"].queued == 0
@@ -0,0 +1,87 @@
+import io
+import tarfile
+import time
+
+import numpy as np
+
+import img_receiver_aws
+import keypoint_store
+from frame_sources import ArchiveFrameSource, Frame, KeypointStoreFrameSource
+from replay import parse_speed, replay
+
+
+def _bending_at_washer():
+    keypoints = np.zeros(keypoint_store.KEYPOINT_VALUES, dtype=np.float32)
+    keypoints[0:3] = [711.0, 623.5, 0.9]  # nose in the washer region
+    keypoints[15:18] = [0.0, 0.0, 0.9]  # left shoulder
+    keypoints[33:36] = [0.0, 100.0, 0.9]  # left hip
+    keypoints[39:42] = [100.0, 100.0, 0.9]  # left knee
+    return keypoints
+
+
+def test_replay_keypoint_store_reports_events_and_stages(tmp_path):
+    with keypoint_store.KeypointStoreWriter(str(tmp_path)) as writer:
+        for i in range(4):
+            writer.append(_bending_at_washer(), 1700000000.0 + i, "room")
+        writer.append(np.zeros(keypoint_store.KEYPOINT_VALUES), 1700000004.0, "room")
+
+    report = replay(KeypointStoreFrameSource(str(tmp_path)))
+
+    assert report["frames"] == 5
+    assert report["events"] == 4
+    assert report["events_by_machine"] == {"RVREB-W1": 4}
+    assert report["bending_events"] == 4
+    assert report["stages"]["classify"]["count"] == 5
+    assert report["stages"]["publish"]["count"] == 4
+    # Temporal consistency uses the recorded timestamps, not wall-clock time
+    assert [e["temporal_detections"] for e in report["detections"]] == [1, 2, 3, 4]
+    assert report["detections"][0]["timestamp"] == 1700000000
+
+
+def test_archive_source_orders_by_filename_timestamp(tmp_path):
+    archive_path = tmp_path / "frames.tar"
+    with tarfile.open(archive_path, "w") as archive:
+        for name in ["20241113-104955.jpg", "20241113-104952.jpg", "notes.txt"]:
+            info = tarfile.TarInfo(name)
+            info.size = 3
+            archive.addfile(info, io.BytesIO(b"jpg"))
+
+    delivered = []
+    ArchiveFrameSource(str(archive_path)).run(delivered.append)
+
+    assert [f.name for f in delivered] == ["20241113-104952.jpg", "20241113-104955.jpg"]
+    assert delivered[1].timestamp - delivered[0].timestamp == 3
+
+
+def test_paced_source_honours_speed_factor():
+    class ListSource(KeypointStoreFrameSource):
+        def frames(self):
+            for ts in (0.0, 1.0, 2.0):
+                yield Frame("/cam/room", b"", ts)
+
+    delivered_at = []
+    source = ListSource("unused", speed=parse_speed("10x"))
+    source.run(lambda frame: delivered_at.append(time.monotonic()))
+
+    # One second apart in the recording, a tenth of a second apart at 10x
+    gaps = [later - earlier for earlier, later in zip(delivered_at, delivered_at[1:])]
+    assert len(gaps) == 2
+    assert all(0.09 <= gap < 0.5 for gap in gaps)
+    assert parse_speed("max") is None
+    assert parse_speed("realtime") == 1.0
+
+
+def test_saved_frames_within_a_second_get_distinct_names(tmp_path, monkeypatch):
+    monkeypatch.setattr(img_receiver_aws, "IMAGE_INPUT_FOLDER", str(tmp_path))
+    processor = img_receiver_aws.CameraDataProcessor(publisher=img_receiver_aws.InMemoryPublisher(), threaded=False)
+
+    names = [
+        processor.save_image(Frame("/cam/room", b"jpg", 1700000000.25)),
+        processor.save_image(Frame("/cam/room", b"jpg", 1700000000.25)),
+        processor.save_image(Frame("/cam/hall", b"jpg", 1700000000.5)),
+    ]
+
+    assert len(set(names)) == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(names)
+    assert "-hall-" in names[2] and names[2].count(".") == 1
+    assert keypoint_store.timestamp_from_filename(names[2]) == 1700000000.5
@@ -0,0 +1,50 @@
+import base64
+import gzip
+import json
+from decimal import Decimal
+
+import serialization
+from boto3.dynamodb.types import TypeSerializer
+
+
+def test_from_item_matches_boto3_types_as_native_values():
+    item = {"machineID": "RVREB-W1", "lastUpdated": Decimal("1700000000.5"), "count": Decimal(3),
+            "online": True, "position": {"x": Decimal(20), "y": Decimal(35)}, "tags": ["a", None],
+            "ids": {"a", "b"}}
+    low_level = {k: TypeSerializer().serialize(v) for k, v in item.items()}
+
+    native = serialization.from_item(low_level)
+    assert native == {"machineID": "RVREB-W1", "lastUpdated": 1700000000.5, "count": 3, "online": True,
+                      "position": {"x": 20, "y": 35}, "tags": ["a", None], "ids": {"a", "b"}}
+    assert type(native["count"]) is int
+
+
+def test_dumps_is_compact_with_or_without_orjson(monkeypatch):
+    payload = {"a": [1, 2.5], "b": Decimal(2), "c": {"y", "x"}}
+    expected = '{"a":[1,2.5],"b":2,"c":["x","y"]}'
+    assert serialization.dumps(payload) == expected
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert serialization.dumps(payload) == expected
+
+
+def test_columnar_shape_aligns_missing_values():
+    items = [{"machineID": "W1", "status": "available", "lastUpdated": 1},
+             {"machineID": "W2", "status": "in-use"}]
+    assert serialization.to_columnar(items) == {
+        "ids": ["W1", "W2"], "status": ["available", "in-use"], "lastUpdated": [1, None]}
+
+
+def test_http_response_gzips_large_bodies_when_accepted():
+    body = {"data": ["x" * 10] * 200}
+    plain = serialization.http_response(200, body, {"headers": {}})
+    assert json.loads(plain["body"]) == body
+
+    compressed = serialization.http_response(200, body, {"headers": {"Accept-Encoding": "gzip, br"}})
+    assert compressed["isBase64Encoded"] is True
+    assert compressed["headers"]["Content-Encoding"] == "gzip"
+    raw = gzip.decompress(base64.b64decode(compressed["body"]))
+    assert json.loads(raw) == body
+    assert len(compressed["body"]) < len(plain["body"]) / 4
+
+    small = serialization.http_response(200, {"ok": 1}, {"headers": {"accept-encoding": "gzip"}})
+    assert "isBase64Encoded" not in small
@@ -0,0 +1,180 @@
+import importlib
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+
+class RecordingLambda:
+    def __init__(self):
+        self.invocations = []
+
+    def invoke(self, **kwargs):
+        self.invocations.append(kwargs)
+        return {"StatusCode": 202}
+
+
+@pytest.fixture
+def store_data(monkeypatch):
+    with mock_aws():
+        dynamodb = boto3.client("dynamodb", region_name="us-east-1")
+        dynamodb.create_table(
+            TableName="VibrationData",
+            AttributeDefinitions=[
+                {"AttributeName": "timestamp_value", "AttributeType": "S"},
+                {"AttributeName": "machine_id", "AttributeType": "S"},
+            ],
+            KeySchema=[
+                {"AttributeName": "timestamp_value", "KeyType": "HASH"},
+                {"AttributeName": "machine_id", "KeyType": "RANGE"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        module = importlib.reload(importlib.import_module("aws.functions.storeDataFunction"))
+        recorder = RecordingLambda()
+        monkeypatch.setattr(module, "lambda_client", recorder)
+        yield module, boto3.resource("dynamodb", region_name="us-east-1").Table("VibrationData"), recorder
+
+
+def reading(ts, is_spinning, acc_magn, machine_id="RVREB-W1"):
+    return {"machine_id": machine_id, "device_type": "washer", "is_spinning": is_spinning,
+            "confidence": 0.9, "acc_magn": acc_magn, "timestamp": ts * 1000}
+
+
+def test_closed_windows_are_written_as_one_aggregate_row(store_data, monkeypatch):
+    module, table, _ = store_data
+    start = 1_700_000_040  # window boundary
+    monkeypatch.setattr(module.time, "time", lambda: start + 30)
+    module.lambda_handler({"readings": [reading(start + i, 1, m) for i, m in enumerate((1.0, 2.0, 3.0))]}, None)
+    assert table.scan()["Items"] == []
+
+    # A later batch closes the first window
+    monkeypatch.setattr(module.time, "time", lambda: start + 200)
+    response = module.lambda_handler([reading(start + 10, 0, 6.0), reading(start + 190, 0, 1.0)], None)
+    assert json.loads(response["body"])["windows_written"] == 1
+
+    item = table.get_item(Key={"timestamp_value": "2023-11-14T22:14:00Z", "machine_id": "RVREB-W1"})["Item"]
+    assert item["reading_count"] == 4
+    # Means and ratios are derived from the stored totals
+    mean = float(item["magnitude_sum"]) / float(item["magnitude_count"])
+    assert mean == 3.0
+    assert float(item["magnitude_sumsq"]) / float(item["magnitude_count"]) - mean ** 2 == pytest.approx(3.5)
+    assert float(item["magnitude_peak"]) == 6.0
+    assert float(item["spin_count"]) / int(item["reading_count"]) == 0.75
+
+
+def test_late_readings_merge_with_written_window(store_data, monkeypatch):
+    module, table, _ = store_data
+    start = 1_700_000_040
+    monkeypatch.setattr(module.time, "time", lambda: start + 200)
+    module.lambda_handler(reading(start + 1, 0, 2.0), None)
+    module.lambda_handler({"machine_id": "RVREB-W1", "ax": 3, "ay": 4, "az": 0,
+                           "is_spinning": 0, "timestamp": (start + 2) * 1000}, None)
+
+    item = table.get_item(Key={"timestamp_value": "2023-11-14T22:14:00Z", "machine_id": "RVREB-W1"})["Item"]
+    assert item["reading_count"] == 2
+    assert float(item["magnitude_sum"]) / float(item["magnitude_count"]) == 3.5
+    assert float(item["magnitude_peak"]) == 5.0
+    assert item["device_type"] == "washer"
+
+
+def test_containers_flushing_the_same_window_both_count(store_data):
+    module, table, _ = store_data
+    start = 1_700_000_040
+    # Two containers' totals for one window, written in either order
+    first = {"reading_count": 3, "spin_count": 3, "confidence_sum": 2.7, "magnitude_count": 3,
+             "magnitude_sum": 6.0, "magnitude_sumsq": 14.0, "magnitude_peak": 3.0}
+    second = {"reading_count": 2, "spin_count": 0, "confidence_sum": 1.8, "magnitude_count": 2,
+              "magnitude_sum": 3.0, "magnitude_sumsq": 5.0, "magnitude_peak": 2.0}
+    module.write_window(table, "RVREB-W1", start, first, "washer")
+    module.write_window(table, "RVREB-W1", start, second)
+
+    item = table.get_item(Key={"timestamp_value": "2023-11-14T22:14:00Z", "machine_id": "RVREB-W1"})["Item"]
+    assert item["reading_count"] == 5
+    assert float(item["spin_count"]) == 3
+    assert float(item["magnitude_sum"]) == 9.0
+    assert float(item["magnitude_peak"]) == 3.0
+    assert item["device_type"] == "washer"
+
+
+class FailingAfter:
+    """Table whose update_item fails after the first n calls"""
+
+    def __init__(self, table, n):
+        self.table = table
+        self.calls = n
+
+    def update_item(self, **kwargs):
+        if self.calls == 0:
+            raise RuntimeError("throttled")
+        self.calls -= 1
+        return self.table.update_item(**kwargs)
+
+
+def test_a_failed_flush_does_not_add_written_windows_twice(store_data, monkeypatch):
+    module, table, recorder = store_data
+    start = 1_700_000_040
+    monkeypatch.setattr(module.time, "time", lambda: start + 30)
+    module.lambda_handler([reading(start, 1, 1.0, "RVREB-W1"), reading(start, 1, 1.0, "RVREB-W2")], None)
+
+    # The first window's totals (and its peak) are written, the second window's are not
+    monkeypatch.setattr(module.dynamodb, "Table", lambda name: FailingAfter(table, 2))
+    monkeypatch.setattr(module.time, "time", lambda: start + 200)
+    response = module.lambda_handler(reading(start + 190, 0, 1.0), None)
+    assert response["statusCode"] == 500
+    # Still forwarded although the write failed
+    assert json.loads(recorder.invocations[-1]["Payload"])["data"]["is_spinning"] == 0
+
+    monkeypatch.setattr(module.dynamodb, "Table", lambda name: table)
+    module.lambda_handler(reading(start + 200, 0, 1.0), None)
+    counts = {item["machine_id"]: item["reading_count"] for item in table.scan()["Items"]
+              if item["timestamp_value"] == "2023-11-14T22:14:00Z"}
+    assert counts == {"RVREB-W1": 1, "RVREB-W2": 1}
+
+
+def test_only_spin_changes_are_forwarded(store_data, monkeypatch):
+    module, _, recorder = store_data
+    monkeypatch.setattr(module.time, "time", lambda: 1_700_000_100)
+    module.lambda_handler({"readings": [reading(1_700_000_090 + i, s, 1.0) for i, s in enumerate((1, 1, 0, 0))]},
+                          None)
+
+    payloads = [json.loads(call["Payload"]) for call in recorder.invocations]
+    assert [p["data"]["is_spinning"] for p in payloads] == [1, 0]
+    assert all(p["source"] == "imu" and call["InvocationType"] == "Event"
+               for p, call in zip(payloads, recorder.invocations))
+
+
+def test_uptime_timestamps_fall_back_to_arrival_time(store_data):
+    module, _, _ = store_data
+    assert module.normalise_timestamp(123456, 1_700_000_000.0) == 1_700_000_000.0
+    assert module.normalise_timestamp(1_700_000_005_000, 1_700_000_000.0) == 1_700_000_005.0
+
+
+def test_rejects_events_without_machine_id(store_data):
+    module, _, _ = store_data
+    assert module.lambda_handler({"readings": [{"acc_magn": 1.0}]}, None)["statusCode"] == 400
+
+
+def test_low_confidence_readings_do_not_hold_back_a_stop(store_data, monkeypatch):
+    module, _, recorder = store_data
+    start = 1_700_000_000
+    monkeypatch.setattr(module.time, "time", lambda: start)
+    module.lambda_handler(reading(start, 1, 1.0), None)
+    # Ignored by the state machine, so not forwarded
+    module.lambda_handler({**reading(start + 1, 0, 1.0), "confidence": 0.3}, None)
+    module.lambda_handler(reading(start + 2, 0, 1.0), None)
+    assert [json.loads(call["Payload"])["data"]["confidence"] for call in recorder.invocations] == [0.9, 0.9]
+
+    # A stop that the state machine may have rejected ("cycle too short") is retried soon
+    monkeypatch.setattr(module.time, "time", lambda: start + 40)
+    module.lambda_handler(reading(start + 40, 0, 1.0), None)
+    assert len(recorder.invocations) == 3
+
+    # Long after the machine last spun, the normal heartbeat applies
+    later = start + module.RECENT_SPIN_SECONDS + 100
+    monkeypatch.setattr(module.time, "time", lambda: later)
+    module.lambda_handler(reading(later, 0, 1.0), None)
+    monkeypatch.setattr(module.time, "time", lambda: later + 40)
+    module.lambda_handler(reading(later + 40, 0, 1.0), None)
+    assert len(recorder.invocations) == 4
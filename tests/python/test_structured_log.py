@@ -0,0 +1,53 @@
+import json
+from types import SimpleNamespace
+
+from structured_log import DEBUG, Logger
+
+
+class Unformattable:
+    def __str__(self):
+        raise AssertionError("formatted although the level is disabled")
+
+
+def make_logger(**kwargs):
+    lines = []
+    return Logger(writer=lines.append, **kwargs), lines
+
+
+def test_records_carry_invocation_context_and_fields():
+    log, lines = make_logger(level="INFO", event_sample_rate=0)
+    log.start(SimpleNamespace(aws_request_id="req-1"), machine_id="RVREB-W1", source="imu")
+    log.info("State transition: %s -> %s", "in-use", "finishing", cycle_duration=1900)
+
+    assert json.loads(lines[0]) == {
+        "level": "INFO", "message": "State transition: in-use -> finishing", "request_id": "req-1",
+        "machine_id": "RVREB-W1", "source": "imu", "cycle_duration": 1900,
+    }
+
+    log.start(None, source="camera")
+    log.error("boom")
+    assert json.loads(lines[1]) == {"level": "ERROR", "message": "boom", "request_id": None, "source": "camera"}
+
+
+def test_disabled_levels_are_not_formatted():
+    log, lines = make_logger(level="WARNING", event_sample_rate=0)
+    log.debug("value %s", Unformattable())
+    log.info("value %s", Unformattable())
+    log.warning("kept")
+
+    assert [json.loads(line)["message"] for line in lines] == ["kept"]
+    assert not log.enabled(DEBUG)
+
+
+def test_event_dumps_are_sampled():
+    log, lines = make_logger(level="INFO", event_sample_rate=0)
+    log.event({"source": "imu"})
+    assert lines == []
+
+    log.event_sample_rate = 1
+    log.event({"source": "imu"})
+    assert json.loads(lines[0])["event"] == {"source": "imu"}
+
+    debug_log, debug_lines = make_logger(level="DEBUG", event_sample_rate=0)
+    debug_log.event({"source": "camera"})
+    assert len(debug_lines) == 1
@@ -0,0 +1,99 @@
+import importlib
+import json
+import os
+from decimal import Decimal
+
+import boto3
+import model_registry
+import numpy as np
+import pytest
+import tree_arrays
+from moto import mock_aws
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+
+def training_data(n_features=6, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 640, size=(300, n_features)).astype(np.float32)
+    y = np.where(X[:, 0] + X[:, 1] > 640, 'bending', 'standing')
+    y[X[:, 2] < 100] = 'squatting'
+    return X, y
+
+
+@pytest.mark.parametrize("model", [
+    DecisionTreeClassifier(max_depth=6, random_state=0),
+    RandomForestClassifier(n_estimators=8, max_depth=5, random_state=0),
+])
+def test_exported_arrays_match_sklearn(model, tmp_path):
+    X, y = training_data()
+    model.fit(X, y)
+    path = tmp_path / "model.npz"
+    tree_arrays.export(model, path)
+
+    with np.load(path) as arrays:
+        predicted = tree_arrays.predict(arrays, X)
+
+    assert list(predicted) == list(model.predict(X))
+
+
+def test_registry_exports_tree_arrays(tmp_path):
+    X, y = training_data()
+    model = DecisionTreeClassifier(max_depth=4, random_state=0).fit(X, y)
+
+    version = model_registry.save_model(model, "pose", {}, str(tmp_path))
+    metadata = model_registry.load_metadata("pose", version, str(tmp_path))
+
+    arrays_path = tmp_path / "pose" / version / tree_arrays.ARRAYS_FILENAME
+    assert metadata["tree_arrays"]["sha256"] == model_registry.file_sha256(arrays_path)
+
+
+@pytest.fixture
+def camera_lambda(tmp_path, monkeypatch):
+    X, y = training_data(n_features=4)
+    model = DecisionTreeClassifier(max_depth=5, random_state=0).fit(X, y)
+    local = tmp_path / "json_model.npz"
+    tree_arrays.export(model, local)
+
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="pretrained-model-dllm")
+        s3.upload_file(str(local), "pretrained-model-dllm", "json_model.npz")
+        boto3.client("dynamodb", region_name="us-east-1").create_table(
+            TableName="CameraImageJSON",
+            AttributeDefinitions=[{"AttributeName": "timestamp_value", "AttributeType": "S"}],
+            KeySchema=[{"AttributeName": "timestamp_value", "KeyType": "HASH"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        import processCameraJSONFunction
+
+        module = importlib.reload(processCameraJSONFunction)
+        monkeypatch.setattr(module, "model_path", str(tmp_path / "downloaded.npz"))
+        yield module, model, boto3.resource("dynamodb", region_name="us-east-1").Table("CameraImageJSON")
+
+
+def test_camera_json_lambda_predicts_latest_keypoints(camera_lambda):
+    module, model, table = camera_lambda
+    older = [Decimal(10), Decimal(10), Decimal(10), Decimal(10)]
+    latest = [Decimal("600.5"), Decimal("300.25"), Decimal(50), Decimal(1)]
+    table.put_item(Item={"timestamp_value": "2024-01-01T00:00:00", "pose_keypoints_2d": older})
+    table.put_item(Item={"timestamp_value": "2024-01-01T00:00:05", "pose_keypoints_2d": latest})
+
+    result = module.lambda_handler({}, None)
+
+    assert result["statusCode"] == 200
+    expected = model.predict(np.array([[600.5, 300.25, 50, 1]], dtype=np.float32))
+    assert json.loads(result["body"]) == {"prediction": expected.tolist()}
+    # The model is cached for the container's later invocations
+    assert os.path.exists(module.model_path)
+    assert module.load_model() is module._model
+
+
+def test_camera_json_lambda_rejects_wrong_feature_count(camera_lambda):
+    module, _, table = camera_lambda
+    table.put_item(Item={"timestamp_value": "2024-01-01T00:00:00", "pose_keypoints_2d": [Decimal(1)] * 3})
+
+    result = module.lambda_handler({}, None)
+
+    assert result["statusCode"] == 400
+    assert "expected 4" in result["body"]
@@ -0,0 +1,200 @@
+import importlib
+import json
+from decimal import Decimal
+
+import boto3
+import pytest
+from moto import mock_aws
+
+HOUR = 1_700_002_800  # 2023-11-14T23:00:00Z
+
+
+def create_table(client, name, hash_key, range_key=None, range_type="S"):
+    attributes = [{"AttributeName": hash_key, "AttributeType": "S"}]
+    schema = [{"AttributeName": hash_key, "KeyType": "HASH"}]
+    if range_key:
+        attributes.append({"AttributeName": range_key, "AttributeType": range_type})
+        schema.append({"AttributeName": range_key, "KeyType": "RANGE"})
+    client.create_table(TableName=name, AttributeDefinitions=attributes, KeySchema=schema,
+                        BillingMode="PAY_PER_REQUEST")
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    with mock_aws():
+        client = boto3.client("dynamodb", region_name="us-east-1")
+        create_table(client, "MachineUsageRollup", "machine_id", "bucket")
+        create_table(client, "VibrationData", "timestamp_value", "machine_id")
+        create_table(client, "CameraDetectionData", "machine_id", "detection_key")
+        create_table(client, "MachineStatusTable", "machineID")
+        resource = boto3.resource("dynamodb", region_name="us-east-1")
+        resource.Table("MachineStatusTable").put_item(Item={"machineID": "RVREB-W1"})
+
+        vibration = resource.Table("VibrationData")
+        for minute, spin in ((0, 10), (1, 2), (2, 0)):
+            vibration.put_item(Item={
+                "timestamp_value": f"2023-11-14T23:0{minute}:00Z", "machine_id": "RVREB-W1",
+                "reading_count": 12, "spin_count": Decimal(spin), "magnitude_sum": Decimal(24),
+                "magnitude_count": 12, "magnitude_peak": Decimal("3.5"),
+            })
+        detections = resource.Table("CameraDetectionData")
+        for ts, bending in ((HOUR + 125, True), (HOUR + 130, False)):
+            detections.put_item(Item={"machine_id": "RVREB-W1", "detection_key": f"{ts:014.3f}#cam-1",
+                                      "timestamp": Decimal(ts), "is_bending": bending})
+
+        rollup = importlib.reload(importlib.import_module("aws.functions.rollupUsageFunction"))
+        query = importlib.reload(importlib.import_module("aws.functions.queryMachineUsageFunction"))
+        yield rollup, query, resource.Table("MachineUsageRollup")
+
+
+def run_rollup(rollup, monkeypatch, now):
+    monkeypatch.setattr(rollup.time, "time", lambda: now)
+    return json.loads(rollup.lambda_handler({}, None)["body"])
+
+
+def test_rollup_writes_minute_and_hour_buckets(tables, monkeypatch):
+    rollup, _, table = tables
+    table.put_item(Item={**rollup.WATERMARK_KEY, "watermark": HOUR})
+
+    body = run_rollup(rollup, monkeypatch, HOUR + 300)
+    # The trailing REROLL_SECONDS before the watermark are read again
+    assert body == {"start": HOUR - 240, "end": HOUR + 180, "minute_rows": 3, "hour_rows": 1}
+
+    minute = table.get_item(Key={"machine_id": "RVREB-W1", "bucket": "minute#2023-11-14T23:02"})["Item"]
+    assert minute["camera_detections"] == 2
+    assert minute["bending_detections"] == 1
+    assert minute["active_minutes"] == 1
+
+    hour = table.get_item(Key={"machine_id": "RVREB-W1", "bucket": "hour#2023-11-14T23"})["Item"]
+    assert hour["vibration_readings"] == 36
+    assert hour["active_minutes"] == 2
+    assert hour["spin_ratio"] == Decimal("0.3333")
+    watermark = table.get_item(Key=rollup.WATERMARK_KEY)["Item"]
+    assert (watermark["watermark"], watermark["settled"]) == (HOUR + 180, HOUR - 240)
+
+
+def test_rerunning_a_range_is_idempotent(tables, monkeypatch):
+    rollup, _, table = tables
+    table.put_item(Item={**rollup.WATERMARK_KEY, "watermark": HOUR})
+    run_rollup(rollup, monkeypatch, HOUR + 300)
+    before = table.get_item(Key={"machine_id": "RVREB-W1", "bucket": "hour#2023-11-14T23"})["Item"]
+
+    assert rollup.lambda_handler({"start": HOUR, "end": HOUR + 180}, None)["statusCode"] == 200
+    after = table.get_item(Key={"machine_id": "RVREB-W1", "bucket": "hour#2023-11-14T23"})["Item"]
+    assert {k: v for k, v in after.items() if k != "rolled_up_at"} == {
+        k: v for k, v in before.items() if k != "rolled_up_at"}
+    # Nothing new since the watermark; the trailing minutes are rolled up to the same rows
+    run_rollup(rollup, monkeypatch, HOUR + 300)
+    again = table.get_item(Key={"machine_id": "RVREB-W1", "bucket": "hour#2023-11-14T23"})["Item"]
+    assert again["vibration_readings"] == before["vibration_readings"]
+
+
+def test_late_windows_are_picked_up_by_the_next_run(tables, monkeypatch):
+    rollup, _, table = tables
+    table.put_item(Item={**rollup.WATERMARK_KEY, "watermark": HOUR})
+    run_rollup(rollup, monkeypatch, HOUR + 300)
+    # storeDataFunction flushes a window for minute 2 only after the run has passed it
+    boto3.resource("dynamodb", region_name="us-east-1").Table("VibrationData").put_item(Item={
+        "timestamp_value": "2023-11-14T23:02:00Z", "machine_id": "RVREB-W2", "reading_count": 12,
+        "spin_count": Decimal(12)})
+
+    run_rollup(rollup, monkeypatch, HOUR + 360)
+    minute = table.get_item(Key={"machine_id": "RVREB-W2", "bucket": "minute#2023-11-14T23:02"})["Item"]
+    assert minute["vibration_readings"] == 12
+    assert table.get_item(Key=rollup.WATERMARK_KEY)["Item"]["watermark"] == HOUR + 240
+
+
+def test_sub_minute_windows_are_all_counted(tables, monkeypatch):
+    rollup, _, table = tables
+    monkeypatch.setattr(rollup, "VIBRATION_WINDOW_SECONDS", 20)
+    monkeypatch.setattr(rollup.time, "time", lambda: HOUR + 300)
+    vibration = boto3.resource("dynamodb", region_name="us-east-1").Table("VibrationData")
+    for second in (20, 40):
+        vibration.put_item(Item={"timestamp_value": f"2023-11-14T23:00:{second}Z", "machine_id": "RVREB-W1",
+                                 "reading_count": 4, "spin_count": Decimal(4)})
+
+    rollup.lambda_handler({"start": HOUR, "end": HOUR + 60}, None)
+    minute = table.get_item(Key={"machine_id": "RVREB-W1", "bucket": "minute#2023-11-14T23:00"})["Item"]
+    assert minute["vibration_readings"] == 20
+
+
+def test_backfills_before_vibration_retention_are_refused(tables, monkeypatch):
+    rollup, _, table = tables
+    monkeypatch.setattr(rollup.time, "time", lambda: HOUR + 900)
+
+    response = rollup.lambda_handler({"start": HOUR, "end": HOUR + 180}, None)
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"])["earliest_start"] == HOUR + 300
+    assert "Item" not in table.get_item(Key={"machine_id": "RVREB-W1", "bucket": "minute#2023-11-14T23:00"})
+
+
+def test_query_serves_ranges_from_rollups(tables, monkeypatch):
+    rollup, query, table = tables
+    table.put_item(Item={**rollup.WATERMARK_KEY, "watermark": HOUR})
+    run_rollup(rollup, monkeypatch, HOUR + 300)
+
+    response = query.lambda_handler({"queryStringParameters": {
+        "machine_id": "RVREB-W1", "start": "2023-11-14T23:00:00Z", "end": str(HOUR + 3599)}}, None)
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert body["granularity"] == "minute"
+    usage = body["machines"]["RVREB-W1"]
+    assert [b["bucket"] for b in usage["buckets"]] == [
+        "minute#2023-11-14T23:00", "minute#2023-11-14T23:01", "minute#2023-11-14T23:02"]
+    assert usage["summary"]["active_minutes"] == 2
+
+    weekly = json.loads(query.lambda_handler({"queryStringParameters": {
+        "machine_id": "RVREB-W1", "start": str(HOUR - 6 * 86400), "end": str(HOUR + 3600)}}, None)["body"])
+    assert weekly["granularity"] == "hour"
+    assert weekly["machines"]["RVREB-W1"]["summary"]["camera_detections"] == 2
+
+
+def test_query_requires_machine_id(tables):
+    _, query, _ = tables
+    assert query.lambda_handler({"queryStringParameters": None}, None)["statusCode"] == 400
+
+
+def put_running_minutes(table, machine_id, start, minutes):
+    for minute in minutes:
+        bucket_start = start + minute * 60
+        table.put_item(Item={"machine_id": machine_id, "bucket": f"minute#{bucket_start}", "bucket_start": bucket_start,
+                             "vibration_readings": 12, "spin_ratio": Decimal("0.9")})
+
+
+def test_cycle_profiles_are_learned_incrementally(tables, monkeypatch):
+    _, _, table = tables
+    profiler = importlib.reload(importlib.import_module("aws.functions.profileCycleTimesFunction"))
+    # Minute buckets sort like the rollup's ISO buckets, which keeps the fixture short
+    monkeypatch.setattr(profiler, "minute_bucket", lambda epoch: f"minute#{epoch}")
+    monkeypatch.setattr(profiler.time, "time", lambda: HOUR + 86400)
+    start = HOUR - 86400
+    # Five cycles of 20-40 minutes two hours apart; the second pauses for 3 minutes mid-cycle
+    for cycle, length in enumerate((20, 25, 30, 35, 40)):
+        minutes = [m for m in range(length) if not (cycle == 1 and 10 <= m < 13)]
+        put_running_minutes(table, "RVREB-W1", start + cycle * 7200, minutes)
+    # A two-minute blip is not a cycle; the last cycle is still running at the rollup watermark
+    put_running_minutes(table, "RVREB-W1", start + 5 * 7200, range(2))
+    put_running_minutes(table, "RVREB-W1", start + 6 * 7200, range(50))
+    table.put_item(Item={"machine_id": "__rollup__", "bucket": "watermark", "watermark": start + 6 * 7200 + 1200})
+
+    body = json.loads(profiler.lambda_handler({}, None)["body"])
+    assert body["machine_profiles"] == 1
+
+    status_table = boto3.resource("dynamodb", region_name="us-east-1").Table("MachineStatusTable")
+    machine = status_table.get_item(Key={"machineID": "RVREB-W1"})["Item"]
+    assert {k: machine["cycle_profile"][k] for k in ("p10", "p50", "p90", "samples")} == {
+        "p10": 22 * 60, "p50": 30 * 60, "p90": 38 * 60, "samples": 5}
+    pooled = table.get_item(Key={"machine_id": "__profile__", "bucket": "device#washer"})["Item"]
+    assert pooled["p50"] == 30 * 60
+
+    state = table.get_item(Key={"machine_id": "RVREB-W1", "bucket": "cycles"})["Item"]
+    assert state["run_start"] == start + 6 * 7200
+    assert state["scanned_until"] == start + 6 * 7200 + 1200
+
+    # The next pass reads only the minutes rolled up since, and closes the running cycle
+    table.put_item(Item={"machine_id": "__rollup__", "bucket": "watermark", "watermark": start + 7 * 7200})
+    profiler.lambda_handler({}, None)
+    state = table.get_item(Key={"machine_id": "RVREB-W1", "bucket": "cycles"})["Item"]
+    assert state["durations"][-1] == 50 * 60
+    assert len(state["durations"]) == 6
+    assert "run_start" not in state
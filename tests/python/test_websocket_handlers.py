@@ -1,4 +1,5 @@
 import importlib
+import json
 from datetime import datetime, timedelta
 
 import boto3
@@ -16,6 +17,18 @@ def websocket_table():
             KeySchema=[{"AttributeName": "connectionId", "KeyType": "HASH"}],
             BillingMode="PAY_PER_REQUEST",
         )
+        dynamodb.create_table(
+            TableName="MachineSubscriptions",
+            AttributeDefinitions=[
+                {"AttributeName": "machine_id", "AttributeType": "S"},
+                {"AttributeName": "subscriber", "AttributeType": "S"},
+            ],
+            KeySchema=[
+                {"AttributeName": "machine_id", "KeyType": "HASH"},
+                {"AttributeName": "subscriber", "KeyType": "RANGE"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
         yield boto3.resource("dynamodb", region_name="us-east-1").Table("WebSocketConnections")
 
 
@@ -41,3 +54,17 @@ def test_disconnect_function_removes_connection(websocket_table):
     assert "Item" not in websocket_table.get_item(Key={"connectionId": "abc123"})
 
 
+def test_subscribe_function_subscribes_and_unsubscribes(websocket_table):
+    subscriptions = boto3.resource("dynamodb", region_name="us-east-1").Table("MachineSubscriptions")
+    module = importlib.import_module("aws.functions.subscribeFunction")
+
+    def send(body):
+        return module.lambda_handler({"requestContext": {"connectionId": "abc123"}, "body": json.dumps(body)}, {})
+
+    assert send({"action": "subscribe", "machine_id": "RVREB-W1"})["statusCode"] == 200
+    item = subscriptions.get_item(Key={"machine_id": "RVREB-W1", "subscriber": "abc123"})["Item"]
+    assert item["ttl"] > datetime.now().timestamp()
+
+    assert send({"action": "unsubscribe", "machine_id": "RVREB-W1"})["statusCode"] == 200
+    assert "Item" not in subscriptions.get_item(Key={"machine_id": "RVREB-W1", "subscriber": "abc123"})
+    assert send({"action": "subscribe"})["statusCode"] == 400